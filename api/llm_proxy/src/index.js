@@ -109,6 +109,13 @@ export default {
 				}));
 			}
 
+			// Streamed completions are passed through as server-sent events as they arrive
+			if (genText.stream) {
+				return new Response(response.body, {
+					headers: { ...headers, 'Content-Type': response.headers.get('Content-Type') || 'text/event-stream' }
+				});
+			}
+
 			const result = await response.json();
 			return Response.json(result, { headers });
 
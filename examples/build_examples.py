@@ -4,7 +4,18 @@ import importlib.util
 import json
 import re
 from pathlib import Path
-import ast # Keep ast for potential future use or other metadata extraction if needed
+import ast # Reads docstrings of examples that cannot be imported here
+import sys
+
+# Example functions import the shared boardflare.* helpers bundled with the exec worker
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src" / "functions" / "exec"))
+
+def source_function(file_path, module_name):
+    """The function definition named after the module, or the first one, from a file's AST"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=file_path)
+    functions = [node for node in tree.body if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))]
+    return next((node for node in functions if node.name == module_name), functions[0] if functions else None)
 
 def get_function_metadata(file_path):
     """Extract metadata from a Python function file and its corresponding test_cases.json."""
@@ -13,24 +24,32 @@ def get_function_metadata(file_path):
         module_name = os.path.basename(file_path).replace('.py', '')
         spec = importlib.util.spec_from_file_location(module_name, file_path)
         module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(module)
-        
-        # Find the main function (assuming it has the same name as the file)
-        main_func = getattr(module, module_name, None)
-        
-        if not main_func or not callable(main_func):
-            # Try to find any function in the module
-            for name, obj in inspect.getmembers(module, inspect.isfunction):
-                if obj.__module__ == module.__name__:
-                    main_func = obj
-                    break
-        
+        try:
+            spec.loader.exec_module(module)
+        except ImportError as e:
+            # Packages the example needs may only be installed in Pyodide, read its source instead
+            print(f"Warning: {e}, reading the docstring of {file_path} from its source")
+            module = None
+
+        if module is not None:
+            # Find the main function (assuming it has the same name as the file)
+            main_func = getattr(module, module_name, None)
+
+            if not main_func or not callable(main_func):
+                # Try to find any function in the module
+                for name, obj in inspect.getmembers(module, inspect.isfunction):
+                    if obj.__module__ == module.__name__:
+                        main_func = obj
+                        break
+        else:
+            main_func = source_function(file_path, module_name)
+
         if not main_func:
             print(f"Warning: Could not find main function in {file_path}")
             return None
             
         # Extract the function metadata
-        docstring = inspect.getdoc(main_func)
+        docstring = inspect.getdoc(main_func) if module is not None else ast.get_docstring(main_func)
         
         # Extract description from the first line of the docstring
         description = ""
@@ -128,12 +147,13 @@ def main():
             relative_path = py_file.relative_to(examples_dir).parent
             parent_name = relative_path.name
             file_stem = py_file.stem
+            relative_link = relative_path.as_posix()
             if relative_path == Path('.'):  # If in the root examples directory
                 link_path = metadata['name']
             elif parent_name == file_stem:
-                link_path = str(relative_path).replace('\\', '/')
+                link_path = relative_link
             else:
-                link_path = f"{str(relative_path).replace('\\', '/')}/{metadata['name']}"
+                link_path = f"{relative_link}/{metadata['name']}"
             
             metadata["link"] = f"https://www.boardflare.com/resources/python-functions/{link_path}"
             
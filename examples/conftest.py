@@ -0,0 +1,58 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def boardflare_data_dirs(tmp_path, tmp_path_factory, monkeypatch):
+    """Keep the LLM response cache and nltk data written by tests out of ~/.cache/boardflare"""
+    from boardflare import cache
+
+    monkeypatch.setenv("BOARDFLARE_LLM_CACHE_DIR", str(tmp_path / "llm"))
+    # The VADER lexicon is downloaded at most once per session
+    monkeypatch.setenv("BOARDFLARE_NLTK_DATA_DIR", str(tmp_path_factory.getbasetemp() / "nltk_data"))
+    monkeypatch.setattr(cache, "_cache", None)
+
+
+class SSEHandler(BaseHTTPRequestHandler):
+    """Answers chat completions requests with the server's scripted reply as server-sent events"""
+
+    def do_POST(self):
+        server = self.server
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        server.requests.append(payload)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        events = [{"choices": [{"index": 0, "delta": {"content": piece}}]} for piece in server.pieces]
+        events.append({"choices": [], "usage": {"prompt_tokens": 10, "completion_tokens": len(server.pieces),
+                                                "total_tokens": 10 + len(server.pieces)}})
+        raw = "".join(f"data: {json.dumps(event)}\n\n" for event in events) + "data: [DONE]\n\n"
+        # Write in odd sized chunks so events and UTF-8 characters span network reads
+        data = raw.encode("utf-8")
+        for start in range(0, len(data), 7):
+            self.wfile.write(data[start:start + 7])
+            self.wfile.flush()
+            time.sleep(server.delay)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def sse_server():
+    """Local stand-in for a streaming chat completions API, set server.pieces to script the reply"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SSEHandler)
+    server.pieces = []
+    server.requests = []
+    server.delay = 0.0
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
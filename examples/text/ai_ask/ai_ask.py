@@ -1,5 +1,5 @@
-import requests
-import json
+from boardflare.llm import chat
+from boardflare.ranges import MODE_LABELS, encode_range
 
 def ai_ask(prompt, data=None, temperature=0.5, max_tokens=250, model='mistral-small-latest'):
     """
@@ -26,31 +26,14 @@ def ai_ask(prompt, data=None, temperature=0.5, max_tokens=250, model='mistral-sm
     # Construct the message incorporating both prompt and data if provided
     message = prompt
     if data is not None:
-        data_str = json.dumps(data, indent=2)
-        message += f"\n\nData to analyze:\n{data_str}"
+        # Compact encoding of the range, cut to a token budget with a marker for omitted rows
+        data_str, data_mode = encode_range(data)
+        message += f"\n\nData to analyze ({MODE_LABELS[data_mode]}):\n{data_str}"
     
     # Remove array-specific instructions; just request a direct answer
     
-    # Prepare the API request payload
-    payload = {
-        "messages": [{"role": "user", "content": message}],
-        "temperature": temperature,
-        "model": model,
-        "max_tokens": max_tokens
-    }
-    
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json",
-        "Accept": "application/json"
-    }
-    
-    # Make the API request
-    response = requests.post(api_url, headers=headers, json=payload)
-    response.raise_for_status()
-    
-    # Extract and return the response content
-    response_data = response.json()
-    content = response_data["choices"][0]["message"]["content"]
+    # Make the API request with the shared client, which retries throttled and failed calls
+    content = chat(message, model, temperature=temperature, max_tokens=max_tokens,
+                   api_url=api_url, api_key=api_key)
 
     return content
\ No newline at end of file
@@ -0,0 +1,41 @@
+from boardflare.llm import astream_chat
+from boardflare.ranges import MODE_LABELS, encode_range
+
+async def ai_ask_stream(prompt, data=None, temperature=0.5, max_tokens=250, model='mistral-small-latest'):
+    """
+    Uses AI to generate responses based on prompts and optional data ranges, showing the answer in the cell as it is written.
+
+    Args:
+        prompt (str): The question, task, or analysis to perform
+        data (list, optional): 2D list containing data from Excel range to analyze
+        temperature (float, optional): Controls response creativity (0-2). Default is 0.5
+        max_tokens (int, optional): Maximum tokens for response generation
+        model (str, optional): ID of the model to use
+        # Note: API key is hardcoded for this example, replace with secure handling in production
+
+    Yields:
+        str: The AI-generated response so far
+    """
+    
+    # Using Boardflare API for demo purposes. Replace with any OpenAI compatible API endpoint.
+    # Sign up for your free Mistral API account at https://console.mistral.ai/ then replace the following:
+    
+    api_url = "https://llm.boardflare.com" # replace with "https://api.mistral.ai/v1/chat/completions"
+    api_key = "cV4a59t1wjYGs...." # replace with your Mistral API key
+    
+    # Construct the message incorporating both prompt and data if provided
+    message = prompt
+    if data is not None:
+        # Compact encoding of the range, cut to a token budget with a marker for omitted rows
+        data_str, data_mode = encode_range(data)
+        message += f"\n\nData to analyze ({MODE_LABELS[data_mode]}):\n{data_str}"
+    
+    # Stream the reply, each yield replaces the cell value with the text received so far
+    content = ""
+    async for piece in astream_chat(message, model, temperature=temperature, max_tokens=max_tokens,
+                                    api_url=api_url, api_key=api_key):
+        content += piece
+        yield content
+
+    if not content:
+        yield content
@@ -43,6 +43,39 @@ def test_ai_ask_parametrized(test_case):
     except Exception as e:
         pytest.fail(f"Test ID: {test_case.get('id')} - Exception occurred: {str(e)}")
 
+def test_ai_ask_encodes_large_data_within_budget(monkeypatch):
+    """Data goes into the prompt as compact text, cut to the token budget with an omitted rows marker."""
+    import ai_ask as module
+    from boardflare.ranges import DEFAULT_MAX_TOKENS, estimate_tokens
+
+    prompts = []
+    monkeypatch.setattr(module, "chat", lambda message, model, **kwargs: prompts.append(message) or "ok")
+    data = [["Region", "Units", "Revenue"]] + [[f"Region {i % 7}", i, i * 12.5] for i in range(5000)]
+
+    assert ai_ask("Summarize the sales.", data) == "ok"
+    data_text = prompts[0].split(":\n", 1)[1]
+    assert data_text.startswith("Region")
+    assert "[" not in data_text.splitlines()[1]
+    assert data_text.splitlines()[-1].endswith("of 5000 rows omitted]")
+    assert estimate_tokens(data_text) <= DEFAULT_MAX_TOKENS
+    assert len(data_text) < len(json.dumps(data, indent=2)) / 4
+
+def test_ai_ask_stream_yields_growing_answer(sse_server, monkeypatch):
+    """ai_ask_stream yields the answer so far as a local SSE server streams it."""
+    import asyncio
+    import ai_ask_stream as module
+    from boardflare import llm
+
+    sse_server.pieces = ["Sales ", "rose ", "12% in Q2 ✓"]
+    monkeypatch.setattr(module, "astream_chat",
+                        lambda *args, **kwargs: llm.astream_chat(*args, **{**kwargs, "api_url": sse_server.url}))
+
+    async def collect():
+        return [text async for text in module.ai_ask_stream("Summarize.", [["Quarter", "Sales"], ["Q2", 112]])]
+
+    assert asyncio.run(collect()) == ["Sales ", "Sales rose ", "Sales rose 12% in Q2 ✓"]
+    assert sse_server.requests[0]["stream"] is True
+
 if __name__ == "__main__":
     import pytest
     pytest.main(["-v", __file__])
\ No newline at end of file
@@ -1,7 +1,28 @@
-import requests
 import json
+from boardflare.llm import chat
+from boardflare.batch import run_batched, row_texts
 
-def ai_choice(text, choices, temperature=0.2, model='mistral-small-latest'):
+CHOICE_PROMPT = """Based on the following context, select the single most appropriate option from the choices provided.
+    
+Context:
+{context}
+
+Choices:
+{choices}
+
+Provide ONLY your selected choice without explanation or additional text. Return the exact text of the selected choice."""
+
+def match_choice(content, choices_list):
+    """Return the choice named in an AI response, or None if it names none of them"""
+    content = str(content).strip()
+    if not content:
+        return None
+    for choice in choices_list:
+        if choice in content or content in choice:
+            return choice
+    return None
+
+def ai_choice(text, choices, temperature=0.2, model='mistral-small-latest', by_row=False):
     """
     Uses AI to select the most appropriate choice from a list of options based on the given context.
     
@@ -10,9 +31,11 @@ def ai_choice(text, choices, temperature=0.2, model='mistral-small-latest'):
         choices (str or list): A string with comma-separated options or a 2D list of options
         temperature (float, optional): Controls randomness in the selection (0-1). Default is 0.2
         model (str, optional): ID of the AI model to use
+        by_row (bool, optional): Select a choice for each row of text instead of for all rows
+            together. Rows are sent in batches of many rows per request. Default is False
         
     Returns:
-        str: The selected choice from the options provided
+        str: The selected choice from the options provided, or a 2D list with one choice per row if by_row
     """
     # Input validation
     if not text or (isinstance(text, list) and (len(text) == 0 or len(text[0]) == 0)):
@@ -21,65 +44,44 @@ def ai_choice(text, choices, temperature=0.2, model='mistral-small-latest'):
     if not choices or (isinstance(choices, list) and (len(choices) == 0 or len(choices[0]) == 0)):
         return "Error: No valid choices provided."
     
-    # Normalize text to string if it's a 2D list
-    if isinstance(text, list):
-        text_str = "\n".join([item[0] if isinstance(item[0], str) else str(item[0]) for item in text if len(item) > 0])
-    else:
-        text_str = text
-    
     # Normalize choices to a list of strings
     if isinstance(choices, list):
         choices_list = [item[0] if isinstance(item, list) and len(item) > 0 else str(item) for item in choices]
     else:
         choices_list = [choice.strip() for choice in str(choices).split(',')]
     
-    # Construct the AI prompt
-    prompt = f"""Based on the following context, select the single most appropriate option from the choices provided.
-    
-Context:
-{text_str}
-
-Choices:
-{json.dumps(choices_list, indent=2)}
-
-Provide ONLY your selected choice without explanation or additional text. Return the exact text of the selected choice."""
-
     # Using Boardflare API for demo purposes. Replace with any OpenAI compatible API endpoint.
     # Sign up for your free Mistral API account at https://console.mistral.ai/ then replace the following:
     
     api_url = "https://llm.boardflare.com" # replace with "https://api.mistral.ai/v1/chat/completions"
     api_key = "cV4a59t1wjYGs...." # replace with your Mistral API key
     
-    # Prepare the API request payload
-    payload = {
-        "messages": [{"role": "user", "content": prompt}],
-        "temperature": temperature,
-        "model": model,
-        "max_tokens": 200
-    }
+    # One choice per row, many rows per request
+    if by_row:
+        rows = text if isinstance(text, list) else [[text]]
+        instruction = CHOICE_PROMPT.format(context="The text of each item below, answered separately.",
+                                           choices=json.dumps(choices_list, indent=2))
+        results = run_batched(row_texts(rows), instruction, model, lambda answer: match_choice(answer, choices_list),
+                              tokens_per_item=40, temperature=temperature, api_url=api_url, api_key=api_key)
+        return [[result] for result in results]
     
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json",
-        "Accept": "application/json"
-    }
+    # Normalize text to string if it's a 2D list
+    if isinstance(text, list):
+        text_str = "\n".join([item[0] if isinstance(item[0], str) else str(item[0]) for item in text if len(item) > 0])
+    else:
+        text_str = text
     
+    # Construct the AI prompt
+    prompt = CHOICE_PROMPT.format(context=text_str, choices=json.dumps(choices_list, indent=2))
+
     try:
-        # Make the API request
-        response = requests.post(api_url, headers=headers, json=payload)
-        response.raise_for_status()
-        
-        # Extract and return the response content
-        response_data = response.json()
-        content = response_data["choices"][0]["message"]["content"].strip()
-        
-        # Validate that the response is one of the choices
-        for choice in choices_list:
-            if choice in content or content in choice:
-                return choice
+        # Make the API request with the shared client, which retries throttled and failed calls
+        content = chat(prompt, model, temperature=temperature, max_tokens=200,
+                       api_url=api_url, api_key=api_key).strip()
         
+        # Validate that the response is one of the choices.
         # If no exact match, return the AI's response (which may be a paraphrase)
-        return content
+        return match_choice(content, choices_list) or content
         
     except Exception as e:
         return f"Error: Failed to get AI recommendation. {str(e)}"
\ No newline at end of file
@@ -46,6 +46,28 @@ def test_ai_choice_parametrized(test_case):
     except Exception as e:
         pytest.fail(f"Test ID: {test_case.get('id')} - Exception occurred: {str(e)}")
 
+def test_ai_choice_by_row_batches_and_retries_failed_rows(monkeypatch):
+    """by_row packs rows into one request and re-requests only rows without a valid answer."""
+    import boardflare.batch
+
+    requests_sent = []
+
+    def fake_chat(prompt, model, **kwargs):
+        items = json.loads(prompt.split("Items:\n", 1)[1].split("\n\n", 1)[0])
+        requests_sent.append([item["text"] for item in items])
+        answers = {"refund late": "Negative", "love it": "Positive", "ok I guess": "Neutral"}
+        results = [{"id": item["id"], "result": answers[item["text"]]} for item in items]
+        if len(requests_sent) == 1:
+            results = [result for result in results if result["id"] != 2]
+        return json.dumps({"items": results})
+
+    monkeypatch.setattr(boardflare.batch, "chat", fake_chat)
+    result = ai_choice([["refund late"], ["love it"], [None], ["ok I guess"]],
+                       "Positive, Neutral, Negative", by_row=True)
+
+    assert result == [["Negative"], ["Positive"], [""], ["Neutral"]]
+    assert requests_sent == [["refund late", "love it", "ok I guess"], ["love it"]]
+
 if __name__ == "__main__":
     import pytest
     pytest.main(["-v", __file__])
\ No newline at end of file
@@ -1,5 +1,6 @@
 import requests
 import json
+from boardflare.llm import chat
 
 def ai_extract(text, extract_type, temperature=0.0, model='mistral-small-latest', max_tokens=1000):
     """
@@ -35,31 +36,10 @@ def ai_extract(text, extract_type, temperature=0.0, model='mistral-small-latest'
     extract_prompt += "Do not include any explanatory text, just the JSON object. "
     extract_prompt += "For example: {\"items\": [\"item1\", \"item2\", \"item3\"]}"
     
-    # Prepare the API request payload
-    payload = {
-        "messages": [{"role": "user", "content": extract_prompt}],
-        "temperature": temperature,
-        "model": model,
-        "max_tokens": max_tokens,
-        "response_format": {
-            "type": "json_object",
-        }
-    }
-    
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json",
-        "Accept": "application/json"
-    }
-    
     try:
-        # Make the API request
-        response = requests.post(api_url, headers=headers, json=payload)
-        response.raise_for_status()
-        
-        # Extract the response content
-        response_data = response.json()
-        content = response_data["choices"][0]["message"]["content"]
+        # Make the API request with the shared client, which retries throttled and failed calls
+        content = chat(extract_prompt, model, temperature=temperature, max_tokens=max_tokens,
+                       response_format={"type": "json_object"}, api_url=api_url, api_key=api_key)
         # print(content)
         
         # Extract the JSON array from the response
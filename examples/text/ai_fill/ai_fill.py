@@ -1,7 +1,9 @@
 import requests
 import json
+from boardflare.llm import achat
+from boardflare.blocks import BlockError, arun_blocks, split_rows
 
-def ai_fill(example_range, fill_range, temperature=0.0, model='mistral-small-latest', max_tokens=1500):
+async def ai_fill(example_range, fill_range, temperature=0.0, model='mistral-small-latest', max_tokens=1500):
     """
     Uses AI to fill in missing data in a target range by learning patterns from an example range.
     
@@ -10,7 +12,8 @@ def ai_fill(example_range, fill_range, temperature=0.0, model='mistral-small-lat
         fill_range (list): 2D list containing data with missing values to be filled
         temperature (float, optional): Controls response creativity (0-2). Default is 0
         model (str, optional): ID of the model to use
-        max_tokens (int, optional): Maximum tokens for response generation. Default is 1500
+        max_tokens (int, optional): Maximum tokens for each response. Large fill ranges are split into
+            row blocks sized to this budget and filled concurrently. Default is 1500
         
     Returns:
         list: 2D list with missing data filled in
@@ -25,82 +28,81 @@ def ai_fill(example_range, fill_range, temperature=0.0, model='mistral-small-lat
     api_url = "https://llm.boardflare.com" # replace with "https://api.mistral.ai/v1/chat/completions"
     api_key = "cV4a59t1wjYGs...." # replace with your Mistral API key
     
-    # Convert example_range and fill_range to JSON strings for the prompt
+    # Convert example_range to a JSON string for the prompt, it is sent with every block
     example_json = json.dumps(example_range)
-    fill_json = json.dumps(fill_range)
-    
-    # Construct a specific prompt for filling data
-    fill_prompt = """Fill in the missing values in the target data based on patterns in the example data.
+
+    async def fill_block(block, attempt):
+        # Construct a specific prompt for filling data
+        fill_prompt = """Fill in the missing values in the target data based on patterns in the example data.
 Example data (complete): {}\n\n
 Target data (with missing values): {}\n\n
 Study the patterns in the example data and complete the target data by filling in missing values. Preserve all existing values in the target data.""".format(
-        example_json, fill_json
-    )
-    
-    # Add instruction for structured output
-    fill_prompt += "\n\nReturn ONLY a JSON object with a key 'items' whose value is a JSON array of arrays (2D array) with the completed target data. "
-    fill_prompt += "Do not include any explanatory text, just the JSON object. "
-    fill_prompt += "For example: {\"items\": [[\"row1col1\", \"row1col2\"], [\"row2col1\", \"row2col2\"]]}"
-    
-    # Prepare the API request payload
-    payload = {
-        "messages": [{"role": "user", "content": fill_prompt}],
-        "temperature": temperature,
-        "model": model,
-        "max_tokens": max_tokens,
-        "response_format": {
-            "type": "json_object",
-        }
-    }
-    
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json",
-        "Accept": "application/json"
-    }
-    
+            example_json, json.dumps(block)
+        )
+
+        # Add instruction for structured output
+        fill_prompt += "\n\nReturn ONLY a JSON object with a key 'items' whose value is a JSON array of arrays (2D array) with the completed target data. "
+        fill_prompt += "Do not include any explanatory text, just the JSON object. "
+        fill_prompt += "For example: {\"items\": [[\"row1col1\", \"row1col2\"], [\"row2col1\", \"row2col2\"]]}"
+
+        # Make the API request with the shared client, which retries throttled and failed calls.
+        # A retried block replaces the cached bad response instead of reading it.
+        content = await achat(fill_prompt, model, temperature=temperature, max_tokens=max_tokens,
+                              response_format={"type": "json_object"}, api_url=api_url, api_key=api_key,
+                              cache=None if attempt == 0 else "refresh")
+        return parse_filled(content, block)
+
+    blocks = split_rows(fill_range, max_tokens)
+    outcomes = await arun_blocks(blocks, fill_block)
+
+    errors = [error for _, error in outcomes if error is not None]
+    if len(errors) == len(outcomes):
+        return error_rows(errors[0])
+
+    # Stitch the blocks back together, rows of a block that never filled carry its error
+    filled_range = []
+    for block, (filled, error) in zip(blocks, outcomes):
+        if error is None:
+            filled_range.extend(filled)
+        else:
+            message = error_rows(error)[0][0]
+            filled_range.extend([message] + [""] * (len(row) - 1) for row in block)
+    return filled_range
+
+
+def parse_filled(content, block):
+    """Extract the filled rows for a block from the response, raising BlockError if they don't fit"""
     try:
-        # Make the API request
-        response = requests.post(api_url, headers=headers, json=payload)
-        response.raise_for_status()
-        
-        # Extract the response content
-        response_data = response.json()
-        content = response_data["choices"][0]["message"]["content"]
-        # print(content)
-        
-        # Extract the filled data from the response
-        try:
-            # Try to parse the content as JSON directly
-            filled_data = json.loads(content)
-            
-            # Always look for the 'items' key as per the prompt
-            if isinstance(filled_data, dict) and "items" in filled_data:
-                filled_data = filled_data["items"]
-            # Legacy fallback for older keys (optional)
-            elif isinstance(filled_data, dict):
-                if "data" in filled_data:
-                    filled_data = filled_data["data"]
-                elif "filled_data" in filled_data:
-                    filled_data = filled_data["filled_data"]
-                elif "result" in filled_data:
-                    filled_data = filled_data["result"]
-            
-            # Ensure the filled data is a 2D list
-            if isinstance(filled_data, list) and all(isinstance(row, list) for row in filled_data):
-                # Ensure the dimensions match the original fill_range
-                if (len(filled_data) == len(fill_range) and 
-                    all(len(row) == len(fill_range[i]) for i, row in enumerate(filled_data))):
-                    return filled_data
-                else:
-                    return [["Error: AI response dimensions don't match the fill range."]]
-            else:
-                return [["Error: Unable to parse response. Expected a 2D array."]]
-                
-        except (json.JSONDecodeError, ValueError):
-            # If JSON parsing fails, return an error message
-            return [["Error: Unable to fill data. The AI response wasn't in the expected format."]]
-             
-    except requests.exceptions.RequestException as e:
+        # Try to parse the content as JSON directly
+        filled_data = json.loads(content)
+    except (json.JSONDecodeError, TypeError, ValueError):
+        raise BlockError("Error: Unable to fill data. The AI response wasn't in the expected format.")
+
+    # Always look for the 'items' key as per the prompt
+    if isinstance(filled_data, dict) and "items" in filled_data:
+        filled_data = filled_data["items"]
+    # Legacy fallback for older keys (optional)
+    elif isinstance(filled_data, dict):
+        if "data" in filled_data:
+            filled_data = filled_data["data"]
+        elif "filled_data" in filled_data:
+            filled_data = filled_data["filled_data"]
+        elif "result" in filled_data:
+            filled_data = filled_data["result"]
+
+    # Ensure the filled data is a 2D list
+    if not (isinstance(filled_data, list) and all(isinstance(row, list) for row in filled_data)):
+        raise BlockError("Error: Unable to parse response. Expected a 2D array.")
+    # Ensure the dimensions match the block of the fill_range
+    if (len(filled_data) != len(block) or
+            any(len(row) != len(block[i]) for i, row in enumerate(filled_data))):
+        raise BlockError("Error: AI response dimensions don't match the fill range.")
+    return filled_data
+
+
+def error_rows(error):
+    """Error output for a block that could not be filled"""
+    if isinstance(error, requests.exceptions.RequestException):
         # Handle API request errors
-        return [["Error: API request failed.", str(e)]]
\ No newline at end of file
+        return [["Error: API request failed.", str(error)]]
+    return [[str(error)]]
@@ -1,6 +1,10 @@
 import pytest
+import asyncio
 import json
 from pathlib import Path
+import sys
+import types
+
 from ai_fill import ai_fill
 
 # Helper function to load test cases from JSON
@@ -18,7 +22,7 @@ def test_ai_fill_parametrized(test_case):
     
     try:
         # Call the function with the arguments from the test case
-        result = ai_fill(**arguments)
+        result = asyncio.run(ai_fill(**arguments))
         
         # Basic assertions
         assert isinstance(result, list), f"Expected result to be a list, but got {type(result)}"
@@ -42,5 +46,113 @@ def test_ai_fill_parametrized(test_case):
     except Exception as e:
         pytest.fail(f"Exception occurred: {str(e)}")
 
+def test_ai_fill_splits_large_ranges_into_blocks(monkeypatch):
+    """Large fill ranges are filled in concurrent blocks, retrying a block with bad dimensions."""
+    import ai_fill as module
+    from boardflare.blocks import MAX_WORKERS
+
+    calls = []
+    in_flight = []
+
+    async def fake_achat(prompt, model, **kwargs):
+        block = json.loads(prompt.split("Target data (with missing values): ", 1)[1].split("\n", 1)[0])
+        first_attempt = block[0][0] not in [first for first, _ in calls]
+        calls.append((block[0][0], kwargs.get("cache")))
+        in_flight.append(in_flight[-1] + 1 if in_flight else 1)
+        await asyncio.sleep(0.01)
+        in_flight.append(in_flight[-1] - 1)
+        filled = [[row[0], f"filled {row[0]}"] for row in block]
+        if block[0][0] == 0 and first_attempt:
+            filled = filled[:-1]
+        return json.dumps({"items": filled})
+
+    monkeypatch.setattr(module, "achat", fake_achat)
+    fill_range = [[i, None] for i in range(400)]
+    result = asyncio.run(ai_fill([["id", "label"], [1, "filled 1"]], fill_range, max_tokens=500))
+
+    assert max(in_flight) == MAX_WORKERS
+    assert result == [[i, f"filled {i}"] for i in range(400)]
+    first_rows = [first for first, _ in calls]
+    assert len(set(first_rows)) > 1
+    assert first_rows.count(0) == 2
+    assert (0, "refresh") in calls
+
+def test_ai_fill_retry_replaces_cached_bad_response(monkeypatch):
+    """A block retried after a bad reply overwrites the cached reply, so a recalc is served the good one."""
+    from boardflare.llm import LLMClient
+
+    replies = [[[1, "a"]], [[1, "a"], [2, "b"]]]
+    posts = []
+
+    def fake_post(self, payload):
+        posts.append(payload)
+        items = replies[min(len(posts), len(replies)) - 1]
+        return {"choices": [{"message": {"content": json.dumps({"items": items})}}]}
+
+    monkeypatch.setattr(LLMClient, "post", fake_post)
+    examples = [["id", "label"], [0, "z"]]
+    fill_range = [[1, None], [2, None]]
+
+    assert asyncio.run(ai_fill(examples, fill_range)) == [[1, "a"], [2, "b"]]
+    assert len(posts) == 2
+    assert asyncio.run(ai_fill(examples, fill_range)) == [[1, "a"], [2, "b"]]
+    assert len(posts) == 2
+
+def test_cached_replies_are_keyed_on_every_forwarded_option(monkeypatch):
+    """Requests that differ only in an extra option forwarded to the API get their own cached reply."""
+    from boardflare.llm import LLMClient, chat
+
+    posts = []
+
+    def fake_post(self, payload):
+        posts.append(payload)
+        return {"choices": [{"message": {"content": f"reply {len(posts)}"}}]}
+
+    monkeypatch.setattr(LLMClient, "post", fake_post)
+
+    assert chat("Hi", "model", top_p=0.5) == "reply 1"
+    assert chat("Hi", "model", top_p=0.9) == "reply 2"
+    assert chat("Hi", "model", top_p=0.5) == "reply 1"
+    assert [payload["top_p"] for payload in posts] == [0.5, 0.9]
+
+def test_ai_fill_fetches_blocks_concurrently_in_pyodide(monkeypatch):
+    """In Pyodide the blocks are sent with overlapping pyfetch calls, and a 503 is retried."""
+    from boardflare import llm
+
+    in_flight = []
+    statuses = [503]
+
+    class FakeResponse:
+        def __init__(self, status, content):
+            self.status, self.ok, self.content = status, status == 200, content
+            self.status_text, self.url, self.headers = "", llm.DEFAULT_API_URL, {"retry-after": "0"}
+
+        async def json(self):
+            return {"choices": [{"message": {"content": self.content}}]}
+
+    async def pyfetch(url, method, headers, body):
+        prompt = json.loads(body)["messages"][0]["content"]
+        block = json.loads(prompt.split("Target data (with missing values): ", 1)[1].split("\n", 1)[0])
+        in_flight.append(in_flight[-1] + 1 if in_flight else 1)
+        await asyncio.sleep(0.01)
+        in_flight.append(in_flight[-1] - 1)
+        status = statuses.pop() if statuses else 200
+        return FakeResponse(status, json.dumps({"items": [[row[0], f"filled {row[0]}"] for row in block]}))
+
+    http = types.ModuleType("pyodide.http")
+    http.pyfetch = pyfetch
+    monkeypatch.setitem(sys.modules, "pyodide", types.ModuleType("pyodide"))
+    monkeypatch.setitem(sys.modules, "pyodide.http", http)
+    monkeypatch.setattr(sys, "platform", "emscripten")
+    monkeypatch.setattr(llm, "backoff_delay", lambda attempt, retry_after=None: 0)
+    monkeypatch.setattr(llm.LLMClient, "post", lambda self, payload: pytest.fail("requests was used in Pyodide"))
+
+    fill_range = [[i, None] for i in range(400)]
+    result = asyncio.run(ai_fill([["id", "label"], [1, "filled 1"]], fill_range, max_tokens=500))
+
+    assert result == [[i, f"filled {i}"] for i in range(400)]
+    assert max(in_flight) > 1
+    assert not statuses
+
 if __name__ == "__main__":
     pytest.main(["-v", __file__])
\ No newline at end of file
@@ -1,7 +1,8 @@
 import requests
-import json
+from boardflare.llm import chat
+from boardflare.batch import run_batched, row_texts
 
-def ai_format(text, format_instruction, temperature=0.0, model='mistral-small-latest', max_tokens=1500):
+def ai_format(text, format_instruction, temperature=0.0, model='mistral-small-latest', max_tokens=1500, by_row=False):
     """
     Uses AI to format text according to a specific structure or pattern.
     
@@ -11,10 +12,28 @@ def ai_format(text, format_instruction, temperature=0.0, model='mistral-small-la
         temperature (float, optional): Controls response creativity (0-2). Default is 0
         model (str, optional): ID of the model to use
         max_tokens (int, optional): Maximum tokens for response generation. Default is 1500
+        by_row (bool, optional): Format the first cell of every row instead of only the first row.
+            Rows are sent in batches of 10 per request, and max_tokens is the budget of each
+            request, split evenly between its rows. Default is False
         
     Returns:
-        str: The formatted text according to the specified format
+        str: The formatted text according to the specified format, or a 2D list with one formatted value per row if by_row
     """
+    # Using Boardflare API for demo purposes. Replace with any OpenAI compatible API endpoint.
+    api_url = "https://llm.boardflare.com" # replace with "https://api.mistral.ai/v1/chat/completions"
+    api_key = "cV4a59t1wjYGs...." # replace with your Mistral API key
+    
+    # One formatted value per row, many rows per request sharing the max_tokens budget
+    if by_row:
+        batch_size = 10
+        rows = text if isinstance(text, list) else [[text]]
+        instruction = f"Format the text of each item below according to this format instruction: {format_instruction}"
+        results = run_batched(row_texts(rows), instruction, model,
+                              lambda answer: str(answer).strip() if isinstance(answer, (str, int, float)) else None,
+                              batch_size=batch_size, tokens_per_item=max(1, max_tokens // batch_size),
+                              temperature=temperature, api_url=api_url, api_key=api_key)
+        return [[result] for result in results]
+    
     # Handle 2D list input (flatten to a single string)
     if isinstance(text, list):
         if len(text) > 0 and len(text[0]) > 0:
@@ -22,38 +41,16 @@ def ai_format(text, format_instruction, temperature=0.0, model='mistral-small-la
         else:
             return "Error: Empty input text."
     
-    # Using Boardflare API for demo purposes. Replace with any OpenAI compatible API endpoint.
-    api_url = "https://llm.boardflare.com" # replace with "https://api.mistral.ai/v1/chat/completions"
-    api_key = "cV4a59t1wjYGs...." # replace with your Mistral API key
-    
     # Construct a specific prompt for formatting
     format_prompt = f"Format the following text according to this format instruction: {format_instruction}\n\nText to format: {text}"
     
     # Remove array-specific instructions; just request a direct answer
     format_prompt += "\n\nReturn ONLY the formatted text. Do not include any explanatory text, just the formatted text."
     
-    # Prepare the API request payload
-    payload = {
-        "messages": [{"role": "user", "content": format_prompt}],
-        "temperature": temperature,
-        "model": model,
-        "max_tokens": max_tokens
-    }
-    
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json",
-        "Accept": "application/json"
-    }
-    
     try:
-        # Make the API request
-        response = requests.post(api_url, headers=headers, json=payload)
-        response.raise_for_status()
-        
-        # Extract the response content
-        response_data = response.json()
-        content = response_data["choices"][0]["message"]["content"]
+        # Make the API request with the shared client, which retries throttled and failed calls
+        content = chat(format_prompt, model, temperature=temperature, max_tokens=max_tokens,
+                       api_url=api_url, api_key=api_key)
         
         # Return the plain formatted text
         return content.strip()
@@ -34,5 +34,35 @@ def test_ai_format_parametrized(test_case):
     except Exception as e:
         pytest.fail(f"Test ID: {test_case.get('id')} - Exception occurred: {str(e)}")
 
+def test_ai_format_by_row_keeps_rows_aligned(monkeypatch):
+    """by_row places answers by id, whatever order the response lists them in."""
+    import boardflare.batch
+
+    def fake_chat(prompt, model, **kwargs):
+        items = json.loads(prompt.split("Items:\n", 1)[1].split("\n\n", 1)[0])
+        return json.dumps({"items": [{"id": item["id"], "result": item["text"].upper()} for item in reversed(items)]})
+
+    monkeypatch.setattr(boardflare.batch, "chat", fake_chat)
+    result = ai_format([["alpha"], ["beta"], ["gamma"]], "Uppercase", by_row=True)
+
+    assert result == [["ALPHA"], ["BETA"], ["GAMMA"]]
+
+def test_ai_format_by_row_splits_max_tokens_between_rows(monkeypatch):
+    """by_row gives each request of 10 rows the max_tokens budget, split evenly between its rows."""
+    import boardflare.batch
+
+    budgets = []
+
+    def fake_chat(prompt, model, **kwargs):
+        budgets.append(kwargs["max_tokens"])
+        items = json.loads(prompt.split("Items:\n", 1)[1].split("\n\n", 1)[0])
+        return json.dumps({"items": [{"id": item["id"], "result": item["text"]} for item in items]})
+
+    monkeypatch.setattr(boardflare.batch, "chat", fake_chat)
+    ai_format([["alpha"], ["beta"]], "Uppercase", max_tokens=400, by_row=True)
+    ai_format([["alpha"], ["beta"]], "Uppercase", max_tokens=2000, by_row=True)
+
+    assert budgets == [100 + 40 * 2, 100 + 200 * 2]
+
 if __name__ == "__main__":
     pytest.main(["-v", __file__])
\ No newline at end of file
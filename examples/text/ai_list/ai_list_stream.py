@@ -0,0 +1,59 @@
+import requests
+from boardflare.llm import astream_chat
+from boardflare.stream import JsonItemsParser
+
+async def ai_list_stream(prompt, values=None, temperature=0.0, model='mistral-small-latest', max_tokens=1000):
+    """
+    Uses AI to generate a list of items based on the prompt and optional values data, spilling items as they are generated.
+    
+    Args:
+        prompt (str): Instruction for AI to create a list
+        values (list, optional): 2D list containing additional data to append to prompt
+        temperature (float, optional): Controls response creativity (0-2). Default is 0
+        model (str, optional): ID of the model to use
+        max_tokens (int, optional): Maximum tokens for response generation. Default is 1000
+        
+    Yields:
+        list: 2D list with the items generated so far as a single column
+    """
+    # Using Boardflare API for demo purposes. Replace with any OpenAI compatible API endpoint.
+    api_url = "https://llm.boardflare.com" # replace with "https://api.mistral.ai/v1/chat/completions"
+    api_key = "cV4a59t1wjYGs...." # replace with your Mistral API key
+    
+    # Construct a specific prompt for list generation
+    list_prompt = f"Generate a list based on this request: {prompt}"
+    
+    # Add values information if provided
+    if values is not None:
+        values_str = "\n".join([str(item[0]) for item in values]) if len(values) > 0 and len(values[0]) > 0 else ""
+        if values_str:
+            list_prompt += f"\n\nUse this information to help create the list:\n{values_str}"
+    
+    # Add instruction for structured output
+    list_prompt += "\nReturn ONLY a JSON object with a key 'items' whose value is a JSON array of the items for the list. "
+    list_prompt += "Each item should be a single value. "
+    list_prompt += "Do not include any explanatory text, just the JSON object. "
+    list_prompt += "For example: {\"items\": [\"item1\", \"item2\", \"item3\"]}"
+    
+    # Each item is added to the column as soon as it is complete in the streamed reply
+    parser = JsonItemsParser()
+    result = []
+    try:
+        async for piece in astream_chat(list_prompt, model, temperature=temperature, max_tokens=max_tokens,
+                                        response_format={"type": "json_object"}, api_url=api_url, api_key=api_key):
+            items = parser.feed(piece)
+            for item in items:
+                if isinstance(item, list):
+                    # If item is already a list, keep its first element
+                    result.append([str(item[0])] if item else [""])
+                else:
+                    result.append([str(item)])
+            if items:
+                yield list(result)
+    except requests.exceptions.RequestException as e:
+        # Handle API request errors
+        yield [["Error: API request failed.", str(e)]]
+        return
+
+    if not result:
+        yield [["Error: Unable to generate list. The AI response wasn't in the expected format."]]
@@ -37,5 +37,21 @@ def test_ai_list_parametrized(test_case):
     except Exception as e:
         pytest.fail(f"Test ID: {test_case.get('id')} - Exception occurred: {str(e)}")
 
+def test_ai_list_stream_spills_items_as_they_arrive(sse_server, monkeypatch):
+    """Items are yielded as a growing single column while the JSON reply streams in."""
+    import asyncio
+    import ai_list_stream as module
+    from boardflare import llm
+
+    text = json.dumps({"items": ["Paris", "Rome", "Oslo"]})
+    sse_server.pieces = [text[i:i + 4] for i in range(0, len(text), 4)]
+    monkeypatch.setattr(module, "astream_chat",
+                        lambda *args, **kwargs: llm.astream_chat(*args, **{**kwargs, "api_url": sse_server.url}))
+
+    async def collect():
+        return [rows async for rows in module.ai_list_stream("Capitals.")]
+
+    assert asyncio.run(collect()) == [[["Paris"]], [["Paris"], ["Rome"]], [["Paris"], ["Rome"], ["Oslo"]]]
+
 if __name__ == "__main__":
     pytest.main(["-v", __file__])
\ No newline at end of file
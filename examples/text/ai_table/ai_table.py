@@ -1,5 +1,6 @@
-import requests
 import json
+from boardflare.llm import chat
+from boardflare.ranges import MODE_LABELS, encode_range
 
 def ai_table(prompt, header=None, source=None, temperature=0.0, model='mistral-small-latest', max_tokens=1500):
     """
@@ -32,8 +33,8 @@ def ai_table(prompt, header=None, source=None, temperature=0.0, model='mistral-s
     
     # Add source data information if provided
     if source is not None:
-        source_str = json.dumps(source, indent=2)
-        table_prompt += f"\n\nUse this source data to create the table:\n{source_str}"
+        source_str, source_mode = encode_range(source)
+        table_prompt += f"\n\nUse this source data ({MODE_LABELS[source_mode]}) to create the table:\n{source_str}"
     
     # Add instruction for structured output
     table_prompt += "\nReturn ONLY a JSON object with a key 'items' whose value is a JSON array of arrays (2D array) with the table data. "
@@ -42,31 +43,10 @@ def ai_table(prompt, header=None, source=None, temperature=0.0, model='mistral-s
     table_prompt += "Do not include any explanatory text, just the JSON object. "
     table_prompt += "For example: {\"items\": [[\"Header1\", \"Header2\"], [\"Row1Col1\", \"Row1Col2\"]]}"
     
-    # Prepare the API request payload
-    payload = {
-        "messages": [{"role": "user", "content": table_prompt}],
-        "temperature": temperature,
-        "model": model,
-        "max_tokens": max_tokens,
-        "response_format": {
-            "type": "json_object",
-        }
-    }
-    
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json",
-        "Accept": "application/json"
-    }
-    
     try:
-        # Make the API request
-        response = requests.post(api_url, headers=headers, json=payload)
-        response.raise_for_status()
-        
-        # Extract the response content
-        response_data = response.json()
-        content = response_data["choices"][0]["message"]["content"]
+        # Make the API request with the shared client, which retries throttled and failed calls
+        content = chat(table_prompt, model, temperature=temperature, max_tokens=max_tokens,
+                       response_format={"type": "json_object"}, api_url=api_url, api_key=api_key)
         
         # Extract the JSON array from the response
         try:
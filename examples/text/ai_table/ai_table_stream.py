@@ -0,0 +1,67 @@
+import requests
+from boardflare.llm import astream_chat
+from boardflare.ranges import MODE_LABELS, encode_range
+from boardflare.stream import JsonItemsParser
+
+async def ai_table_stream(prompt, header=None, source=None, temperature=0.0, model='mistral-small-latest', max_tokens=1500):
+    """
+    Uses AI to generate a structured table based on the prompt and optional header/source data, spilling rows as they are generated.
+    
+    Args:
+        prompt (str): Instruction for AI to create a table
+        header (list, optional): 2D list containing table header (column names)
+        source (list, optional): 2D list containing source data used to create the table
+        temperature (float, optional): Controls response creativity (0-2). Default is 0
+        model (str, optional): ID of the model to use
+        max_tokens (int, optional): Maximum tokens for response generation. Default is 1500
+        
+    Yields:
+        list: 2D list with the table rows generated so far
+    """
+    # Using Boardflare API for demo purposes. Replace with any OpenAI compatible API endpoint.
+    api_url = "https://llm.boardflare.com" # replace with "https://api.mistral.ai/v1/chat/completions"
+    api_key = "cV4a59t1wjYGs...." # replace with your Mistral API key
+    
+    # Construct a specific prompt for table generation
+    table_prompt = f"Generate a well-organized table based on this request: {prompt}"
+    
+    # Add header information if provided
+    if header is not None:
+        # Assuming header is a 2D list with a single row for column names
+        if header and len(header) > 0:
+            header_str = ", ".join(str(col) for col in header[0])
+            table_prompt += f"\nUse exactly these columns: {header_str}"
+    
+    # Add source data information if provided
+    if source is not None:
+        source_str, source_mode = encode_range(source)
+        table_prompt += f"\n\nUse this source data ({MODE_LABELS[source_mode]}) to create the table:\n{source_str}"
+    
+    # Add instruction for structured output
+    table_prompt += "\nReturn ONLY a JSON object with a key 'items' whose value is a JSON array of arrays (2D array) with the table data. "
+    table_prompt += "The first row should contain column headers if not provided. "
+    table_prompt += "Each subsequent row should contain data that fits the columns. "
+    table_prompt += "Do not include any explanatory text, just the JSON object. "
+    table_prompt += "For example: {\"items\": [[\"Header1\", \"Header2\"], [\"Row1Col1\", \"Row1Col2\"]]}"
+    
+    # Each row of the items array is added to the table as soon as its closing bracket arrives.
+    # Rows are padded or trimmed to the header width, so a short or overlong row cannot make
+    # the table ragged partway through the stream.
+    parser = JsonItemsParser()
+    table_data = []
+    width = len(header[0]) if header and header[0] else None
+    try:
+        async for piece in astream_chat(table_prompt, model, temperature=temperature, max_tokens=max_tokens,
+                                        response_format={"type": "json_object"}, api_url=api_url, api_key=api_key):
+            rows = [row for row in parser.feed(piece) if isinstance(row, list) and row]
+            if rows:
+                width = width or len(rows[0])
+                table_data.extend(row[:width] + [""] * (width - len(row)) for row in rows)
+                yield list(table_data)
+    except requests.exceptions.RequestException as e:
+        # Handle API request errors
+        yield [["Error: API request failed.", str(e)]]
+        return
+
+    if not table_data:
+        yield [["Error: Unable to generate table. The AI response wasn't in the expected format."]]
@@ -62,5 +62,44 @@ def test_ai_table_parametrized(test_case):
         else:
             pytest.fail(f"Test ID: {test_case.get('id')} - Exception occurred: {str(e)}")
 
+def test_ai_table_stream_spills_rows_as_they_arrive(sse_server, monkeypatch):
+    """Rows are yielded as soon as each one is complete in the streamed JSON."""
+    import asyncio
+    import ai_table_stream as module
+    from boardflare import llm
+
+    items = [["Fruit", "Note"], ["Apple", "crisp, [red]"], ["Pear", 5]]
+    text = json.dumps({"items": items})
+    sse_server.pieces = [text[i:i + 5] for i in range(0, len(text), 5)]
+    monkeypatch.setattr(module, "astream_chat",
+                        lambda *args, **kwargs: llm.astream_chat(*args, **{**kwargs, "api_url": sse_server.url}))
+
+    async def collect():
+        return [rows async for rows in module.ai_table_stream("List fruit.")]
+
+    partials = asyncio.run(collect())
+    assert [len(rows) for rows in partials] == [1, 2, 3]
+    assert partials[-1] == items
+
+def test_ai_table_stream_fits_rows_to_the_header_width(sse_server, monkeypatch):
+    """Short and long rows are padded or trimmed to the header, and a truncated last row is left out."""
+    import asyncio
+    import ai_table_stream as module
+    from boardflare import llm
+
+    items = [["Fruit", "Note"], ["Apple", "crisp"], ["Pear"], ["Plum", "sweet", "purple"], ["Kiwi", "green"]]
+    text = json.dumps({"items": items})
+    text = text[:text.index('"green"') + 4]
+    sse_server.pieces = [text[i:i + 5] for i in range(0, len(text), 5)]
+    monkeypatch.setattr(module, "astream_chat",
+                        lambda *args, **kwargs: llm.astream_chat(*args, **{**kwargs, "api_url": sse_server.url}))
+
+    async def collect():
+        return [rows async for rows in module.ai_table_stream("List fruit.")]
+
+    partials = asyncio.run(collect())
+    assert all(len(row) == 2 for rows in partials for row in rows)
+    assert partials[-1] == [["Fruit", "Note"], ["Apple", "crisp"], ["Pear", ""], ["Plum", "sweet"]]
+
 if __name__ == "__main__":
     pytest.main(["-v", __file__])
\ No newline at end of file
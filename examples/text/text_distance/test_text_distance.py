@@ -56,5 +56,100 @@ def test_text_distance_parametrized(test_case):
     except Exception as e:
         pytest.fail(f"Test ID: {test_case.get('id')} - Exception occurred: {str(e)}")
 
+@pytest.mark.parametrize("algorithm", ["jaccard", "sorensen", "cosine", "overlap", "levenshtein",
+                                       "damerau_levenshtein", "hamming", "jaro_winkler"])
+def test_text_distance_matches_brute_force(algorithm):
+    """Indexed top-N matching returns exactly what scoring every pair and sorting returns, ties included."""
+    import random
+    import textdistance
+
+    rng = random.Random(7)
+    bases = ["johnson", "jonson", "smith", "acme corp", "acme inc", "globex", "apple", "appl"]
+
+    def variant():
+        chars = list(rng.choice(bases))
+        for _ in range(rng.randint(0, 2)):
+            chars.insert(rng.randrange(len(chars) + 1), rng.choice("aeinost "))
+        return "".join(chars)
+
+    haystack = [[variant()] for _ in range(300)] + [[""], [None], [42]]
+    needles = [[variant()] for _ in range(15)] + [["zz"]]
+    result = text_distance(needles, haystack, algorithm=algorithm, top_n=5)
+
+    algo = getattr(textdistance, algorithm)
+    items = [str(row[0]) for row in haystack if row[0] is not None]
+    for (needle,), row in zip(needles, result):
+        scores = [(index + 1, round(algo.normalized_similarity(needle, item), 2)) for index, item in enumerate(items)]
+        scores.sort(key=lambda x: x[1], reverse=True)
+        assert row == [value for match in scores[:5] for value in match]
+
+def test_text_distance_reuses_cached_haystack():
+    """Calls with the same haystack cells share one preprocessed haystack and its index."""
+    from boardflare import fuzzy
+
+    fuzzy.clear_haystacks()
+    haystack = [["apple"], ["appl"], ["banana"], [1.0]]
+    assert text_distance("aple", haystack) == text_distance("aple", [row[:] for row in haystack])
+    assert len(fuzzy.haystacks) == 1
+    cached = next(iter(fuzzy.haystacks.values()))
+    index = cached.indexes["jaccard"]
+
+    text_distance("banan", [row[:] for row in haystack], top_n=2)
+    assert cached.indexes["jaccard"] is index
+
+    # Different content, or the same values with different types, is a new entry
+    text_distance("aple", [["apple"], ["appl"], ["banana"], [1]])
+    text_distance("aple", [["apple"], ["appl"], ["banana"]])
+    assert len(fuzzy.haystacks) == 3
+
+    fuzzy.MAX_CACHED_HAYSTACKS, limit = 2, fuzzy.MAX_CACHED_HAYSTACKS
+    try:
+        text_distance("aple", [["pear"]])
+        assert len(fuzzy.haystacks) == 2
+        assert cached not in fuzzy.haystacks.values()
+    finally:
+        fuzzy.MAX_CACHED_HAYSTACKS = limit
+        fuzzy.clear_haystacks()
+
+@pytest.mark.parametrize("top_n", [1, 3, 80])
+def test_text_distance_tfidf_cosine(monkeypatch, top_n):
+    """tfidf_cosine matches a plain Python TF-IDF cosine over character trigrams, across blocks."""
+    import math
+    import random
+    from collections import Counter
+    from boardflare import fuzzy, tfidf
+
+    rng = random.Random(3)
+    words = ["acme", "globex", "initech", "umbrella", "stark", "wayne", "corp", "inc", "ltd", "holdings"]
+    haystack = [[" ".join(rng.sample(words, rng.randint(1, 3)))] for _ in range(60)] + [[""], [None], ["ACME Corp"]]
+    needles = [[" ".join(rng.sample(words, rng.randint(1, 2)))] for _ in range(12)] + [["acme corp"], ["zzz"], [" "]]
+    # Small blocks so needles are split across candidate and dense blocks
+    monkeypatch.setattr(tfidf, "CANDIDATE_CELLS", 4 * 62)
+    monkeypatch.setattr(tfidf, "BLOCK_CELLS", 100)
+    fuzzy.clear_haystacks()
+    result = text_distance(needles, haystack, algorithm="tfidf_cosine", top_n=top_n)
+
+    items = [str(row[0]) for row in haystack if row[0] is not None]
+    counters = [Counter(tfidf.ngrams(item)) for item in items]
+    frequency = Counter(gram for counter in counters for gram in counter)
+
+    def vector(counter):
+        weights = {gram: count * (math.log((1 + len(items)) / (1 + frequency[gram])) + 1)
+                   for gram, count in counter.items()}
+        norm = math.sqrt(sum(weight * weight for weight in weights.values())) or 1.0
+        return {gram: weight / norm for gram, weight in weights.items()}
+
+    vectors = [vector(counter) for counter in counters]
+    for (needle,), row in zip(needles, result):
+        if not needle.strip():
+            assert row == []
+            continue
+        query = vector(Counter(tfidf.ngrams(needle)))
+        scores = [(index + 1, round(sum(weight * item.get(gram, 0.0) for gram, weight in query.items()), 2))
+                  for index, item in enumerate(vectors)]
+        scores.sort(key=lambda x: x[1], reverse=True)
+        assert row == [value for match in scores[:top_n] for value in match]
+    assert result[12][:2] == [62, 1.0]
+
 if __name__ == "__main__":
     pytest.main(["-v", __file__])
\ No newline at end of file
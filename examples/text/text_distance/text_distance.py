@@ -1,4 +1,5 @@
 import textdistance
+from boardflare.fuzzy import TFIDF, brute_force_top, get_haystack, is_indexed
 
 def text_distance(needle, haystack, algorithm='jaccard', top_n=1):
     """Calculate text similarity scores between needle(s) and haystack items.
@@ -6,13 +7,13 @@ def text_distance(needle, haystack, algorithm='jaccard', top_n=1):
     Args:
         needle: String or 2D list of strings to search for
         haystack: 2D list of strings to search within
-        algorithm (str): Algorithm name from textdistance library (default: 'jaccard')
+        algorithm (str): Algorithm name from textdistance library, or 'tfidf_cosine' (default: 'jaccard')
         top_n (int): Number of top matches to return (default: 1).
     
     Returns:
         list: For each needle, a flat list of [position, score, position, score, ...] for the top N matches (row format).
     """
-    algo_func = getattr(textdistance, algorithm)
+    algo_func = None if algorithm == TFIDF else getattr(textdistance, algorithm)
 
     # Handle needle as either string or 2D list
     if isinstance(needle, str):
@@ -21,23 +22,35 @@ def text_distance(needle, haystack, algorithm='jaccard', top_n=1):
         # Flatten 2D lists and filter out None values
         needle_flat = [item for sublist in needle for item in sublist if item is not None]
 
-    haystack_flat = [item for sublist in haystack for item in sublist if item is not None]
+    # Flattened items and indexes are cached across calls with the same haystack
+    cached = get_haystack(haystack)
 
-    if not haystack_flat:
+    if not cached.items:
         return [[] for _ in needle_flat] if needle_flat else []
 
+    if algorithm == TFIDF:
+        # All needles are scored together in blocked sparse matrix products
+        matches = cached.index(algorithm).top([str(item) for item in needle_flat], top_n)
+        results = [[value for match in row for value in match] for row in matches]
+        return results[0] if len(results) == 1 else results
+
+    # Set measures and edit distances use an index of the haystack to skip items that
+    # cannot reach the top N, other algorithms score every item
+    index = cached.index(algorithm) if is_indexed(algorithm) else None
+
     results = []
     for needle_item in needle_flat:
         if not str(needle_item).strip():
             results.append([])
             continue
-        scores = [(index + 1, round(algo_func.normalized_similarity(str(needle_item), str(item)), 2))
-                  for index, item in enumerate(haystack_flat)]
-        scores.sort(key=lambda x: x[1], reverse=True)
+        if index is not None:
+            matches = index.top(str(needle_item), top_n)
+        else:
+            matches = brute_force_top(algo_func, str(needle_item), cached.items, int(top_n))
         # Flatten the top matches into a single row
         row = []
-        for score in scores[:top_n]:
-            row.extend(list(score))  # [position, score, ...]
+        for match in matches:
+            row.extend(list(match))  # [position, score, ...]
         results.append(row)
 
     # If only one needle, return just the row for that needle
@@ -48,5 +48,63 @@ def test_vader_sentiment_parametrized(test_case):
     except Exception as e:
         pytest.fail(f"Test ID: {test_case.get('id')} - Exception occurred: {str(e)}")
 
+def test_vader_sentiment_scores_ranges_with_one_analyzer(tmp_path, monkeypatch):
+    """A 2D range is scored in its shape by one analyzer, with the lexicon from the local data directory."""
+    import zipfile
+    import nltk
+    from boardflare import vader
+
+    # A small lexicon laid out like nltk's download of vader_lexicon
+    (tmp_path / "sentiment").mkdir()
+    with zipfile.ZipFile(tmp_path / "sentiment" / "vader_lexicon.zip", "w") as archive:
+        archive.writestr("vader_lexicon/vader_lexicon.txt",
+                         "good\t1.9\t0.9\t[2, 2, 2]\nbad\t-2.5\t0.7\t[-3, -2, -2]\nlove\t3.2\t0.4\t[3, 3, 4]")
+    monkeypatch.setenv("BOARDFLARE_NLTK_DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(nltk.data, "path", list(nltk.data.path))
+    monkeypatch.setattr(nltk, "download", lambda *args, **kwargs: pytest.fail("nltk.download was called"))
+    monkeypatch.setattr(vader, "_analyzer", None)
+
+    analyzer = vader.get_analyzer()
+
+    def score(text):
+        return round(analyzer.polarity_scores(text)["compound"], 4)
+
+    result = vader_sentiment([["I love it!"], ["Bad, bad service"], [None], ["I love it!"], ["ok"]])
+    assert result == [[score("I love it!")], [score("Bad, bad service")], [0.0], [score("I love it!")], [0.0]]
+    assert result[0][0] > 0 > result[1][0]
+    assert vader_sentiment([["good", "bad"]]) == [[score("good"), score("bad")]]
+    assert vader_sentiment("good") == score("good")
+    assert vader.get_analyzer() is analyzer
+
+def test_vader_sentiment_loads_compiled_lexicon(tmp_path, monkeypatch):
+    """The lexicon parsed on first use is compiled, and later processes load it without nltk's data."""
+    import zipfile
+    import nltk
+    from boardflare import vader
+
+    (tmp_path / "sentiment").mkdir()
+    with zipfile.ZipFile(tmp_path / "sentiment" / "vader_lexicon.zip", "w") as archive:
+        archive.writestr("vader_lexicon/vader_lexicon.txt",
+                         "good\t1.9\t0.9\t[2, 2, 2]\nbad\t-2.5\t0.7\t[-3, -2, -2]\nlove\t3.2\t0.4\t[3, 3, 4]")
+    monkeypatch.setenv("BOARDFLARE_NLTK_DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(nltk.data, "path", list(nltk.data.path))
+    monkeypatch.setattr(vader, "_analyzer", None)
+    texts = [["I love it!"], ["Bad service, not good"], ["It was kind of good"], ["The best, no doubt"], [None]]
+    parsed = vader_sentiment(texts)
+    assert (tmp_path / vader.COMPILED_LEXICON).exists()
+
+    # A new process finds the compiled lexicon and never looks up or parses the text
+    (tmp_path / "sentiment" / "vader_lexicon.zip").unlink()
+    monkeypatch.setattr(nltk.data, "load", lambda *args, **kwargs: pytest.fail("the lexicon text was loaded"))
+    monkeypatch.setattr(nltk, "download", lambda *args, **kwargs: pytest.fail("nltk.download was called"))
+    monkeypatch.setattr(vader, "_analyzer", None)
+    assert vader_sentiment(texts) == parsed
+    assert parsed[0][0] > 0 > parsed[1][0]
+    assert vader.get_analyzer().lexicon == {"good": 1.9, "bad": -2.5, "love": 3.2}
+
+    # Files from another format are ignored
+    vader.compiled_path().write_bytes(b"not a lexicon")
+    assert vader.load_compiled() is None
+
 if __name__ == "__main__":
     pytest.main(["-v", __file__])
\ No newline at end of file
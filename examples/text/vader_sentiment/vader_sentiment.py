@@ -1,18 +1,17 @@
-import nltk
-from nltk.sentiment import SentimentIntensityAnalyzer
-
-# Ensure you have downloaded the necessary NLTK data
-nltk.download('vader_lexicon')
+from boardflare.vader import compound_scores
 
 def vader_sentiment(text):
     """Analyzes sentiment of text using VADER.
     Args:
-        text (str): Text to analyze
+        text (str or list): Text to analyze, or a 2D list of texts from a range
     Returns:
-        float: Compound sentiment score (-1 to 1)
+        float or list: Compound sentiment score (-1 to 1), or a 2D list with the score of each text
     """
+    if isinstance(text, list):
+        # Score a whole range with one analyzer, returning the scores in its shape
+        rows = [row if isinstance(row, list) else [row] for row in text]
+        scores = iter(compound_scores([cell for row in rows for cell in row]))
+        return [[next(scores) for _ in row] for row in rows]
     if not isinstance(text, str):
         return 0.0 # Return neutral for non-string input
-    sia = SentimentIntensityAnalyzer()
-    sentiment = sia.polarity_scores(text)
-    return round(sentiment['compound'], 4) # Round for consistency
\ No newline at end of file
+    return compound_scores([text])[0] # Rounded to 4 decimals for consistency
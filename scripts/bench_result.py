@@ -0,0 +1,81 @@
+"""
+Benchmark for the result conversion in src/functions/exec/result.py.
+
+Runs result.py the same way the exec worker does (as a script with `result` set
+as a global) and reports cells/sec for 2D list and DataFrame results of 10k, 100k and 1M cells.
+
+Usage:
+    python scripts/bench_result.py
+    python scripts/bench_result.py --baseline HEAD~1   # also time result.py from a git revision
+"""
+import argparse
+import datetime
+import subprocess
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULT_PATH = "src/functions/exec/result.py"
+SIZES = [10_000, 100_000, 1_000_000]
+WIDTH = 10
+
+
+def load_source(revision=None):
+    """Return result.py source from the working tree or from a git revision."""
+    if revision is None:
+        return (ROOT / RESULT_PATH).read_text(encoding="utf-8")
+    return subprocess.run(
+        ["git", "show", f"{revision}:{RESULT_PATH}"],
+        cwd=ROOT, check=True, capture_output=True, text=True
+    ).stdout
+
+
+def make_rows(cells, kind):
+    """Build a WIDTH-column 2D list of the requested cell kind."""
+    rows = cells // WIDTH
+    if kind == "float":
+        return [[float(r * WIDTH + c) for c in range(WIDTH)] for r in range(rows)]
+    if kind == "mixed":
+        return [[f"r{r}", r, r * 0.5, r % 2 == 0] + [float(c) for c in range(WIDTH - 4)] for r in range(rows)]
+    if kind == "dates":
+        start = datetime.datetime(2024, 1, 1)
+        return [[start + datetime.timedelta(days=r)] + [float(c) for c in range(WIDTH - 1)] for r in range(rows)]
+    if kind == "frame":
+        import pandas as pd
+        frame = pd.DataFrame(make_rows(cells, "float"))
+        frame[0] = pd.date_range("2024-01-01", periods=rows, freq="h")
+        return frame
+    raise ValueError(f"Unknown kind: {kind}")
+
+
+def time_convert(code, rows, repeat=3):
+    """Best-of-N wall time to run result.py against rows."""
+    compiled = compile(code, "result.py", "exec")
+    best = float("inf")
+    for _ in range(repeat):
+        namespace = {"__name__": "__main__", "result": rows.copy()}
+        start = time.perf_counter()
+        exec(compiled, namespace)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--baseline", help="git revision of result.py to compare against")
+    args = parser.parse_args()
+
+    versions = {"current": load_source()}
+    if args.baseline:
+        versions = {args.baseline: load_source(args.baseline), **versions}
+
+    print(f"{'kind':<8}{'cells':>12}" + "".join(f"{name + ' cells/s':>24}" for name in versions))
+    for kind in ("float", "mixed", "dates", "frame"):
+        for cells in SIZES:
+            rows = make_rows(cells, kind)
+            rates = [cells / time_convert(code, rows) for code in versions.values()]
+            print(f"{kind:<8}{cells:>12,}" + "".join(f"{rate:>24,.0f}" for rate in rates))
+
+
+if __name__ == "__main__":
+    main()
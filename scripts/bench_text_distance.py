@@ -0,0 +1,100 @@
+"""
+Benchmark for top-N matching in examples/text/text_distance/text_distance.py.
+
+Times the indexed search in boardflare.fuzzy against scoring every haystack item, for
+haystacks of 1k, 10k and 100k company-like names, and checks both give identical results.
+Brute force is timed on a sample of needles and reported per needle. A single-needle
+TEXT_DISTANCE call is also timed on a new haystack and again on the same cells, when the
+flattened items and index come from the haystack cache.
+
+Usage:
+    python scripts/bench_text_distance.py
+    python scripts/bench_text_distance.py --algorithm levenshtein --top-n 3
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src" / "functions" / "exec"))
+sys.path.insert(0, str(ROOT / "examples" / "text" / "text_distance"))
+
+import textdistance  # noqa: E402
+from boardflare.fuzzy import HaystackIndex, brute_force_top, clear_haystacks  # noqa: E402
+from text_distance import text_distance  # noqa: E402
+
+SIZES = [1_000, 10_000, 100_000]
+WORDS = ["acme", "global", "north", "star", "blue", "river", "tech", "foods", "systems", "partners",
+         "capital", "health", "energy", "logistics", "media", "group", "labs", "works", "trading", "solutions"]
+SUFFIXES = ["inc", "llc", "ltd", "corp", "co", "gmbh", "plc"]
+
+
+def make_name(rng):
+    """A random company name such as 'Blue River Logistics Ltd'."""
+    words = rng.sample(WORDS, rng.randint(1, 3)) + [rng.choice(SUFFIXES)]
+    return " ".join(word.capitalize() for word in words)
+
+
+def misspell(rng, name):
+    """The name with one or two character edits, like a hand-typed lookup value."""
+    chars = list(name)
+    for _ in range(rng.randint(1, 2)):
+        position = rng.randrange(len(chars))
+        if rng.random() < 0.5:
+            chars[position] = rng.choice("abcdefghijklmnopqrstuvwxyz")
+        else:
+            del chars[position]
+    return "".join(chars)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--algorithm", default="jaccard")
+    parser.add_argument("--top-n", type=int, default=1)
+    parser.add_argument("--needles", type=int, default=200, help="needles timed with the index")
+    parser.add_argument("--brute-needles", type=int, default=5, help="needles timed with brute force")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    algo = getattr(textdistance, args.algorithm)
+    print(f"{args.algorithm}, top_n={args.top_n}")
+    print(f"{'haystack':>10}{'build ms':>12}{'indexed ms/needle':>20}{'brute ms/needle':>18}{'speedup':>10}"
+          f"{'new call ms':>14}{'cached call ms':>17}")
+    for size in SIZES:
+        haystack = [make_name(rng) for _ in range(size)]
+        needles = [misspell(rng, rng.choice(haystack)) for _ in range(args.needles)]
+
+        start = time.perf_counter()
+        index = HaystackIndex(haystack, args.algorithm)
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        indexed = [index.top(needle, args.top_n) for needle in needles]
+        per_indexed = (time.perf_counter() - start) / len(needles)
+
+        sample = needles[:args.brute_needles]
+        start = time.perf_counter()
+        brute = [brute_force_top(algo, needle, haystack, args.top_n) for needle in sample]
+        per_brute = (time.perf_counter() - start) / len(sample)
+
+        if brute != indexed[:len(sample)]:
+            raise SystemExit(f"Indexed results differ from brute force at {size:,} items")
+
+        # Each cell of a sheet passes its own copy of the range
+        clear_haystacks()
+        column = [[name] for name in haystack]
+        start = time.perf_counter()
+        text_distance(needles[0], column, args.algorithm, args.top_n)
+        new_call = time.perf_counter() - start
+        start = time.perf_counter()
+        text_distance(needles[1], [row[:] for row in column], args.algorithm, args.top_n)
+        cached_call = time.perf_counter() - start
+
+        print(f"{size:>10,}{build * 1000:>12.0f}{per_indexed * 1000:>20.2f}{per_brute * 1000:>18.1f}"
+              f"{per_brute / per_indexed:>9.0f}x{new_call * 1000:>14.0f}{cached_call * 1000:>17.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark for bulk matching with algorithm='tfidf_cosine' in text_distance.
+
+Matches N misspelled company names against a haystack of N names, for N of 1k, 10k and
+100k, and reports the index build time, the matching time and the peak memory traced
+while matching the first 2,000 needles, memory being bounded per block of needles. On the
+smallest size the results are checked against dense NumPy scores.
+
+Usage:
+    python scripts/bench_tfidf_cosine.py
+    python scripts/bench_tfidf_cosine.py --top-n 3 --sizes 1000 10000
+"""
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src" / "functions" / "exec"))
+sys.path.insert(0, str(ROOT / "scripts"))
+
+import numpy as np  # noqa: E402
+from bench_text_distance import SUFFIXES, misspell  # noqa: E402
+from boardflare.tfidf import TfidfIndex  # noqa: E402
+
+SIZES = [1_000, 10_000, 100_000]
+CONSONANTS = "bcdfghjklmnprstvwz"
+VOWELS = "aeiou"
+
+
+def make_word(rng):
+    """A pronounceable made-up word of two or three syllables, such as 'bedor' or 'kasimun'"""
+    syllables = [rng.choice(CONSONANTS) + rng.choice(VOWELS) for _ in range(rng.randint(2, 3))]
+    return "".join(syllables) + (rng.choice(CONSONANTS) if rng.random() < 0.5 else "")
+
+
+def make_name(rng, words):
+    """A random company name such as 'Bedor Kasimun Ltd' from a list of words"""
+    name = [rng.choice(words).capitalize() for _ in range(rng.randint(1, 3))]
+    return " ".join(name + [rng.choice(SUFFIXES).capitalize()])
+
+
+def dense_top(index, needles, top_n):
+    """Reference top_n from the full dense score matrix, with a stable sort per needle"""
+    scores = (index.vectorize(needles) @ index.vectors_t).toarray()
+    results = []
+    for row in np.round(scores, 2):
+        order = np.argsort(-row, kind="stable")[:top_n]
+        results.append([(int(position) + 1, float(row[position])) for position in order])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top-n", type=int, default=1)
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    words = [make_word(rng) for _ in range(20_000)]
+    print(f"tfidf_cosine, top_n={args.top_n}")
+    print(f"{'needles x haystack':>22}{'build s':>10}{'match s':>10}{'needles/s':>12}{'peak MB':>10}")
+    for size in args.sizes:
+        haystack = [make_name(rng, words) for _ in range(size)]
+        needles = [misspell(rng, rng.choice(haystack)) for _ in range(size)]
+
+        start = time.perf_counter()
+        index = TfidfIndex(haystack)
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = index.top(needles, args.top_n)
+        match = time.perf_counter() - start
+
+        tracemalloc.start()
+        index.top(needles[:2_000], args.top_n)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        if size == min(args.sizes) and results != dense_top(index, needles, args.top_n):
+            raise SystemExit(f"Blocked results differ from dense scores at {size:,} items")
+        print(f"{f'{size:,} x {size:,}':>22}{build:>10.2f}{match:>10.2f}{size / match:>12,.0f}"
+              f"{peak / 2 ** 20:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark for examples/text/vader_sentiment/vader_sentiment.py over a column of reviews.
+
+Reports rows/sec for the old per-cell path, which created a SentimentIntensityAnalyzer (and
+so parsed the lexicon) for every text, and for one VADER_SENTIMENT call over the whole
+column with the shared analyzer, with repeated reviews and with every review distinct.
+The per-cell path is timed on a sample of rows. The lexicon is downloaded on the first run
+when nltk has no copy, see boardflare/vader.py.
+
+Usage:
+    python scripts/bench_vader_sentiment.py
+    python scripts/bench_vader_sentiment.py --rows 100000 --sample 100
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src" / "functions" / "exec"))
+sys.path.insert(0, str(ROOT / "examples" / "text" / "vader_sentiment"))
+
+from boardflare.vader import ensure_lexicon, get_analyzer  # noqa: E402
+from vader_sentiment import vader_sentiment  # noqa: E402
+
+OPENINGS = ["I", "We", "My family", "Honestly, I", "The team"]
+VERBS = ["love", "like", "hate", "can't stand", "really enjoy", "am disappointed with"]
+SUBJECTS = ["this product", "the service", "the delivery", "the new app", "the price", "customer support"]
+ENDINGS = [".", "!", "!!", " :)", " :(", ", it was not good.", ", it was GREAT.", " but shipping was slow."]
+
+
+def make_review(rng):
+    """A short review such as 'We really enjoy the service!'"""
+    return f"{rng.choice(OPENINGS)} {rng.choice(VERBS)} {rng.choice(SUBJECTS)}{rng.choice(ENDINGS)}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--sample", type=int, default=200, help="rows timed with the per-cell path")
+    args = parser.parse_args()
+
+    from nltk.sentiment import SentimentIntensityAnalyzer
+
+    ensure_lexicon()
+    rng = random.Random(0)
+    reviews = [make_review(rng) for _ in range(args.rows)]
+    distinct = [f"{review} (order {index})" for index, review in enumerate(reviews)]
+
+    start = time.perf_counter()
+    for review in reviews[:args.sample]:
+        round(SentimentIntensityAnalyzer().polarity_scores(review)["compound"], 4)
+    per_cell = args.sample / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    get_analyzer()
+    first_load = time.perf_counter() - start
+
+    timings = []
+    for label, texts in (("repeated reviews", reviews), ("distinct reviews", distinct)):
+        column = [[text] for text in texts]
+        start = time.perf_counter()
+        scores = vader_sentiment(column)
+        elapsed = time.perf_counter() - start
+        assert len(scores) == len(column)
+        timings.append((label, len(column) / elapsed))
+
+    print(f"{args.rows:,} rows, analyzer created in {first_load * 1000:.0f} ms")
+    print(f"{'path':>32}{'rows/sec':>12}{'speedup':>10}")
+    print(f"{'new analyzer per cell':>32}{per_cell:>12,.0f}{1:>9}x")
+    for label, rate in timings:
+        print(f"{'one call, ' + label:>32}{rate:>12,.0f}{rate / per_cell:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Startup benchmark for the VADER analyzer behind examples/text/vader_sentiment.
+
+Each path is timed in a new interpreter, as a worker starting cold would run it:
+    nltk    nltk.download as vader_sentiment used to call it, which checks the index online,
+            then SentimentIntensityAnalyzer(), which loads and parses the lexicon text
+    lookup  ensure_lexicon, which finds the local copy without the network, then the parse
+    compiled  load_compiled, reading the marshal file written by build_vader_lexicon.py
+Importing nltk is the same for all of them and is reported on its own. The compiled
+lexicon is built first when it is missing, and a path that fails, such as nltk without a
+network, is reported as unavailable.
+
+Usage:
+    python scripts/bench_vader_startup.py
+    python scripts/bench_vader_startup.py --repeat 10
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+EXEC = ROOT / "src" / "functions" / "exec"
+sys.path.insert(0, str(EXEC))
+
+from boardflare.vader import compiled_path, load_compiled  # noqa: E402
+
+PATHS = {
+    "nltk": """
+nltk.data.path.append(str(vader.data_dir()))
+assert nltk.download(vader.LEXICON, download_dir=str(vader.data_dir()), quiet=True)
+from nltk.sentiment import SentimentIntensityAnalyzer
+analyzer = SentimentIntensityAnalyzer()
+""",
+    "lookup": """
+vader.ensure_lexicon()
+from nltk.sentiment import SentimentIntensityAnalyzer
+analyzer = SentimentIntensityAnalyzer()
+""",
+    "compiled": """
+analyzer = vader.load_compiled()
+""",
+}
+
+TEMPLATE = """
+import json, sys, time
+sys.path.insert(0, {exec!r})
+start = time.perf_counter()
+import nltk
+from nltk.sentiment import vader as _
+from boardflare import vader
+imported = time.perf_counter()
+{body}
+loaded = time.perf_counter()
+assert analyzer is not None and analyzer.polarity_scores("good")["compound"] > 0
+print(json.dumps([imported - start, loaded - imported, len(analyzer.lexicon)]))
+"""
+
+
+def run(body):
+    """Import and load seconds and lexicon words of one new interpreter, None when it fails"""
+    script = TEMPLATE.format(exec=str(EXEC), body=body)
+    process = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True)
+    if process.returncode:
+        return None
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="new interpreters per path")
+    args = parser.parse_args()
+
+    if load_compiled() is None:
+        subprocess.run([sys.executable, str(ROOT / "scripts" / "build_vader_lexicon.py")], check=True)
+    print(f"compiled lexicon: {compiled_path()} ({compiled_path().stat().st_size / 1024:,.0f} KB)")
+
+    imports, rows = [], []
+    for label, body in PATHS.items():
+        samples = [run(body) for _ in range(args.repeat)]
+        if None in samples:
+            rows.append((label, None, 0))
+            continue
+        imports.extend(sample[0] for sample in samples)
+        rows.append((label, statistics.median(sample[1] for sample in samples), samples[0][2]))
+
+    print(f"import nltk: {statistics.median(imports) * 1000:,.0f} ms (median of {len(imports)})")
+    print(f"{'path':>10}{'words':>10}{'load ms':>10}{'speedup':>10}")
+    baseline = next(seconds for _, seconds, _ in rows if seconds is not None)
+    for label, seconds, words in rows:
+        if seconds is None:
+            print(f"{label:>10}{'unavailable':>30}")
+        else:
+            print(f"{label:>10}{words:>10,}{seconds * 1000:>10.1f}{baseline / seconds:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
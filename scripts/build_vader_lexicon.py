@@ -0,0 +1,39 @@
+"""
+Build step for the compiled VADER lexicon used by boardflare/vader.py.
+
+Loads nltk's vader_lexicon, downloading it when nltk has no copy, and writes the parsed
+lexicon with the booster, negation and idiom tables to a marshal file that vader_sentiment
+loads instead of parsing the text. The file goes to the local data directory
+(BOARDFLARE_NLTK_DATA_DIR, default ~/.cache/boardflare/nltk_data) unless --output is given.
+
+Usage:
+    python scripts/build_vader_lexicon.py
+    python scripts/build_vader_lexicon.py --output dist/vader_lexicon.marshal
+"""
+import argparse
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src" / "functions" / "exec"))
+
+from boardflare.vader import compile_lexicon, ensure_lexicon, load_compiled  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", type=Path, help="compiled lexicon file to write")
+    args = parser.parse_args()
+
+    from nltk.sentiment import SentimentIntensityAnalyzer
+
+    ensure_lexicon()
+    analyzer = SentimentIntensityAnalyzer()
+    path = compile_lexicon(analyzer, args.output)
+    compiled = load_compiled(path)
+    assert compiled is not None and compiled.lexicon == analyzer.lexicon
+    print(f"{path}: {len(analyzer.lexicon):,} words, {path.stat().st_size / 1024:,.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+# Helper modules shared by the example functions.
+#
+# The exec worker writes this package into Pyodide's file system at startup, so saved
+# functions can import it without a micropip install. Outside the add-in, put the
+# src/functions/exec directory on sys.path.
@@ -0,0 +1,119 @@
+# Row-batched prompting: one chat completion answers many rows.
+#
+# Rows are packed K at a time into a numbered JSON array and the model must answer with a
+# JSON array of {"id", "result"} objects. Each answer is matched back to its row by id
+# (or by position when the count is exact) and checked with the caller's convert
+# function. Rows with a missing or invalid answer are sent again in smaller batches,
+# so one bad row never costs a whole batch. Results come back in row order.
+
+import json
+
+import requests
+
+from boardflare.llm import chat
+
+DEFAULT_BATCH_SIZE = 25
+MAX_ATTEMPTS = 3
+
+
+def batch_prompt(instruction, texts):
+    """Prompt asking for one answer per numbered item"""
+    numbered = [{"id": index + 1, "text": text} for index, text in enumerate(texts)]
+    return (
+        f"{instruction}\n\n"
+        f"Items:\n{json.dumps(numbered, ensure_ascii=False)}\n\n"
+        "Return ONLY a JSON object with a key 'items' whose value is a JSON array with one object per item, "
+        "in the same order, each of the form {\"id\": <item id>, \"result\": <answer for that item>}. "
+        f"The array must contain exactly {len(texts)} objects. Do not include any explanatory text."
+    )
+
+
+def parse_batch(content, count):
+    """Map item position to its raw answer, leaving out anything that cannot be placed"""
+    try:
+        data = json.loads(content)
+    except (TypeError, ValueError):
+        return {}
+    items = data.get("items") if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        return {}
+
+    answers = {}
+    for position, item in enumerate(items):
+        if not isinstance(item, dict) or "result" not in item:
+            continue
+        item_id = item.get("id")
+        if isinstance(item_id, int) and not isinstance(item_id, bool) and 1 <= item_id <= count:
+            index = item_id - 1
+        elif item_id is None and len(items) == count:
+            index = position
+        else:
+            continue
+        # A duplicated id makes both answers ambiguous
+        answers[index] = None if index in answers else item["result"]
+    return {index: answer for index, answer in answers.items() if answer is not None}
+
+
+def run_batched(texts, instruction, model, convert, batch_size=DEFAULT_BATCH_SIZE,
+                tokens_per_item=50, temperature=0.0, api_url=None, api_key=None):
+    """
+    Answer every text with batched requests.
+
+    Args:
+        texts (list): One string per row, empty strings are answered with ""
+        instruction (str): What to do with each item
+        model (str): ID of the model to use
+        convert (callable): Turns a raw answer into the row result, or None if it is invalid
+        batch_size (int): Rows per request
+        tokens_per_item (int): max_tokens budget per row in a request
+
+    Returns:
+        list: One result per text, or an "Error: ..." string for rows that never got a valid answer
+    """
+    options = {key: value for key, value in (("api_url", api_url), ("api_key", api_key)) if value}
+    results = [None] * len(texts)
+    pending = []
+    for index, text in enumerate(texts):
+        if text:
+            pending.append(index)
+        else:
+            results[index] = ""
+
+    last_error = "No valid answer for this row."
+    size = max(1, int(batch_size))
+    for attempt in range(MAX_ATTEMPTS):
+        failed = []
+        for start in range(0, len(pending), size):
+            chunk = pending[start:start + size]
+            try:
+                content = chat(
+                    batch_prompt(instruction, [texts[index] for index in chunk]), model,
+                    temperature=temperature, max_tokens=100 + tokens_per_item * len(chunk),
+                    response_format={"type": "json_object"},
+                    # A retried batch replaces the cached bad response instead of reading it
+                    cache=None if attempt == 0 else "refresh", **options
+                )
+                answers = parse_batch(content, len(chunk))
+            except requests.exceptions.RequestException as e:
+                answers = {}
+                last_error = f"API request failed. {e}"
+
+            for position, index in enumerate(chunk):
+                value = convert(answers[position]) if position in answers else None
+                if value is None:
+                    failed.append(index)
+                else:
+                    results[index] = value
+        pending = failed
+        if not pending:
+            break
+        size = max(1, size // 2)
+
+    for index in pending:
+        results[index] = f"Error: {last_error}"
+    return results
+
+
+def row_texts(rows):
+    """First cell of each row of a 2D range as a string, blanks as empty strings"""
+    return ["" if not row or row[0] is None else str(row[0]).strip() for row in rows]
@@ -0,0 +1,84 @@
+# Chunked execution of prompts over large ranges.
+#
+# split_rows cuts a range into consecutive row blocks whose answer should fit in a token
+# budget. run_blocks runs a task on every block on a thread pool under CPython, and
+# arun_blocks awaits an async task on every block, at most max_workers at once, which
+# also runs them concurrently in Pyodide where there are no threads. A block whose answer
+# fails validation is retried. Results are returned in block order so callers can stitch
+# them back.
+
+import asyncio
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from boardflare.ranges import estimate_tokens
+
+MAX_WORKERS = 4
+MAX_ATTEMPTS = 3
+
+
+class BlockError(Exception):
+    """Raised by a block task when the answer is invalid and the block should be retried"""
+
+
+def split_rows(rows, max_tokens, overhead=50, growth=1.25):
+    """Split rows into blocks whose JSON, grown by `growth` for the answer, fits in max_tokens"""
+    blocks, block, used = [], [], overhead
+    for row in rows:
+        cost = int(estimate_tokens(json.dumps(row, default=str)) * growth) + 1
+        if block and used + cost > max_tokens:
+            blocks.append(block)
+            block, used = [], overhead
+        block.append(row)
+        used += cost
+    if block:
+        blocks.append(block)
+    return blocks
+
+
+def run_blocks(blocks, task, max_workers=MAX_WORKERS, attempts=MAX_ATTEMPTS):
+    """
+    Run task(block, attempt) for every block.
+
+    A BlockError is retried up to `attempts` times, any other exception fails the block
+    at once (API errors have already been retried by the client).
+
+    Returns:
+        list: (result, error) for each block in order, error is None on success
+    """
+    def run(block):
+        error = None
+        for attempt in range(attempts):
+            try:
+                return task(block, attempt), None
+            except BlockError as e:
+                error = e
+            except Exception as e:
+                return None, e
+        return None, error
+
+    # Pyodide cannot start threads, async tasks run concurrently there with arun_blocks
+    if sys.platform == "emscripten" or max_workers <= 1 or len(blocks) <= 1:
+        return [run(block) for block in blocks]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(blocks))) as pool:
+        return list(pool.map(run, blocks))
+
+
+async def arun_blocks(blocks, task, max_workers=MAX_WORKERS, attempts=MAX_ATTEMPTS):
+    """Like run_blocks, for a coroutine function task(block, attempt)"""
+    semaphore = asyncio.Semaphore(max(1, max_workers))
+
+    async def run(block):
+        error = None
+        async with semaphore:
+            for attempt in range(attempts):
+                try:
+                    return await task(block, attempt), None
+                except BlockError as e:
+                    error = e
+                except Exception as e:
+                    return None, e
+        return None, error
+
+    return list(await asyncio.gather(*(run(block) for block in blocks)))
@@ -0,0 +1,203 @@
+# Persistent cache of LLM responses, keyed by the content of the request.
+#
+# The key is a sha256 of the API URL and the whole request payload, including any extra
+# options forwarded to the API, so any change to the prompt or settings is a different
+# entry. Entries expire after a TTL and the oldest are evicted once the cache exceeds its
+# size bound.
+#
+# Under CPython entries are JSON files in a local directory (BOARDFLARE_LLM_CACHE_DIR,
+# default ~/.cache/boardflare/llm). In Pyodide the exec worker loads entries from IndexedDB
+# into a MemoryStore at startup and writes back the changes it drains after each call.
+
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+def cache_key(api_url, payload):
+    """Content address of a chat completions request, every field sent to the API included"""
+    request = {"api_url": api_url, "payload": payload}
+    canonical = json.dumps(request, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class MemoryStore:
+    """Entries held in memory, with a journal of changes for the worker to persist"""
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.puts = {}
+        self.deletes = set()
+
+    def load(self, entries):
+        """Add persisted entries ({key, created, value}) without journaling them"""
+        for entry in sorted(entries, key=lambda entry: entry["created"]):
+            self.entries[entry["key"]] = (entry["created"], entry["value"])
+
+    def items(self):
+        return [(key, created, len(value)) for key, (created, value) in self.entries.items()]
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        return entry[1] if entry else None
+
+    def put(self, key, created, value):
+        self.entries[key] = (created, value)
+        self.puts[key] = {"key": key, "created": created, "value": value}
+        self.deletes.discard(key)
+
+    def delete(self, key):
+        self.entries.pop(key, None)
+        self.puts.pop(key, None)
+        self.deletes.add(key)
+
+    def drain(self):
+        """Return and clear the changes since the last drain"""
+        changes = {"puts": list(self.puts.values()), "deletes": list(self.deletes)}
+        self.puts, self.deletes = {}, set()
+        return changes
+
+
+class FileStore:
+    """Entries as JSON files named by key in a directory"""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def path(self, key):
+        return self.directory / f"{key}.json"
+
+    def items(self):
+        items = []
+        for path in self.directory.glob("*.json"):
+            stat = path.stat()
+            items.append((path.stem, stat.st_mtime, stat.st_size))
+        return items
+
+    def get(self, key):
+        try:
+            return self.path(key).read_text(encoding="utf-8")
+        except OSError:
+            return None
+
+    def put(self, key, created, value):
+        temp = self.path(key).with_suffix(".tmp")
+        temp.write_text(value, encoding="utf-8")
+        os.replace(temp, self.path(key))
+        os.utime(self.path(key), (created, created))
+
+    def delete(self, key):
+        try:
+            self.path(key).unlink()
+        except OSError:
+            pass
+
+
+class ResponseCache:
+    """TTL and size bounded cache of decoded API responses over a store"""
+
+    def __init__(self, store, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        self.store = store
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.index = None
+        self.hits = 0
+        self.misses = 0
+
+    def load_index(self):
+        # Oldest first, (created, size) by key
+        if self.index is None:
+            self.index = OrderedDict(
+                (key, (created, size)) for key, created, size in sorted(self.store.items(), key=lambda item: item[1])
+            )
+        return self.index
+
+    def get(self, key):
+        index = self.load_index()
+        entry = index.get(key)
+        if entry and time.time() - entry[0] <= self.ttl:
+            value = self.store.get(key)
+            if value is not None:
+                self.hits += 1
+                return json.loads(value)
+        if entry:
+            self.remove(key)
+        self.misses += 1
+        return None
+
+    def set(self, key, data):
+        value = json.dumps(data, separators=(",", ":"))
+        if len(value) > self.max_bytes:
+            return
+        index = self.load_index()
+        created = time.time()
+        self.store.put(key, created, value)
+        index.pop(key, None)
+        index[key] = (created, len(value))
+        self.evict()
+
+    def remove(self, key):
+        self.load_index().pop(key, None)
+        self.store.delete(key)
+
+    def evict(self):
+        index = self.load_index()
+        total = sum(size for _, size in index.values())
+        now = time.time()
+        for key, (created, size) in list(index.items()):
+            if total <= self.max_bytes and now - created <= self.ttl:
+                break
+            self.remove(key)
+            total -= size
+
+    def clear(self):
+        for key in list(self.load_index()):
+            self.remove(key)
+
+    def stats(self):
+        index = self.load_index()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(index),
+            "bytes": sum(size for _, size in index.values()),
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl
+        }
+
+
+_cache = None
+
+
+def default_store():
+    if sys.platform == "emscripten":
+        return MemoryStore()
+    directory = os.environ.get("BOARDFLARE_LLM_CACHE_DIR") or Path.home() / ".cache" / "boardflare" / "llm"
+    return FileStore(directory)
+
+
+def get_cache():
+    """The process wide response cache, created on first use"""
+    global _cache
+    if _cache is None:
+        _cache = ResponseCache(default_store())
+    return _cache
+
+
+def load_persisted(entries):
+    """Called by the exec worker at startup with the entries stored in IndexedDB"""
+    cache = get_cache()
+    cache.store.load(entries)
+    cache.index = None
+
+
+def drain_changes():
+    """Called by the exec worker after each call to persist new and evicted entries"""
+    store = get_cache().store
+    return store.drain() if isinstance(store, MemoryStore) else {"puts": [], "deletes": []}
@@ -0,0 +1,213 @@
+# Indexed top-N fuzzy matching against a list of strings.
+#
+# Scoring every needle against every haystack item with textdistance is one Python call per
+# pair. HaystackIndex is built once per haystack and keeps an inverted list per token (a
+# character for the default qval=1, a word or q-gram otherwise) with its count in every
+# item. For a needle, the lists give the size of the multiset intersection I with every
+# item in a few NumPy operations, which is enough to compute the set measures exactly and
+# to bound the edit distances: an edit, substitution or transposition can match at most
+# one more shared token, so similarity <= I / max(len(a), len(b)).
+#
+# Items are then re-scored with textdistance itself in decreasing order of that bound, and
+# a heap keeps the best top_n. The scan stops once no remaining bound can reach the
+# current n-th score after rounding, so the result, ties included, is exactly what
+# scoring every pair and sorting would give.
+#
+# A sheet often has thousands of cells matching against the same reference range, each a
+# separate call. get_haystack keeps the flattened items and their indexes in a per-process
+# LRU keyed by a fingerprint of the cells, so repeated lookups skip all preprocessing.
+# The same entry holds the TF-IDF index of boardflare.tfidf for algorithm="tfidf_cosine".
+
+import heapq
+from collections import OrderedDict
+from itertools import chain
+
+import numpy as np
+import textdistance
+
+# Bound on normalized similarity from the intersection size and the two token counts
+BOUNDS = {
+    "jaccard": lambda inter, a, b: inter / (a + b - inter),
+    "sorensen": lambda inter, a, b: 2 * inter / (a + b),
+    "sorensen_dice": lambda inter, a, b: 2 * inter / (a + b),
+    "cosine": lambda inter, a, b: inter / np.sqrt(a * b),
+    "overlap": lambda inter, a, b: inter / np.minimum(a, b),
+    "levenshtein": lambda inter, a, b: inter / np.maximum(a, b),
+    "damerau_levenshtein": lambda inter, a, b: inter / np.maximum(a, b),
+    "hamming": lambda inter, a, b: inter / np.maximum(a, b),
+}
+EDIT_DISTANCES = {"levenshtein", "damerau_levenshtein", "hamming"}
+DECIMALS = 2
+# Scores are compared after rounding, so a bound this far below the n-th score can still tie it
+ROUND_SLACK = 0.5 * 10 ** -DECIMALS + 1e-9
+TFIDF = "tfidf_cosine"
+# Bounds sorted per needle before falling back to sorting them all
+FIRST_CANDIDATES = 64
+# Bounds of the haystack cache, by number of haystacks and by their total items
+MAX_CACHED_HAYSTACKS = 16
+MAX_CACHED_ITEMS = 1_000_000
+
+haystacks = OrderedDict()
+
+
+def is_indexed(algorithm):
+    """True when text_distance can use a HaystackIndex for this textdistance algorithm"""
+    algo = getattr(textdistance, algorithm, None)
+    if algorithm not in BOUNDS or algo is None:
+        return False
+    # Edit distances are bounded by character counts only
+    return getattr(algo, "qval", 1) == 1 or algorithm not in EDIT_DISTANCES
+
+
+def brute_force_top(algo, needle, items, top_n):
+    """Score every item and return the top_n (position, score) pairs, best first"""
+    scores = [(index + 1, round(algo.normalized_similarity(needle, item), DECIMALS))
+              for index, item in enumerate(items)]
+    return heapq.nlargest(top_n, scores, key=lambda pair: pair[1])
+
+
+class HaystackIndex:
+    """Inverted token lists of a haystack for one textdistance algorithm"""
+
+    def __init__(self, items, algorithm):
+        self.items = [str(item) for item in items]
+        self.algorithm = algorithm
+        self.algo = getattr(textdistance, algorithm)
+        self.bound = BOUNDS[algorithm]
+        self.as_set = bool(getattr(self.algo, "as_set", False))
+
+        postings = {}
+        sizes = np.empty(len(self.items), dtype=np.float64)
+        for index, item in enumerate(self.items):
+            counter = self.counter(item)
+            sizes[index] = self.size(counter)
+            for token, count in counter.items():
+                postings.setdefault(token, ([], []))
+                postings[token][0].append(index)
+                postings[token][1].append(count)
+        self.sizes = sizes
+        self.postings = {
+            token: (np.array(indexes, dtype=np.int64), np.array(counts, dtype=np.float64))
+            for token, (indexes, counts) in postings.items()
+        }
+
+    def __len__(self):
+        return len(self.items)
+
+    def counter(self, text):
+        return self.algo._get_counters(text)[0]
+
+    def size(self, counter):
+        return len(counter) if self.as_set else sum(counter.values())
+
+    def bounds(self, needle):
+        """Upper bound of the needle's normalized similarity with every item"""
+        counter = self.counter(needle)
+        inter = np.zeros(len(self.items), dtype=np.float64)
+        for token, count in counter.items():
+            posting = self.postings.get(token)
+            if posting is not None:
+                indexes, counts = posting
+                inter[indexes] += 1.0 if self.as_set else np.minimum(counts, count)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            bounds = self.bound(inter, float(self.size(counter)), self.sizes)
+        # An empty side makes the formulas undefined, those items are always scored
+        return np.where(np.isfinite(bounds), bounds, 1.0)
+
+    def top(self, needle, top_n):
+        """The top_n (position, score) pairs for a needle, best first, as brute_force_top returns them"""
+        needle = str(needle)
+        top_n = max(0, int(top_n))
+        if top_n == 0 or not self.items:
+            return []
+
+        bounds = self.bounds(needle)
+        first = min(len(bounds), max(FIRST_CANDIDATES, 4 * top_n))
+        if first < len(bounds):
+            head = np.argpartition(-bounds, first - 1)[:first]
+            order = head[np.argsort(-bounds[head], kind="stable")]
+        else:
+            order = np.argsort(-bounds, kind="stable")
+
+        heap = []
+        scanned = 0
+        while True:
+            for index in order.tolist():
+                bound = bounds[index]
+                if len(heap) >= top_n and bound < heap[0][0] - ROUND_SLACK:
+                    return self.ranked(heap)
+                score = round(self.algo.normalized_similarity(needle, self.items[index]), DECIMALS)
+                entry = (score, -index)
+                if len(heap) < top_n:
+                    heapq.heappush(heap, entry)
+                elif entry > heap[0]:
+                    heapq.heapreplace(heap, entry)
+            scanned += len(order)
+            if scanned >= len(bounds):
+                return self.ranked(heap)
+            # The first candidates did not settle the top_n, scan the rest in bound order
+            rest = np.ones(len(bounds), dtype=bool)
+            rest[order] = False
+            remaining = np.flatnonzero(rest)
+            order = remaining[np.argsort(-bounds[remaining], kind="stable")]
+
+    @staticmethod
+    def ranked(heap):
+        # Highest score first, lower position first on ties, as a stable sort would give
+        return [(-negative_index + 1, score) for score, negative_index in sorted(heap, reverse=True)]
+
+
+class Haystack:
+    """The non-empty cells of a range as strings, with an index per algorithm built on first use"""
+
+    def __init__(self, cells):
+        self.cells = cells
+        self.items = [str(cell) for cell in cells if cell is not None]
+        self.indexes = {}
+
+    def __len__(self):
+        return len(self.items)
+
+    def index(self, algorithm):
+        if algorithm not in self.indexes:
+            if algorithm == TFIDF:
+                # scipy is only imported when TF-IDF matching is used, the exec worker
+                # loads it on the first call that needs it (ON_DEMAND_PACKAGES)
+                from boardflare.tfidf import TfidfIndex
+                self.indexes[algorithm] = TfidfIndex(self.items)
+            else:
+                self.indexes[algorithm] = HaystackIndex(self.items, algorithm)
+        return self.indexes[algorithm]
+
+
+def fingerprint(cells):
+    """Cheap content key of a tuple of cells, types included so 1, 1.0 and True differ"""
+    return len(cells), hash(cells), hash(tuple(map(type, cells)))
+
+
+def get_haystack(haystack):
+    """The Haystack for a 2D list, from the cache when the same cells were seen before"""
+    cells = tuple(chain.from_iterable(haystack))
+    try:
+        key = fingerprint(cells)
+    except TypeError:
+        # Unhashable cells are not from Excel, preprocess them without caching
+        return Haystack(cells)
+
+    cached = haystacks.get(key)
+    if cached is not None and cached.cells == cells:
+        haystacks.move_to_end(key)
+        return cached
+
+    entry = Haystack(cells)
+    if len(entry) <= MAX_CACHED_ITEMS:
+        haystacks[key] = entry
+        total = sum(len(cached) for cached in haystacks.values())
+        while len(haystacks) > MAX_CACHED_HAYSTACKS or total > MAX_CACHED_ITEMS:
+            total -= len(haystacks.popitem(last=False)[1])
+    return entry
+
+
+def clear_haystacks():
+    """Empty the haystack cache"""
+    haystacks.clear()
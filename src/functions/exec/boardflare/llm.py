@@ -0,0 +1,371 @@
+# Client for the OpenAI compatible chat completions API used by the ai_* examples.
+#
+# One requests.Session is kept per API URL and key so connections are reused. Calls that
+# fail with a connection error, a timeout, 429 or a 5xx response are retried with
+# exponential backoff and full jitter, waiting at least as long as the server's
+# Retry-After header asks. Every request has a connect and read timeout. Latency and the
+# token usage reported by the API are accumulated in get_stats().
+#
+# Responses are kept in the persistent boardflare.cache. Requests at temperature 0 are
+# cached by default, sampled ones only when called with cache=True. A caller that rejects
+# a reply retries with cache="refresh", which skips the cached entry and replaces it.
+#
+# achat is the async version of chat for async def functions. In Pyodide it sends with
+# pyfetch, so concurrent calls overlap instead of each blocking the worker in turn.
+#
+# stream_chat and astream_chat request "stream": true and yield the reply text in pieces as
+# the server sends them. Streamed replies are not cached. In Pyodide, requests cannot read
+# a response incrementally, so astream_chat reads the fetch body stream there instead.
+
+import asyncio
+import json
+import random
+import sys
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+
+from boardflare.cache import cache_key, get_cache
+from boardflare.stream import CompletionStream
+
+DEFAULT_API_URL = "https://llm.boardflare.com"
+DEFAULT_API_KEY = "cV4a59t1wjYGs...."
+
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+DEFAULT_TIMEOUT = (10, 60)  # seconds to connect, seconds to read
+DEFAULT_MAX_RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+
+
+def retry_after_seconds(response):
+    """Seconds to wait from a Retry-After header (delta seconds or HTTP date), or None"""
+    # requests' headers match any case, pyfetch's are lowercase
+    headers = response.headers if response is not None else {}
+    value = headers.get("Retry-After") or headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, retry_after=None):
+    """Full jitter exponential backoff, never shorter than the server's Retry-After"""
+    delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, BACKOFF_MAX))
+    return delay
+
+
+class LLMClient:
+    """Chat completions client with a pooled session, retries and usage stats"""
+
+    def __init__(self, api_url=DEFAULT_API_URL, api_key=DEFAULT_API_KEY,
+                 timeout=DEFAULT_TIMEOUT, max_retries=DEFAULT_MAX_RETRIES):
+        self.api_url = api_url
+        self.api_key = api_key
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+            "Accept": "application/json"
+        }
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.lock = threading.Lock()
+        self.stats = {
+            "requests": 0,
+            "cache_hits": 0,
+            "retries": 0,
+            "failures": 0,
+            "latency_total": 0.0,
+            "latency_max": 0.0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "total_tokens": 0
+        }
+
+    def record(self, latency, usage=None, retried=False, failed=False):
+        with self.lock:
+            stats = self.stats
+            stats["requests"] += 1
+            stats["retries"] += int(retried)
+            stats["failures"] += int(failed)
+            stats["latency_total"] += latency
+            stats["latency_max"] = max(stats["latency_max"], latency)
+            for key in ("prompt_tokens", "completion_tokens", "total_tokens"):
+                stats[key] += (usage or {}).get(key) or 0
+
+    def send(self, payload, stream=False):
+        """POST a payload, retrying failed and throttled calls, and return (response, start time)"""
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            response = None
+            try:
+                response = self.session.post(self.api_url, json=payload, timeout=self.timeout, stream=stream)
+                if response.status_code not in RETRY_STATUSES:
+                    response.raise_for_status()
+                    return response, start
+                error = requests.exceptions.HTTPError(
+                    f"{response.status_code} Error: {response.reason} for url: {response.url}",
+                    response=response
+                )
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                error = e
+            except requests.exceptions.RequestException:
+                self.record(time.perf_counter() - start, failed=True)
+                raise
+
+            if attempt >= self.max_retries:
+                self.record(time.perf_counter() - start, failed=True)
+                raise error
+            self.record(time.perf_counter() - start, retried=True)
+            time.sleep(backoff_delay(attempt, retry_after_seconds(response)))
+            attempt += 1
+
+    def post(self, payload):
+        """POST a chat completions payload and return the decoded JSON response"""
+        response, start = self.send(payload)
+        try:
+            data = response.json()
+        except requests.exceptions.RequestException:
+            self.record(time.perf_counter() - start, failed=True)
+            raise
+        self.record(time.perf_counter() - start, data.get("usage"))
+        return data
+
+    async def apost(self, payload):
+        """Async version of post, sending with pyfetch in Pyodide and on a thread elsewhere"""
+        if sys.platform != "emscripten":
+            return await asyncio.to_thread(self.post, payload)
+
+        from pyodide.http import pyfetch
+
+        body = json.dumps(payload)
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            response = None
+            try:
+                response = await asyncio.wait_for(
+                    pyfetch(self.api_url, method="POST", headers=self.headers, body=body), sum(self.timeout))
+            except asyncio.TimeoutError:
+                error = requests.exceptions.Timeout(f"No response from {self.api_url} in {sum(self.timeout)} seconds")
+            except OSError as e:
+                error = requests.exceptions.ConnectionError(str(e))
+            else:
+                error = requests.exceptions.HTTPError(
+                    f"{response.status} Error: {response.status_text} for url: {response.url}")
+                if response.ok:
+                    data = await response.json()
+                    self.record(time.perf_counter() - start, data.get("usage"))
+                    return data
+                if response.status not in RETRY_STATUSES:
+                    self.record(time.perf_counter() - start, failed=True)
+                    raise error
+
+            if attempt >= self.max_retries:
+                self.record(time.perf_counter() - start, failed=True)
+                raise error
+            self.record(time.perf_counter() - start, retried=True)
+            await asyncio.sleep(backoff_delay(attempt, retry_after_seconds(response)))
+            attempt += 1
+
+    def cached(self, payload, cache):
+        """
+        The cache key of a payload and its cached response, if any. The key is None when the
+        response is not to be cached, and cache="refresh" never returns the cached response.
+        """
+        if cache is None:
+            cache = payload.get("temperature") == 0
+        if not cache:
+            return None, None
+        key = cache_key(self.api_url, payload)
+        if cache == "refresh":
+            return key, None
+        data = get_cache().get(key)
+        if data is not None:
+            with self.lock:
+                self.stats["cache_hits"] += 1
+        return key, data
+
+    def complete(self, payload, cache=None):
+        """
+        Return the response for a payload from the cache, or POST it and cache the result.
+        With cache="refresh" the request is always sent and its response replaces the entry.
+        """
+        key, data = self.cached(payload, cache)
+        if data is None:
+            data = self.post(payload)
+            if key is not None:
+                get_cache().set(key, data)
+        return data
+
+    async def acomplete(self, payload, cache=None):
+        """Async version of complete"""
+        key, data = self.cached(payload, cache)
+        if data is None:
+            data = await self.apost(payload)
+            if key is not None:
+                get_cache().set(key, data)
+        return data
+
+    def payload(self, messages, model, temperature=0.0, max_tokens=None, response_format=None, **options):
+        if isinstance(messages, str):
+            messages = [{"role": "user", "content": messages}]
+        payload = {"messages": messages, "temperature": temperature, "model": model, **options}
+        if max_tokens is not None:
+            payload["max_tokens"] = max_tokens
+        if response_format is not None:
+            payload["response_format"] = response_format
+        return payload
+
+    def chat(self, messages, model, temperature=0.0, max_tokens=None, response_format=None, cache=None, **options):
+        """Send chat messages and return the content of the first choice"""
+        payload = self.payload(messages, model, temperature, max_tokens, response_format, **options)
+        data = self.complete(payload, cache)
+        return data["choices"][0]["message"]["content"]
+
+    async def achat(self, messages, model, temperature=0.0, max_tokens=None, response_format=None, cache=None,
+                    **options):
+        """Async version of chat"""
+        payload = self.payload(messages, model, temperature, max_tokens, response_format, **options)
+        data = await self.acomplete(payload, cache)
+        return data["choices"][0]["message"]["content"]
+
+    def stream(self, messages, model, temperature=0.0, max_tokens=None, response_format=None, **options):
+        """Send chat messages with stream=True and yield the reply text as it arrives"""
+        payload = self.payload(messages, model, temperature, max_tokens, response_format, stream=True, **options)
+        response, start = self.send(payload, stream=True)
+        completion = CompletionStream()
+        try:
+            # A server that ignores stream answers with the whole completion
+            if "text/event-stream" not in response.headers.get("Content-Type", ""):
+                data = response.json()
+                completion.usage = data.get("usage")
+                yield data["choices"][0]["message"]["content"]
+                return
+            for chunk in response.iter_content(chunk_size=None):
+                yield from completion.feed(chunk)
+                if completion.done:
+                    break
+        finally:
+            response.close()
+            self.record(time.perf_counter() - start, completion.usage)
+
+    async def astream(self, messages, model, temperature=0.0, max_tokens=None, response_format=None, **options):
+        """Async version of stream, which also streams in Pyodide"""
+        if sys.platform != "emscripten":
+            # requests blocks, so each piece is read on a thread
+            pieces = self.stream(messages, model, temperature, max_tokens, response_format, **options)
+            try:
+                while (text := await asyncio.to_thread(next, pieces, None)) is not None:
+                    yield text
+            finally:
+                pieces.close()
+            return
+
+        from pyodide.http import pyfetch
+
+        payload = self.payload(messages, model, temperature, max_tokens, response_format, stream=True, **options)
+        start = time.perf_counter()
+        try:
+            response = await pyfetch(self.api_url, method="POST", headers=self.headers, body=json.dumps(payload))
+        except OSError as e:
+            self.record(time.perf_counter() - start, failed=True)
+            raise requests.exceptions.ConnectionError(str(e))
+        if not response.ok:
+            self.record(time.perf_counter() - start, failed=True)
+            raise requests.exceptions.HTTPError(
+                f"{response.status} Error: {response.status_text} for url: {response.url}")
+
+        completion = CompletionStream()
+        try:
+            if "text/event-stream" not in (response.headers.get("content-type") or ""):
+                data = await response.json()
+                completion.usage = data.get("usage")
+                yield data["choices"][0]["message"]["content"]
+                return
+            reader = response.js_response.body.getReader()
+            while not completion.done:
+                chunk = await reader.read()
+                if chunk.done:
+                    break
+                for text in completion.feed(chunk.value.to_bytes()):
+                    yield text
+        finally:
+            self.record(time.perf_counter() - start, completion.usage)
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats)
+        completed = stats["requests"] - stats["retries"] - stats["failures"]
+        stats["latency_mean"] = stats["latency_total"] / stats["requests"] if stats["requests"] else 0.0
+        stats["completed"] = completed
+        return stats
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(api_url=DEFAULT_API_URL, api_key=DEFAULT_API_KEY):
+    """Shared client for an API URL and key, created on first use"""
+    with _clients_lock:
+        client = _clients.get((api_url, api_key))
+        if client is None:
+            client = _clients[(api_url, api_key)] = LLMClient(api_url, api_key)
+        return client
+
+
+def chat(messages, model, temperature=0.0, max_tokens=None, response_format=None,
+         api_url=DEFAULT_API_URL, api_key=DEFAULT_API_KEY, cache=None, **options):
+    """Send chat messages with the shared client for api_url and return the reply text"""
+    return get_client(api_url, api_key).chat(
+        messages, model, temperature=temperature, max_tokens=max_tokens,
+        response_format=response_format, cache=cache, **options
+    )
+
+
+async def achat(messages, model, temperature=0.0, max_tokens=None, response_format=None,
+                api_url=DEFAULT_API_URL, api_key=DEFAULT_API_KEY, cache=None, **options):
+    """Async version of chat, for async def functions whose calls should overlap in Pyodide"""
+    return await get_client(api_url, api_key).achat(
+        messages, model, temperature=temperature, max_tokens=max_tokens,
+        response_format=response_format, cache=cache, **options
+    )
+
+
+def stream_chat(messages, model, temperature=0.0, max_tokens=None, response_format=None,
+                api_url=DEFAULT_API_URL, api_key=DEFAULT_API_KEY, **options):
+    """Stream a reply with the shared client for api_url, yielding the text as it arrives"""
+    return get_client(api_url, api_key).stream(
+        messages, model, temperature=temperature, max_tokens=max_tokens,
+        response_format=response_format, **options
+    )
+
+
+def astream_chat(messages, model, temperature=0.0, max_tokens=None, response_format=None,
+                 api_url=DEFAULT_API_URL, api_key=DEFAULT_API_KEY, **options):
+    """Async iterator over the pieces of a streamed reply, for async def functions and Pyodide"""
+    return get_client(api_url, api_key).astream(
+        messages, model, temperature=temperature, max_tokens=max_tokens,
+        response_format=response_format, **options
+    )
+
+
+def get_stats():
+    """Request, retry, latency and token totals for every shared client, by API URL"""
+    with _clients_lock:
+        clients = list(_clients.values())
+    return {client.api_url: client.get_stats() for client in clients}
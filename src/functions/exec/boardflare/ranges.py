@@ -0,0 +1,154 @@
+# Compact encodings of Excel ranges for LLM prompts.
+#
+# json.dumps(data, indent=2) spends most of its tokens on indentation, brackets and quotes.
+# encode_range writes a 2D range as CSV, TSV, a markdown table or header-once records (the
+# header row once, then one compact JSON array per row) and, in auto mode, keeps whichever
+# is cheapest by estimate_tokens. When the range does not fit a token budget, rows are cut
+# from the end or sampled evenly and a marker line says how many were left out.
+
+import csv
+import io
+import json
+import re
+
+DEFAULT_MAX_TOKENS = 8000
+MODES = ("csv", "tsv", "markdown", "records")
+MODE_LABELS = {
+    "csv": "CSV",
+    "tsv": "tab separated values",
+    "markdown": "markdown table",
+    "records": "column names, then one JSON array per row"
+}
+MARKER_TOKENS = 20
+
+# Letters, digit groups of up to three, whitespace runs and single symbols roughly follow
+# how BPE tokenizers split text
+TOKEN_PATTERN = re.compile(r"[^\W\d_]+|\d{1,3}|\s+|[^\w\s]|_")
+
+
+def estimate_tokens(text):
+    """Approximate token count of text, without loading a tokenizer"""
+    tokens = 0
+    for piece in TOKEN_PATTERN.findall(str(text)):
+        if piece == " ":
+            # A single space is merged into the following word
+            continue
+        if piece.isspace():
+            tokens += piece.count("\n") or 1
+        elif piece[0].isalpha():
+            tokens += (len(piece) + 4) // 5
+        else:
+            tokens += 1
+    return tokens
+
+
+def as_rows(data):
+    """A scalar, a list or a 2D list as a 2D list"""
+    if not isinstance(data, list):
+        return [[data]]
+    if not all(isinstance(row, list) for row in data):
+        return [list(data)]
+    return data
+
+
+def has_header(rows):
+    """True when the first row is all non-empty text and there are rows below it"""
+    return len(rows) > 1 and bool(rows[0]) and all(isinstance(cell, str) and cell.strip() for cell in rows[0])
+
+
+def cell_text(value):
+    """A cell as text, blanks empty and whole floats without the trailing .0"""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def delimited_line(row, delimiter):
+    buffer = io.StringIO()
+    csv.writer(buffer, delimiter=delimiter, lineterminator="").writerow([cell_text(cell) for cell in row])
+    return buffer.getvalue()
+
+
+def markdown_line(row):
+    cells = (cell_text(cell).replace("|", "\\|").replace("\n", " ") for cell in row)
+    return "| " + " | ".join(cells) + " |"
+
+
+def encode_lines(rows, mode, header):
+    """Head lines (header) and body lines (one per data row) of the range in an encoding"""
+    head, body = (rows[:1], rows[1:]) if header else ([], rows)
+    if mode in ("csv", "tsv"):
+        delimiter = "," if mode == "csv" else "\t"
+        return [delimited_line(row, delimiter) for row in head], [delimited_line(row, delimiter) for row in body]
+    if mode == "markdown":
+        width = max((len(row) for row in rows), default=0)
+        columns = head[0] if head else [f"Column {index + 1}" for index in range(width)]
+        return [markdown_line(columns), "|" + "---|" * len(columns)], [markdown_line(row) for row in body]
+    if mode == "records":
+        compact = dict(separators=(",", ":"), ensure_ascii=False, default=str)
+        return ([f"columns: {json.dumps(head[0], **compact)}"] if head else []), [json.dumps(row, **compact) for row in body]
+    raise ValueError(f"Unknown range encoding '{mode}', expected one of {', '.join(MODES)} or auto.")
+
+
+def select_rows(costs, budget, sample):
+    """Indexes of the body rows to keep within budget, the first rows or an even sample"""
+    if not sample:
+        kept, used = [], 0
+        for index, cost in enumerate(costs):
+            if used + cost > budget:
+                break
+            kept.append(index)
+            used += cost
+        return kept
+
+    count = min(len(costs), max(0, budget * len(costs) // max(1, sum(costs))))
+    while count > 0:
+        step = len(costs) / count
+        kept = [int(position * step) for position in range(count)]
+        if sum(costs[index] for index in kept) <= budget:
+            return kept
+        count -= 1
+    return []
+
+
+def encode_range(data, mode="auto", max_tokens=DEFAULT_MAX_TOKENS, header=None, sample=False):
+    """
+    Encode a range as compact text for a prompt.
+
+    Args:
+        data (list): 2D list from an Excel range
+        mode (str): csv, tsv, markdown, records, or auto for the cheapest of them
+        max_tokens (int): Token budget for the encoded range, None for no limit
+        header (bool): Whether the first row is a header, None to detect it
+        sample (bool): Keep an even sample of rows instead of the first rows when over budget
+
+    Returns:
+        tuple: (text, mode) where mode is the encoding used, see MODE_LABELS
+    """
+    rows = as_rows(data)
+    if header is None:
+        header = has_header(rows)
+
+    best = None
+    for candidate in (MODES if mode == "auto" else (mode,)):
+        head, body = encode_lines(rows, candidate, header)
+        head_cost = sum(estimate_tokens(line) + 1 for line in head)
+        costs = [estimate_tokens(line) + 1 for line in body]
+        total = head_cost + sum(costs)
+        if best is None or total < best[0]:
+            best = (total, candidate, head, body, head_cost, costs)
+    total, mode, head, body, head_cost, costs = best
+
+    if max_tokens is None or total <= max_tokens:
+        return "\n".join(head + body), mode
+
+    kept = select_rows(costs, max(0, max_tokens - head_cost - MARKER_TOKENS), sample)
+    lines = head + [body[index] for index in kept]
+    omitted = len(body) - len(kept)
+    if sample:
+        lines.append(f"[{len(kept)} of {len(body)} rows shown, sampled evenly, {omitted} rows omitted]")
+    else:
+        lines.append(f"[{omitted} of {len(body)} rows omitted]")
+    return "\n".join(lines), mode
@@ -0,0 +1,130 @@
+# Incremental parsing of streamed chat completions.
+#
+# With "stream": true the chat completions API answers with server-sent events, one JSON
+# chunk per event holding the next piece of the reply in choices[0].delta.content, and a
+# final "data: [DONE]". CompletionStream turns the raw bytes into those text deltas as they
+# arrive, whatever the network chunk boundaries. JsonItemsParser reads the text of a JSON
+# mode reply ({"items": [...]}) and returns each element of the items array as soon as it
+# is complete, so rows can be shown before the reply ends.
+
+import codecs
+import json
+
+
+class SSEParser:
+    """Split a text stream into the data of its server-sent events"""
+
+    def __init__(self):
+        self.buffer = ""
+        self.data = []
+
+    def feed(self, text):
+        """Add text and return the data of every event it completes"""
+        self.buffer += text
+        events = []
+        while True:
+            end = self.buffer.find("\n")
+            if end < 0:
+                return events
+            line = self.buffer[:end].rstrip("\r")
+            self.buffer = self.buffer[end + 1:]
+            if not line:
+                # A blank line dispatches the event
+                if self.data:
+                    events.append("\n".join(self.data))
+                    self.data = []
+            elif line.startswith("data:"):
+                value = line[5:]
+                self.data.append(value[1:] if value.startswith(" ") else value)
+            # Comments (":") and the event, id and retry fields are not used
+
+
+class CompletionStream:
+    """Content deltas and usage of a streamed chat completion, from its raw bytes"""
+
+    def __init__(self):
+        self.decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self.events = SSEParser()
+        self.usage = None
+        self.done = False
+
+    def feed(self, chunk):
+        """Add bytes received from the API and return the text deltas they complete"""
+        texts = []
+        for data in self.events.feed(self.decoder.decode(chunk)):
+            if data.strip() == "[DONE]":
+                self.done = True
+                break
+            try:
+                event = json.loads(data)
+            except ValueError:
+                continue
+            self.usage = event.get("usage") or self.usage
+            choices = event.get("choices") or []
+            content = (choices[0].get("delta") or {}).get("content") if choices else None
+            if content:
+                texts.append(content)
+        return texts
+
+
+class JsonItemsParser:
+    """
+    Return the elements of the first array in a JSON reply as each one completes.
+
+    The first array opened at the top level or directly inside the top level object is
+    taken as the items array, so both {"items": [...]} and a bare [...] work.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.position = 0
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.items_depth = None
+        self.item_start = None
+        self.done = False
+
+    def finish_item(self, end, items):
+        text = self.buffer[self.item_start:end].strip()
+        self.item_start = None
+        if text:
+            try:
+                items.append(json.loads(text))
+            except ValueError:
+                pass
+
+    def feed(self, text):
+        """Add reply text and return the items it completes"""
+        self.buffer += text
+        items = []
+        buffer = self.buffer
+        while self.position < len(buffer) and not self.done:
+            char = buffer[self.position]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif self.items_depth is not None and self.depth == self.items_depth and char in ",]":
+                if self.item_start is not None:
+                    self.finish_item(self.position, items)
+                if char == "]":
+                    self.depth -= 1
+                    self.done = True
+            else:
+                if (self.items_depth is not None and self.depth == self.items_depth
+                        and self.item_start is None and not char.isspace()):
+                    self.item_start = self.position
+                if char == '"':
+                    self.in_string = True
+                elif char in "[{":
+                    self.depth += 1
+                    if char == "[" and self.items_depth is None and self.depth <= 2:
+                        self.items_depth = self.depth
+                elif char in "]}":
+                    self.depth -= 1
+            self.position += 1
+        return items
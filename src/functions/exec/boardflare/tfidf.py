@@ -0,0 +1,235 @@
+# Character n-gram TF-IDF cosine similarity for bulk matching.
+#
+# Each string is lowercased, padded with a space at both ends and split into overlapping
+# character trigrams. TfidfIndex weights the trigram counts of the haystack by smoothed
+# inverse document frequency, idf = ln((1 + n) / (1 + df)) + 1, and normalizes every row,
+# so the cosine similarity of all needles with all items is one sparse matrix product.
+#
+# Most pairs of names share only common n-grams and score low, so the full product is
+# mostly wasted. For each needle, the items sharing its PROBE_GRAMS rarest n-grams are
+# found with a small sparse product, the best few are scored exactly, and their n-th best
+# score is a lower bound t on the needle's n-th score. An item sharing none of the
+# needle's n-grams up to some point, rarest first, scores at most the norm of the
+# remaining n-grams (Cauchy-Schwarz), so only items sharing the n-grams up to where that
+# norm drops below t are candidates, and only those whose partial score plus that norm
+# reaches t are scored exactly. When the candidates hold the top_n the needle is settled,
+# otherwise it is scored against every item in blocks small enough that a dense block of
+# scores stays under BLOCK_CELLS values. Memory is bounded by the blocks, not by
+# needles x haystack, and the results are those of scoring every pair.
+
+from itertools import chain
+
+import numpy as np
+from scipy import sparse
+
+NGRAM = 3
+DECIMALS = 2
+# Scores held at once, needles per block is this divided by the haystack size
+BLOCK_CELLS = 1 << 21
+# Needles matched at once on candidates, this divided by the haystack size
+CANDIDATE_CELLS = 1 << 23
+# Rarest n-grams of a needle whose items give the first lower bound, and how many of
+# those items beyond top_n are scored for it
+PROBE_GRAMS = 3
+PROBE_EXTRA = 4
+# Resolution of the partial scores used to pick those items
+PROBE_SCALE = 10_000
+
+
+def ngrams(text, n=NGRAM):
+    """Overlapping character n-grams of the lowercased text padded with spaces, none for blank text"""
+    text = str(text).strip().lower()
+    if not text:
+        return []
+    padded = f" {text} "
+    if len(padded) <= n:
+        return [padded]
+    return [padded[start:start + n] for start in range(len(padded) - n + 1)]
+
+
+def normalize_rows(matrix):
+    """Scale the rows of a CSR matrix to unit length, empty rows are left as they are"""
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.diags(1.0 / norms) @ matrix
+
+
+class TfidfIndex:
+    """TF-IDF weighted character n-gram vectors of a haystack"""
+
+    def __init__(self, items, ngram=NGRAM):
+        self.items = [str(item) for item in items]
+        self.ngram = ngram
+        self.vocabulary = {}
+
+        rows, columns = [], []
+        for row, item in enumerate(self.items):
+            grams = ngrams(item, ngram)
+            columns.extend(self.vocabulary.setdefault(gram, len(self.vocabulary)) for gram in grams)
+            rows.extend([row] * len(grams))
+        counts = sparse.csr_matrix(
+            (np.ones(len(columns)), (np.array(rows, dtype=np.int64), np.array(columns, dtype=np.int64))),
+            shape=(len(self.items), len(self.vocabulary)))
+        counts.sum_duplicates()
+
+        self.document_frequency = np.bincount(counts.indices, minlength=len(self.vocabulary))
+        self.idf = np.log((1 + len(self.items)) / (1 + self.document_frequency)) + 1
+        self.unseen_idf = np.log(1 + len(self.items)) + 1
+        self.vectors = normalize_rows(sparse.csr_matrix(counts.multiply(self.idf)))
+        # Transposed once so every block is a CSR x CSR product
+        self.vectors_t = sparse.csr_matrix(self.vectors.T)
+
+    def __len__(self):
+        return len(self.items)
+
+    def vectorize(self, texts):
+        """Unit length TF-IDF vectors of texts over the haystack vocabulary, as a CSR matrix"""
+        grams = [ngrams(text, self.ngram) for text in texts]
+        rows = np.repeat(np.arange(len(texts)), [len(text_grams) for text_grams in grams])
+        flat = list(chain.from_iterable(grams))
+        lookup = self.vocabulary.get
+        columns = np.fromiter((lookup(gram, -1) for gram in flat), dtype=np.int64, count=len(flat))
+        # N-grams that no item has get columns past the vocabulary, they still count
+        # toward the needle's length and are dropped after normalizing
+        unseen = {}
+        for index in np.flatnonzero(columns < 0).tolist():
+            columns[index] = len(self.vocabulary) + unseen.setdefault(flat[index], len(unseen))
+        counts = sparse.csr_matrix((np.ones(len(flat)), (rows, columns)),
+                                   shape=(len(texts), len(self.vocabulary) + len(unseen)))
+        counts.sum_duplicates()
+        idf = np.concatenate([self.idf, np.full(len(unseen), self.unseen_idf)])
+        vectors = normalize_rows(sparse.csr_matrix(counts.multiply(idf)))
+        return sparse.csr_matrix(vectors[:, :len(self.vocabulary)])
+
+    def rounded(self, scores):
+        return np.rint(scores * 10 ** DECIMALS).astype(np.int64)
+
+    def rarest_first(self, queries):
+        """
+        Entries of query vectors by row, rarest n-gram first, with their rank in the row and the
+        norm of the row's entries from each one on.
+        """
+        entries = sparse.coo_matrix(queries)
+        order = np.lexsort((self.document_frequency[entries.col], entries.row))
+        rows, columns, values = entries.row[order].astype(np.int64), entries.col[order], entries.data[order]
+        counts = np.bincount(rows, minlength=queries.shape[0])
+        starts = np.cumsum(counts) - counts
+        squares = values * values
+        before = np.cumsum(squares) - squares
+        before -= before[starts[rows]]
+        totals = np.bincount(rows, weights=squares, minlength=queries.shape[0])
+        remaining = np.sqrt(np.maximum(totals[rows] - before, 0.0))
+        return rows, columns, values, np.arange(len(rows)) - starts[rows], remaining
+
+    def exact(self, queries, rows, positions):
+        """Rounded scores of query rows with item positions, pair by pair"""
+        return self.rounded(np.asarray(queries[rows].multiply(self.vectors[positions]).sum(axis=1)).ravel())
+
+    def ranked(self, rows, positions, scores, size, scale=10 ** DECIMALS):
+        """
+        Pairs by row, highest score first with lower positions first on ties, with each row's
+        count and each pair's rank in its row. Scores are integers from 0 to scale.
+        """
+        keys = (rows * (scale + 1) + (scale - scores)) * len(self.items) + positions
+        order = np.argsort(keys)
+        rows, positions, scores = rows[order], positions[order], scores[order]
+        counts = np.bincount(rows, minlength=size)
+        rank = np.arange(len(rows)) - (np.cumsum(counts) - counts)[rows]
+        return rows, positions, scores, counts, rank
+
+    def candidate_top(self, queries, top_n):
+        """
+        Match query vectors on candidates.
+
+        Returns the rows settled by their candidates, and their top_n positions and rounded
+        scores as (rows, top_n) arrays.
+        """
+        size = queries.shape[0]
+        rows, columns, values, order, remaining = self.rarest_first(queries)
+
+        def partial(mask):
+            prefix = sparse.csr_matrix((values[mask], (rows[mask], columns[mask])), shape=queries.shape)
+            return sparse.coo_matrix(prefix @ self.vectors_t)
+
+        # The best items on the rarest n-grams, scored exactly, bound the n-th best score
+        # from below. Items scoring under the threshold round below it and are not in the top_n.
+        probe = partial(order < PROBE_GRAMS)
+        pairs, positions, _, _, rank = self.ranked(
+            probe.row.astype(np.int64), probe.col.astype(np.int64),
+            np.rint(probe.data * PROBE_SCALE).astype(np.int64), size, PROBE_SCALE)
+        best = rank < top_n + PROBE_EXTRA
+        pairs, positions, rounded, counts, rank = self.ranked(
+            pairs[best], positions[best], self.exact(queries, pairs[best], positions[best]), size)
+        lower = np.zeros(size, dtype=np.int64)
+        lower[pairs[rank == top_n - 1]] = rounded[rank == top_n - 1]
+        threshold = (lower - 0.5) / 10 ** DECIMALS - 1e-9
+
+        # Items sharing none of the n-grams up to where the remaining norm drops under the
+        # threshold score under it, and so do pairs whose partial score plus that norm does
+        prefix = remaining >= threshold[rows]
+        rest = np.sqrt(np.bincount(rows[~prefix], weights=values[~prefix] ** 2, minlength=size))
+        candidates = partial(prefix)
+        keep = candidates.data + rest[candidates.row] >= threshold[candidates.row]
+        pairs, positions = candidates.row[keep].astype(np.int64), candidates.col[keep].astype(np.int64)
+        pairs, positions, rounded, counts, rank = self.ranked(
+            pairs, positions, self.exact(queries, pairs, positions), size)
+
+        last = np.zeros(size, dtype=np.int64)
+        last[pairs[rank == top_n - 1]] = rounded[rank == top_n - 1]
+        # Items that are not candidates score 0 when every n-gram was used, so a zero n-th
+        # score could tie with one at a lower position
+        settled = np.flatnonzero((counts >= top_n) & (last > 0))
+        keep = (rank < top_n) & np.isin(pairs, settled)
+        return settled, positions[keep].reshape(-1, top_n), rounded[keep].reshape(-1, top_n)
+
+    def dense_top(self, queries, top_n):
+        """Score query vectors against every item, returning their top_n positions and rounded scores"""
+        size = len(self.items)
+        scores = (queries @ self.vectors_t).toarray()
+        if top_n < size:
+            # Every item rounding to the n-th best score or more, ties included
+            nth = -np.partition(-scores, top_n - 1, axis=1)[:, top_n - 1]
+            floor = (self.rounded(nth) - 0.5) / 10 ** DECIMALS - 1e-9
+            rows, positions = np.nonzero(scores >= floor[:, None])
+        else:
+            rows, positions = np.nonzero(np.ones_like(scores, dtype=bool))
+        rows, positions, rounded, _, rank = self.ranked(
+            rows.astype(np.int64), positions.astype(np.int64), self.rounded(scores[rows, positions]), len(scores))
+        keep = rank < top_n
+        return positions[keep].reshape(-1, top_n), rounded[keep].reshape(-1, top_n)
+
+    def top(self, texts, top_n):
+        """
+        The top_n (position, score) pairs of every text, best first.
+
+        Scores are cosine similarities rounded to two decimals, and equal scores keep the
+        lower position first, as sorting every item by score would.
+        """
+        size = len(self.items)
+        top_n = min(max(0, int(top_n)), size)
+        results = [[] for _ in texts]
+        if top_n == 0 or not texts:
+            return results
+
+        def store(rows, positions, rounded):
+            for row, row_positions, row_rounded in zip(rows, positions.tolist(), rounded.tolist()):
+                results[row] = [(position + 1, value / 10 ** DECIMALS)
+                                for position, value in zip(row_positions, row_rounded)]
+
+        queries = self.vectorize(texts)
+        pending = np.ones(len(texts), dtype=bool)
+        block = max(1, CANDIDATE_CELLS // size)
+        for start in range(0, len(texts), block):
+            settled, positions, rounded = self.candidate_top(queries[start:start + block], top_n)
+            store((settled + start).tolist(), positions, rounded)
+            pending[settled + start] = False
+
+        # Blank texts have no matches, the rest were not settled by their candidates
+        pending &= np.array([bool(str(text).strip()) for text in texts])
+        pending = np.flatnonzero(pending)
+        block = max(1, BLOCK_CELLS // size)
+        for start in range(0, len(pending), block):
+            rows = pending[start:start + block]
+            positions, rounded = self.dense_top(queries[rows], top_n)
+            store(rows.tolist(), positions, rounded)
+        return results
@@ -0,0 +1,122 @@
+# Shared VADER sentiment analyzer.
+#
+# nltk's SentimentIntensityAnalyzer reads and parses its lexicon every time one is created,
+# and nltk.download checks the network each time it is called. get_analyzer creates one
+# analyzer per process on first use and returns it afterwards, so scoring a range loads the
+# lexicon once. The lexicon is taken from the nltk data path when a copy is there,
+# otherwise it is downloaded once into a local directory (BOARDFLARE_NLTK_DATA_DIR,
+# default ~/.cache/boardflare/nltk_data) that is added to the path for later processes.
+#
+# Parsing the lexicon text is most of the time it takes to create an analyzer. The parsed
+# lexicon, with the booster, negation and idiom tables, is written to a marshal file next
+# to it (COMPILED_LEXICON) and later processes load that instead, skipping the lookup and
+# the parse. scripts/build_vader_lexicon.py writes it ahead of time.
+
+import marshal
+import os
+import threading
+from pathlib import Path
+
+import nltk
+
+LEXICON = "vader_lexicon"
+LEXICON_RESOURCE = "sentiment/vader_lexicon.zip"
+DECIMALS = 4
+COMPILED_LEXICON = "vader_lexicon.marshal"
+# Changed when the layout of the compiled lexicon changes, older files are rebuilt
+COMPILED_FORMAT = 1
+
+_analyzer = None
+_analyzer_lock = threading.Lock()
+
+
+def data_dir():
+    """Local directory the lexicon is downloaded to when nltk has no copy"""
+    return Path(os.environ.get("BOARDFLARE_NLTK_DATA_DIR") or Path.home() / ".cache" / "boardflare" / "nltk_data")
+
+
+def ensure_lexicon():
+    """Make the VADER lexicon loadable by nltk, downloading it only when no copy is found"""
+    directory = str(data_dir())
+    if directory not in nltk.data.path:
+        nltk.data.path.append(directory)
+    try:
+        nltk.data.find(LEXICON_RESOURCE)
+    except LookupError:
+        if not nltk.download(LEXICON, download_dir=directory, quiet=True):
+            raise LookupError(f"The VADER lexicon could not be downloaded to {directory}.")
+
+
+def compiled_path():
+    """Location of the compiled lexicon in the local data directory"""
+    return data_dir() / COMPILED_LEXICON
+
+
+def compile_lexicon(analyzer, path=None):
+    """Write the lexicon and tables of an analyzer to a compiled lexicon file, returning its path"""
+    path = Path(path or compiled_path())
+    constants = analyzer.constants
+    tables = (COMPILED_FORMAT, analyzer.lexicon, constants.BOOSTER_DICT, constants.NEGATE,
+              constants.SPECIAL_CASE_IDIOMS)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Written aside and renamed, so another process never loads part of a file
+    partial = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    partial.write_bytes(marshal.dumps(tables))
+    os.replace(partial, path)
+    return path
+
+
+def load_compiled(path=None):
+    """A SentimentIntensityAnalyzer from a compiled lexicon file, None when there is no usable file"""
+    try:
+        tables = marshal.loads(Path(path or compiled_path()).read_bytes())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if not isinstance(tables, tuple) or len(tables) != 5 or tables[0] != COMPILED_FORMAT:
+        return None
+    from nltk.sentiment.vader import SentimentIntensityAnalyzer, VaderConstants
+
+    _, lexicon, booster, negate, idioms = tables
+    # Created without __init__, which would load and parse the lexicon text
+    analyzer = SentimentIntensityAnalyzer.__new__(SentimentIntensityAnalyzer)
+    analyzer.lexicon_file = None
+    analyzer.lexicon = lexicon
+    analyzer.constants = VaderConstants()
+    analyzer.constants.BOOSTER_DICT = booster
+    analyzer.constants.NEGATE = negate
+    analyzer.constants.SPECIAL_CASE_IDIOMS = idioms
+    return analyzer
+
+
+def get_analyzer():
+    """The process wide SentimentIntensityAnalyzer, created on first use"""
+    global _analyzer
+    with _analyzer_lock:
+        if _analyzer is None:
+            _analyzer = load_compiled()
+        if _analyzer is None:
+            from nltk.sentiment import SentimentIntensityAnalyzer
+            ensure_lexicon()
+            _analyzer = SentimentIntensityAnalyzer()
+            try:
+                compile_lexicon(_analyzer)
+            except OSError:
+                pass  # Scoring works without it, the next process parses the lexicon again
+        return _analyzer
+
+
+def compound_scores(texts):
+    """Rounded compound scores of texts, 0.0 for values that are not strings"""
+    analyzer = get_analyzer()
+    # Ranges often repeat texts, each distinct one is scored once
+    scores = {}
+    results = []
+    for text in texts:
+        if not isinstance(text, str):
+            results.append(0.0)
+            continue
+        score = scores.get(text)
+        if score is None:
+            score = scores[text] = round(analyzer.polarity_scores(text)["compound"], DECIMALS)
+        results.append(score)
+    return results
@@ -1,81 +1,241 @@
-import { getFunction } from './getfunction.js';
-import { ConsoleEvents, EventTypes } from '../../taskpane/utils/constants.js';
+import { getFunction, getFunctionSettings } from './getfunction.js';
+import { WorkerPool } from './pool.js';
+import { ResultCache } from './memo.js';
+import { toRows } from './message.js';
+import { ConsoleEvents, EventTypes, EXEC_ASYNC_CONCURRENCY, EXEC_BATCH_TIMEOUT_MS, EXEC_MEMO_MAX_BYTES, EXEC_POOL_SIZE, EXEC_STREAM_INTERVAL_MS, EXEC_TIMEOUT_MS } from '../../taskpane/utils/constants.js';
 import { pyLogs } from '../../taskpane/utils/logs.js';
 import { getStoredToken } from '../../taskpane/utils/indexedDB.js';
 
-const execPyWorker = new Worker(new URL('./execpy-worker.js', import.meta.url));
+const execPool = new WorkerPool(EXEC_POOL_SIZE, () => new Worker(new URL('./execpy-worker.js', import.meta.url)));
 
-async function messageWorker(worker, message) {
-    return new Promise((resolve, reject) => {
-        worker.onmessage = (event) => {
-            const { result, stdout, error } = event.data;
-            if (error) {
-                reject({ error, stdout });
-            } else {
-                resolve({ result, stdout });
-            }
-        };
-        worker.onerror = (error) => {
-            reject({ error: error.message });
-        };
-        worker.postMessage(message);
-    });
+const resultCache = new ResultCache(EXEC_MEMO_MAX_BYTES);
+
+// Drop the workers' cached callables and memoized results when a function's code is saved,
+// from either bundle.
+export function invalidateFunction(name) {
+    execPool.broadcast({ type: 'invalidate', name });
+    resultCache.deleteFunction(name?.toLowerCase());
+}
+window.addEventListener(EventTypes.FUNCTION_SAVED, (event) => invalidateFunction(event.detail?.name));
+
+// Install the imports of every saved function on the worker that will run it, in the
+// background after Pyodide loads. Called once by the custom functions bundle at startup,
+// which also fills the function code cache before the first EXEC call.
+export async function prefetchFunctionImports() {
+    try {
+        const functions = [...(await getFunctionSettings()).values()];
+        const prefetches = functions
+            .filter(fn => fn?.name && fn.imports?.length)
+            .map(fn => execPool.run(fn.name.toLowerCase(), { type: 'prefetch', imports: fn.imports }));
+        await Promise.allSettled(prefetches);
+    } catch (error) {
+        console.error('Failed to prefetch function imports:', error);
+    }
+}
+
+// Parse a batch of function sources with the worker's preloaded astParser.py, skipping the
+// EXEC pipeline. Resolves with one JSON string per source.
+export async function parsePythonCodes(codes) {
+    const { result } = await execPool.run('parse', { type: 'parse', codes });
+    return result;
+}
+
+// Hit, miss and eviction counters and size of the pure function result memo.
+export function getExecMemoStats() {
+    return resultCache.stats();
+}
+
+// Per-worker queue depth, utilization and startup timing of the exec pool.
+export function getExecPoolMetrics() {
+    return execPool.metrics();
+}
+
+async function getGraphToken() {
+    // If graph token retrieval fails, log a warning but continue execution
+    try {
+        const tokens = await getStoredToken();
+        return tokens?.graphToken;
+    } catch (tokenError) {
+        ConsoleEvents.emit(EventTypes.LOG, 'Warning: Failed to retrieve graph token.');
+        return null;
+    }
+}
+
+function logExecution(code, stdout) {
+    // Log the execution details
+    try {
+        if (window.isChromiumOrEdge) {
+            window.gtag('event', 'py', { code_length: code.length });
+        }
+        pyLogs({ code, ref: "execPython" });
+    } catch (logError) {
+        console.error('Logging error in execPython:', logError);
+    }
+
+    // Emit stdout messages to the output tab
+    if (stdout.trim()) {
+        ConsoleEvents.emit(EventTypes.LOG, stdout.trim());
+    }
 }
 
-export async function execPython({ code, arg1 }, isName = true) {
+function errorResult(message, stdout, code) {
+    pyLogs({ message, stdout, code, ref: "execPythonError" });
+    if (stdout.trim()) {
+        ConsoleEvents.emit(EventTypes.LOG, stdout.trim());
+    }
+    ConsoleEvents.emit(EventTypes.ERROR, message);
+    return [[`Error, see ℹ️ tab for details: ${message} \n${stdout}`]];
+}
+
+// Runs code as a script with setup.py and result.py, for entries saved without parameters.
+// Saved functions with parameters run through execPythonBatch.
+export async function execPython({ code, arg1 }, isName = true, signal = undefined) {
+    let timeout = null;
     try {
 
         // If the code is a function name, retrieve the function code from workbook settings
         if (isName) {
             try {
-                code = await getFunction(code);
+                ({ code, timeout = null } = await getFunction(code));
             } catch (error) {
                 return [[error.message || 'Error loading function code from workbook settings.']];
             }
         }
 
-        // If graph token retrieval fails, log a warning but continue execution
-        let graphToken = null;
-        try {
-            const tokens = await getStoredToken();
-            graphToken = tokens?.graphToken;
-        } catch (tokenError) {
-            ConsoleEvents.emit(EventTypes.LOG, 'Warning: Failed to retrieve graph token.');
-        }
+        const graphToken = await getGraphToken();
 
         // Proceed with executing the Python code
-        const { result, stdout } = await messageWorker(execPyWorker, {
+        const { result, stdout } = await execPool.run('code', {
             code,
             arg1,
             graphToken
+        }, { signal, timeoutMs: timeout ? timeout * 1000 : EXEC_TIMEOUT_MS });
+
+        logExecution(code, stdout);
+
+        return toRows(result);
+
+    } catch (error) {
+        return errorResult(error.error || error.message, error.stdout || '', code);
+    }
+}
+
+// Runs a saved generator function for EXEC_STREAM. Each value it yields is passed to
+// onPartial as Excel rows, at most one per EXEC_STREAM_INTERVAL_MS, and the promise
+// resolves with the last one. Streams are never memoized or batched.
+export async function execPythonStream({ code, arg1 }, onPartial, signal = undefined) {
+    let fn;
+    try {
+        fn = await getFunction(code);
+    } catch (error) {
+        return [[error.message || 'Error loading function code from workbook settings.']];
+    }
+    if (!fn.name) {
+        return await execPython({ code, arg1 }, true, signal);
+    }
+
+    try {
+        const graphToken = await getGraphToken();
+        const { result, stdout } = await execPool.run(fn.name, {
+            type: 'stream',
+            code: fn.code,
+            name: fn.name,
+            names: fn.names,
+            arg1,
+            interval: EXEC_STREAM_INTERVAL_MS,
+            graphToken
+        }, {
+            signal,
+            timeoutMs: fn.timeout ? fn.timeout * 1000 : EXEC_TIMEOUT_MS,
+            onPartial: (partial) => onPartial(toRows(partial))
         });
 
-        // Log the execution details
-        try {
-            if (window.isChromiumOrEdge) {
-                window.gtag('event', 'py', { code_length: code.length });
-            }
-            pyLogs({ code, ref: "execPython" });
-        } catch (logError) {
-            console.error('Logging error in execPython:', logError);
+        logExecution(fn.code, stdout);
+        return toRows(result);
+
+    } catch (error) {
+        return errorResult(error.error || error.message, error.stdout || '', fn.code);
+    }
+}
+
+// Runs one saved function over many argument sets in a single worker round-trip.
+// All calls share the same code reference; returns one result per call, in order.
+// The timeout applies per call (the __timeout__ its source declares in seconds, or
+// EXEC_TIMEOUT_MS), and the whole batch is bounded by EXEC_BATCH_TIMEOUT_MS.
+export async function execPythonBatch(calls, signal) {
+    let code = calls[0].code;
+    let fn;
+    try {
+        fn = await getFunction(code);
+    } catch (error) {
+        const message = error.message || 'Error loading function code from workbook settings.';
+        return calls.map(() => [[message]]);
+    }
+
+    // Entries saved without parameters can only run one call at a time
+    if (!fn.name) {
+        const results = [];
+        for (const call of calls) {
+            results.push(await execPython(call, true, signal));
         }
+        return results;
+    }
 
-        // Emit stdout messages to the output tab
-        if (stdout.trim()) {
-            ConsoleEvents.emit(EventTypes.LOG, stdout.trim());
+    code = fn.code;
+
+    // Pure functions answer repeated arguments from the memo, and identical calls in the
+    // batch run once. Only the remaining calls are sent to the worker.
+    const keys = fn.memoize ? calls.map(call => resultCache.key(fn.name, code, call.arg1)) : null;
+    const results = new Array(calls.length);
+    const pending = new Map();
+    calls.forEach((call, index) => {
+        const key = keys ? keys[index] : index;
+        const cached = keys ? resultCache.get(key) : undefined;
+        if (cached !== undefined) {
+            results[index] = cached;
+        } else if (pending.has(key)) {
+            pending.get(key).indexes.push(index);
+        } else {
+            pending.set(key, { arg1: call.arg1 ?? null, indexes: [index] });
         }
+    });
+    if (pending.size === 0) {
+        return results;
+    }
 
-        // Return the result
-        return result;
+    try {
+        const graphToken = await getGraphToken();
+        const callTimeoutMs = fn.timeout ? fn.timeout * 1000 : EXEC_TIMEOUT_MS;
+        const timeoutMs = Math.min(callTimeoutMs * pending.size, Math.max(callTimeoutMs, EXEC_BATCH_TIMEOUT_MS));
+        const runs = [...pending];
+        const { result, stdout } = await execPool.run(fn.name, {
+            code,
+            name: fn.name,
+            names: fn.names,
+            batch: runs.map(([, run]) => run.arg1),
+            concurrency: fn.concurrency || EXEC_ASYNC_CONCURRENCY,
+            graphToken
+        }, { signal, timeoutMs });
+
+        logExecution(code, stdout);
+
+        // Float64 results arrive as one transferred buffer per call
+        result.forEach(({ result: value, error }, i) => {
+            const [key, run] = runs[i];
+            if (error) {
+                value = errorResult(error, '', code);
+            } else {
+                value = toRows(value);
+                if (keys) {
+                    resultCache.set(key, value);
+                }
+            }
+            run.indexes.forEach(index => { results[index] = value; });
+        });
+        return results;
 
     } catch (error) {
-        const message = error.error || error.message;
-        const stdout = error.stdout || '';
-        pyLogs({ message, stdout, code, ref: "execPythonError" });
-        if (stdout.trim()) {
-            ConsoleEvents.emit(EventTypes.LOG, stdout.trim());
-        }
-        ConsoleEvents.emit(EventTypes.ERROR, message);
-        return [[`Error, see ℹ️ tab for details: ${message} \n${stdout}`]];
+        const message = errorResult(error.error || error.message, error.stdout || '', code);
+        return calls.map((_, index) => results[index] ?? message);
     }
-}
\ No newline at end of file
+}
@@ -1,64 +1,437 @@
 // Web worker that executes Python code using Pyodide.
 
-importScripts("https://cdn.jsdelivr.net/pyodide/v0.26.2/full/pyodide.js");
+const PYODIDE_VERSION = "0.26.2";
+importScripts(`https://cdn.jsdelivr.net/pyodide/v${PYODIDE_VERSION}/full/pyodide.js`);
 import setupCode from './setup.py';
 import resultCode from './result.py';
+import runnerCode from './runner.py';
+import astParserCode from '../../taskpane/utils/astParser.py';
+import boardflareInitCode from './boardflare/__init__.py';
+import boardflareLlmCode from './boardflare/llm.py';
+import boardflareCacheCode from './boardflare/cache.py';
+import boardflareBatchCode from './boardflare/batch.py';
+import boardflareBlocksCode from './boardflare/blocks.py';
+import boardflareRangesCode from './boardflare/ranges.py';
+import boardflareStreamCode from './boardflare/stream.py';
+import boardflareFuzzyCode from './boardflare/fuzzy.py';
+import boardflareTfidfCode from './boardflare/tfidf.py';
+import boardflareVaderCode from './boardflare/vader.py';
+import { installWheelCache } from '../utils/wheelcache.js';
+import { isFloat64Result, toBatchMessage, toMessage } from './message.js';
+import { getSnapshot, storeSnapshot, getLlmCacheEntries, storeLlmCacheChanges, getDataFiles, storeDataFile } from '../../taskpane/utils/indexedDB.js';
+import { EXEC_SNAPSHOT_STARTUP } from '../../taskpane/utils/constants.js';
+
+installWheelCache();
+
+// Python packages shipped with the add-in, written to the virtual FS at startup and never
+// installed with micropip
+const BUNDLED_PATH = '/bundled';
+const BUNDLED_MODULES = {
+    'boardflare/__init__.py': boardflareInitCode,
+    'boardflare/llm.py': boardflareLlmCode,
+    'boardflare/cache.py': boardflareCacheCode,
+    'boardflare/batch.py': boardflareBatchCode,
+    'boardflare/blocks.py': boardflareBlocksCode,
+    'boardflare/ranges.py': boardflareRangesCode,
+    'boardflare/stream.py': boardflareStreamCode,
+    'boardflare/fuzzy.py': boardflareFuzzyCode,
+    'boardflare/tfidf.py': boardflareTfidfCode,
+    'boardflare/vader.py': boardflareVaderCode,
+};
+const BUNDLED_PACKAGES = new Set(Object.keys(BUNDLED_MODULES).map(path => path.split('/')[0]));
+
+// Packages a bundled module imports, installed when saved code imports that module
+const BUNDLED_REQUIREMENTS = {
+    'boardflare.fuzzy': ['numpy', 'textdistance'],
+    'boardflare.tfidf': ['numpy', 'scipy'],
+    'boardflare.vader': ['nltk'],
+};
+
+function bundledRequirements(code) {
+    return Object.entries(BUNDLED_REQUIREMENTS).flatMap(([module, packages]) => {
+        const [parent, leaf] = [module.slice(0, module.lastIndexOf('.')), module.slice(module.lastIndexOf('.') + 1)];
+        const imported = new RegExp(`\\b${module.replace('.', '\\.')}\\b|from\\s+${parent}\\s+import\\s+[^\\n]*\\b${leaf}\\b`);
+        return imported.test(code) ? packages : [];
+    });
+}
+
+// Packages bundled modules import only on some paths, like scipy for the tfidf_cosine
+// algorithm of boardflare.fuzzy. Saved code does not install them, a call that fails to
+// import one loads it and only that call runs again.
+const ON_DEMAND_PACKAGES = new Set(['scipy']);
+
+function onDemandPackage(error) {
+    const match = /No module named '(\w+)/.exec(error || '');
+    return match && ON_DEMAND_PACKAGES.has(match[1]) ? match[1] : null;
+}
+
+// The on demand package a reply is missing, from its error or from any call of a batch
+function missingOnDemand(message) {
+    if (message.error) return onDemandPackage(message.error);
+    const calls = Array.isArray(message.result) ? message.result : [];
+    return calls.map(call => onDemandPackage(call?.error)).find(Boolean) || null;
+}
+
+function writeBundledModules() {
+    for (const [path, source] of Object.entries(BUNDLED_MODULES)) {
+        const file = `${BUNDLED_PATH}/${path}`;
+        self.pyodide.FS.mkdirTree(file.slice(0, file.lastIndexOf('/')));
+        self.pyodide.FS.writeFile(file, source);
+    }
+    self.pyodide.pyimport("sys").path.insert(0, BUNDLED_PATH);
+}
+
+// boardflare.cache keeps LLM responses in memory in the worker. Entries are loaded from
+// IndexedDB at startup and the changes made by each call are written back after it.
+async function loadLlmCache() {
+    self.llmCache = self.pyodide.pyimport("boardflare.cache");
+    try {
+        self.llmCache.load_persisted(self.pyodide.toPy(await getLlmCacheEntries()));
+    } catch (error) {
+        console.warn('LLM response cache could not be loaded:', error);
+    }
+}
+
+function persistLlmCache() {
+    const drained = self.llmCache.drain_changes();
+    const changes = drained.toJs({ dict_converter: Object.fromEntries });
+    drained.destroy();
+    if (changes.puts.length || changes.deletes.length) {
+        storeLlmCacheChanges(changes).catch(error => console.warn('LLM response cache could not be saved:', error));
+    }
+}
+
+// Files the bundled modules build on first use, like the compiled VADER lexicon, are kept
+// in IndexedDB and written back to the data directory at startup, so new workers skip the
+// download and the parse. A file rewritten by Python, for example after a format change
+// or because the stored copy was unreadable, is stored again.
+const DATA_PATH = '/boardflare_data';
+const PERSISTED_DATA_FILES = ['vader_lexicon.marshal'];
+
+// Changes whenever a file is written, Python replaces files with a renamed new one
+function fileVersion(path) {
+    const { ino, mtime, size } = self.pyodide.FS.stat(path);
+    return `${ino}:${+mtime}:${size}`;
+}
+
+async function loadDataFiles() {
+    self.pyodide.FS.mkdirTree(DATA_PATH);
+    self.pyodide.pyimport("os").environ.setdefault("BOARDFLARE_NLTK_DATA_DIR", DATA_PATH);
+    self.dataFiles = new Map();
+    try {
+        for (const { name, data } of await getDataFiles()) {
+            const path = `${DATA_PATH}/${name}`;
+            self.pyodide.FS.writeFile(path, data);
+            self.dataFiles.set(name, fileVersion(path));
+        }
+    } catch (error) {
+        console.warn('Data files could not be loaded:', error);
+    }
+}
+
+function persistDataFiles() {
+    for (const name of PERSISTED_DATA_FILES) {
+        const path = `${DATA_PATH}/${name}`;
+        if (!self.pyodide.FS.analyzePath(path).exists) continue;
+        const version = fileVersion(path);
+        if (self.dataFiles.get(name) === version) continue;
+        self.dataFiles.set(name, version);
+        storeDataFile(name, self.pyodide.FS.readFile(path)).catch(error => console.warn(`${name} could not be saved:`, error));
+    }
+}
+
+// Key for the memory snapshot, so a new Pyodide release or helper code takes a fresh one
+async function snapshotKey() {
+    const source = new TextEncoder().encode(setupCode + resultCode + runnerCode);
+    const digest = new Uint8Array(await crypto.subtle.digest('SHA-256', source));
+    const hash = Array.from(digest, byte => byte.toString(16).padStart(2, '0')).join('');
+    return `pyodide-${PYODIDE_VERSION}:${hash}`;
+}
+
+function defineHelpers() {
+    self.pyodide.runPython(setupCode, { filename: "setup.py" });
+    self.pyodide.runPython(resultCode, { filename: "result.py" });
+    self.pyodide.runPython(runnerCode, { filename: "runner.py" });
+}
+
+// The snapshot holds the initialized interpreter with setup.py, result.py and runner.py
+// defined. Packages are loaded after the restore because their files are not part of it.
+async function loadFromSnapshot() {
+    const key = await snapshotKey();
+    const snapshot = await getSnapshot(key).catch(() => null);
+    if (snapshot) {
+        try {
+            self.pyodide = await loadPyodide({ _loadSnapshot: snapshot });
+            return 'snapshot';
+        } catch (error) {
+            console.warn('Pyodide snapshot restore failed, starting cold:', error);
+        }
+    }
+
+    self.pyodide = await loadPyodide({ _makeSnapshot: true });
+    defineHelpers();
+    try {
+        await storeSnapshot(key, self.pyodide.makeMemorySnapshot());
+    } catch (error) {
+        console.warn('Pyodide snapshot could not be saved:', error);
+    }
+    return 'cold';
+}
 
 async function loadPyodideAndPackages() {
-    self.pyodide = await loadPyodide();
+    const started = performance.now();
+    let mode = 'cold';
+    if (EXEC_SNAPSHOT_STARTUP) {
+        mode = await loadFromSnapshot();
+    } else {
+        self.pyodide = await loadPyodide();
+        defineHelpers();
+    }
+    const interpreterMs = performance.now() - started;
+
     await self.pyodide.loadPackage(["micropip", "pyodide_http"]);
+    writeBundledModules();
+    await loadLlmCache();
+    await loadDataFiles();
     self.micropip = self.pyodide.pyimport("micropip");
 
     // Import and patch pyodide_http
     const pyodide_http = self.pyodide.pyimport("pyodide_http");
     pyodide_http.patch_all();
+
+    // Helpers are defined once so warm calls skip re-running them
+    self.runner = {
+        isCached: self.pyodide.globals.get('is_function_cached'),
+        runBatch: self.pyodide.globals.get('run_batch'),
+        runStream: self.pyodide.globals.get('run_stream'),
+        invalidate: self.pyodide.globals.get('invalidate_function'),
+        cancel: self.pyodide.globals.get('cancel_running'),
+    };
+
+    self.startup = { mode, interpreterMs, totalMs: performance.now() - started };
 }
 
 let pyodideReadyPromise = loadPyodideAndPackages();
 
-self.onmessage = async (event) => {
-    await pyodideReadyPromise;
-    const { code, arg1, graphToken } = event.data;
+// The first reply carries the startup timing so the pool can report it per worker
+let startupReported = false;
+function reply(message, transfer = []) {
+    if (!startupReported) {
+        message.startup = self.startup;
+        startupReported = true;
+    }
+    self.postMessage(message, transfer);
+}
+
+// Flatten a 2D range into a Float64Array so setup.py can fill a numpy array with one
+// bulk copy. Blanks and text become NaN, booleans become 0/1.
+self.rangeToFloat64 = (rows) => {
+    const out = new Float64Array(rows.length * (rows[0]?.length || 0));
+    let i = 0;
+    for (const row of rows) {
+        for (const value of row) {
+            out[i++] = typeof value === 'number' || typeof value === 'boolean' ? Number(value) : NaN;
+        }
+    }
+    return out;
+};
+
+function missingImports(imports) {
+    const sys = self.pyodide.pyimport("sys");
+    return imports.filter(pkg => !BUNDLED_PACKAGES.has(pkg) && !(pkg in sys.modules.toJs()));
+}
+
+async function installImports(code) {
+    // Find imports in the Python code, and those of the bundled modules it uses
+    const imports = [...self.pyodide.pyodide_py.code.find_imports(code).toJs(), ...bundledRequirements(code)];
+
+    // Load the imports that are not in sys.modules
+    if (imports && imports.length > 0) {
+        const missing = missingImports(imports);
+        if (missing.length > 0) {
+            await self.micropip.install(missing);
+        }
+    }
+}
+
+// Install the imports of saved functions ahead of their first call. Packages are installed
+// one at a time so a name micropip cannot resolve does not block the others.
+async function prefetchImports(imports) {
+    const installed = [];
+    for (const pkg of missingImports(imports)) {
+        try {
+            await self.micropip.install(pkg);
+            installed.push(pkg);
+        } catch (error) {
+            console.warn(`Prefetch of ${pkg} failed:`, error.message);
+        }
+    }
+    return installed;
+}
+
+// The AST parser is defined on the first parse request, in its own namespace
+function parsePythonCodes(codes) {
+    if (!self.parseCodes) {
+        const namespace = self.pyodide.globals.get('dict')();
+        self.pyodide.runPython(astParserCode, { filename: "astParser.py", globals: namespace });
+        self.parseCodes = namespace.get('parse_python_codes');
+        namespace.destroy();
+    }
+    const parsed = self.parseCodes(codes);
+    try {
+        return parsed.toJs();
+    } finally {
+        parsed.destroy();
+    }
+}
+
+// Saved functions: compile once, then only rebind arguments and call the cached callable.
+// Every EXEC call is a batch that runs the function once per argument set and returns a
+// result or error for each. For async def functions the runner returns a task, awaited here.
+async function runSavedFunction({ code, name, names, batch, graphToken, concurrency }) {
+    if (!self.runner.isCached(name, code)) {
+        await installImports(code);
+    }
+    return await self.runner.runBatch(name, code, names, batch, graphToken || null, concurrency || 1);
+}
+
+// Post a value yielded by a generator function to the main thread ahead of the final reply.
+// The runner's proxy is borrowed for the duration of the call, so it is copied first.
+function emitPartial(partial) {
+    const proxy = partial?.copy ? partial.copy() : partial;
+    const ownsProxy = proxy?.destroy && !isFloat64Result(proxy);
+    try {
+        const [{ result }, transfer] = toMessage(proxy, "");
+        self.postMessage({ partial: result }, transfer);
+    } finally {
+        if (ownsProxy) proxy.destroy();
+    }
+}
+
+// Generator functions for EXEC_STREAM: every yielded value is posted as a partial result
+// and the last one is the reply. Async generators are awaited here like coroutines.
+async function runStreamFunction({ code, name, names, arg1, graphToken, interval }) {
+    if (!self.runner.isCached(name, code)) {
+        await installImports(code);
+    }
+    return await self.runner.runStream(name, code, names, arg1 || null, emitPartial, graphToken || null, (interval ?? 100) / 1000);
+}
+
+// Raw code, e.g. the AST parser: run setup, the code and the result conversion as scripts.
+async function runCode({ code, arg1, graphToken }) {
+    await installImports(code);
+
+    // Set global args array from arg1 to args, clearing args left over from a previous call
+    self.pyodide.globals.set('global_args', arg1 || null);
+
+    // Set graphToken as global if provided
+    if (graphToken) {
+        self.pyodide.globals.set('graphToken', graphToken);
+    }
 
+    // Run setup code
+    await self.pyodide.runPythonAsync(setupCode, { filename: "setup.py" });
+
+    // Run user code
+    await self.pyodide.runPythonAsync(code, { filename: "user_code" });
+
+    // Run result conversion code
+    return await self.pyodide.runPythonAsync(resultCode, { filename: "result.py" });
+}
+
+// Run a function call message, returning the reply and its transfer list
+async function runMessage(data) {
     let stdout = "";
     self.pyodide.setStdout({ batched: (msg) => { stdout += msg + "\n"; } });
     self.pyodide.setStderr({ batched: (msg) => { stdout += msg + "\n"; } });
 
     try {
-        // Find imports in the Python code
-        const imports = self.pyodide.pyodide_py.code.find_imports(code).toJs();
-
-        // Load the imports that are not in sys.modules
-        if (imports && imports.length > 0) {
-            const sys = self.pyodide.pyimport("sys");
-            const missingImports = imports.filter(pkg => !(pkg in sys.modules.toJs()));
-            if (missingImports.length > 0) {
-                await self.micropip.install(missingImports);
-            }
+        if (data.type === 'stream') {
+            return toMessage(await runStreamFunction(data), stdout);
         }
-
-        // Set global args array from arg1 to args
-        if (arg1) {
-            self.pyodide.globals.set('global_args', arg1);
+        if (data.batch) {
+            return toBatchMessage(await runSavedFunction(data), stdout);
         }
+        return toMessage(await runCode(data), stdout);
+    } catch (error) {
+        return [{ error: error.message, stdout }, []];
+    }
+}
+
+// Load the on demand package a reply is missing and run again only the calls that failed
+// to import it, so calls that succeeded, like LLM requests, are not repeated. A message
+// that failed as a whole ran no call and runs again entirely.
+async function retryOnDemand(data, message, transfer) {
+    const missing = missingOnDemand(message);
+    if (!missing) return [message, transfer];
+    try {
+        await self.pyodide.loadPackage(missing);
+    } catch (error) {
+        console.warn(`${missing} could not be loaded:`, error);
+        return [message, transfer];
+    }
+    if (message.error || !data.batch) {
+        return await runMessage(data);
+    }
+
+    const failed = message.result.flatMap((call, index) => (onDemandPackage(call?.error) === missing ? [index] : []));
+    const [retry, retryTransfer] = await runMessage({ ...data, batch: failed.map(index => data.batch[index]) });
+    if (retry.error) {
+        return [message, transfer];
+    }
+    failed.forEach((index, i) => { message.result[index] = retry.result[i]; });
+    message.stdout += retry.stdout;
+    return [message, [...transfer, ...retryTransfer]];
+}
+
+self.onmessage = async (event) => {
+    await pyodideReadyPromise;
+
+    // Shared buffer the main thread writes SIGINT to, raising KeyboardInterrupt in running code
+    if (event.data.type === 'interrupt-buffer') {
+        self.interruptBuffer = event.data.buffer;
+        self.pyodide.setInterruptBuffer(self.interruptBuffer);
+        return;
+    }
 
-        // Set graphToken as global if provided
-        if (graphToken) {
-            self.pyodide.globals.set('graphToken', graphToken);
+    // Cancel request, handled once no Python is running. Calls that are awaiting stop with
+    // CancelledError and reply, the pool restarts a worker that does not. A SIGINT that no
+    // bytecode picked up is cleared so it does not interrupt cancel_running instead.
+    if (event.data.type === 'cancel') {
+        if (self.interruptBuffer) {
+            self.interruptBuffer[0] = 0;
         }
+        self.runner.cancel();
+        return;
+    }
 
-        // Run setup code
-        await self.pyodide.runPythonAsync(setupCode, { filename: "setup.py" });
+    // Saved function code changed, drop its cached callable. No reply is expected.
+    if (event.data.type === 'invalidate') {
+        self.runner.invalidate(event.data.name ?? null);
+        return;
+    }
 
-        // Run user code
-        await self.pyodide.runPythonAsync(code, { filename: "user_code" });
+    // Background install of saved functions' imports, replies with the installed packages
+    if (event.data.type === 'prefetch') {
+        reply({ result: await prefetchImports(event.data.imports), stdout: "" });
+        return;
+    }
 
-        // Run result conversion code
-        const pyodideResult = await self.pyodide.runPythonAsync(resultCode, { filename: "result.py" });
+    // Parse function sources with astParser.py, replies with one JSON string per source
+    if (event.data.type === 'parse') {
+        try {
+            reply({ result: parsePythonCodes(event.data.codes), stdout: "" });
+        } catch (error) {
+            reply({ error: error.message, stdout: "" });
+        }
+        return;
+    }
 
-        const result = pyodideResult?.toJs ? pyodideResult.toJs({ create_proxies: false }) : pyodideResult;
-        self.postMessage({ result, stdout });
-    } catch (error) {
-        self.postMessage({ error: error.message, stdout });
+    try {
+        const [message, transfer] = await runMessage(event.data);
+        reply(...await retryOnDemand(event.data, message, transfer));
+    } finally {
+        persistLlmCache();
+        persistDataFiles();
     }
-};
\ No newline at end of file
+};
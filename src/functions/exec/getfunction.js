@@ -1,7 +1,87 @@
 import { pyLogs } from '../../taskpane/utils/logs';
+import { EventTypes, EXEC_MEMO_MAX_BYTES } from '../../taskpane/utils/constants';
 
-async function getFunctionFromSettings(name) {
+// Python line appended to the function code that binds the EXEC arguments to its parameters.
+// Coroutine functions are awaited, the raw code path runs with runPythonAsync.
+export function buildResultLine(name, parameters, isAsync = false) {
+    const names = parameters.map(param => JSON.stringify(param.name)).join(', ');
+    const call = `call_with_args(${name.toLowerCase()}, [${names}])`;
+    return `\n\nresult = ${isAsync ? `await ${call}` : call}`;
+}
+
+// All function settings are read in one Excel.run and kept by key until a function is
+// saved or deleted (FUNCTION_SAVED, from either bundle) or the workbook's settings change.
+// The version is bumped on every invalidation so a bulk load that started before it is
+// not stored over the newer state.
+const functionCache = {
+    entries: null,
+    loading: null,
+    version: 0,
+    hits: 0,
+    misses: 0,
+    loads: 0
+};
+let settingsHandlerAdded = false;
+
+export function invalidateFunctionCache() {
+    functionCache.entries = null;
+    functionCache.loading = null;
+    functionCache.version++;
+}
+window.addEventListener(EventTypes.FUNCTION_SAVED, invalidateFunctionCache);
+
+export function getFunctionCacheStats() {
+    const { version, hits, misses, loads, entries } = functionCache;
+    return { version, hits, misses, loads, size: entries?.size || 0 };
+}
+
+async function loadFunctionSettings() {
+    const version = functionCache.version;
     await Office.onReady();
+    const entries = await Excel.run(async (context) => {
+        const settings = context.workbook.settings;
+        if (!settingsHandlerAdded) {
+            try {
+                settings.onSettingsChanged.add(async () => invalidateFunctionCache());
+                settingsHandlerAdded = true;
+            } catch (error) {
+                console.error('Settings changed event not available:', error);
+            }
+        }
+        const items = settings.load("items");
+        await context.sync();
+        return new Map(items.items.map(item => [item.key, item.value]));
+    });
+    functionCache.loads++;
+    if (version === functionCache.version) {
+        functionCache.entries = entries;
+    }
+    return entries;
+}
+
+// Map of every function setting by key, loaded in bulk on first use.
+export async function getFunctionSettings() {
+    if (functionCache.entries) {
+        return functionCache.entries;
+    }
+    if (!functionCache.loading) {
+        const loading = loadFunctionSettings().finally(() => {
+            if (functionCache.loading === loading) functionCache.loading = null;
+        });
+        functionCache.loading = loading;
+    }
+    return functionCache.loading;
+}
+
+async function getFunctionFromSettings(name) {
+    const entries = functionCache.entries || await getFunctionSettings();
+    if (entries.has(name)) {
+        functionCache.hits++;
+        return entries.get(name);
+    }
+
+    // Not in the bulk load, read the single item in case it was added since
+    functionCache.misses++;
     return await Excel.run(async (context) => {
         const settings = context.workbook.settings;
         const setting = settings.getItem(name);
@@ -11,6 +91,30 @@ async function getFunctionFromSettings(name) {
     });
 }
 
+// Functions whose memoize request was refused, warned about once per session
+const refusedMemoize = new Set();
+
+// Memoizing is opt-in with memoize: true in the function's settings entry, which is saved
+// when its source declares __memoize__ = True. It is refused for functions astParser.py
+// found to be impure, but that check cannot see every source of change (file reads,
+// environment variables, clocks imported under other names), so a function that looks
+// pure is still not memoized unless it asks to be.
+function memoizeFunction(functionData) {
+    if (EXEC_MEMO_MAX_BYTES <= 0 || functionData.memoize !== true) {
+        return false;
+    }
+    if (functionData.pure === false) {
+        if (!refusedMemoize.has(functionData.name)) {
+            refusedMemoize.add(functionData.name);
+            console.warn(`${functionData.name} asks to be memoized but its results can change between calls, it is not memoized.`);
+        }
+        return false;
+    }
+    return true;
+}
+
+// Returns the function source with its name and parameter names so the worker can cache
+// the compiled callable. Entries saved without parameters run their stored resultLine.
 export async function getFunction(code) {
     try {
         const name = code.replace('workbook-settings:', '').trim();
@@ -25,7 +129,17 @@ export async function getFunction(code) {
             throw new Error(`Function does not have code defined.`);
         }
 
-        return functionData.code + (functionData.resultLine || '');
+        if (Array.isArray(functionData.parameters) && functionData.name) {
+            return {
+                code: functionData.code,
+                name: functionData.name.toLowerCase(),
+                names: functionData.parameters.map(param => param.name),
+                timeout: functionData.timeout,
+                concurrency: functionData.concurrency,
+                memoize: memoizeFunction(functionData)
+            };
+        }
+        return { code: functionData.code + '\n\nbind_legacy_args()' + (functionData.resultLine || '') };
     } catch (error) {
         pyLogs({ message: error.message, ref: 'get_function_error', code: code });
         throw error;
@@ -0,0 +1,107 @@
+// Memoized EXEC results for functions saved with memoize: true (see getfunction.js).
+//
+// Entries are keyed by function name, a hash of its code and the JSON of its arguments
+// (Excel ranges are arrays of arrays of primitives, so JSON is already canonical). A
+// saved code change gives a new key, so stale results are never returned. The cache is
+// an LRU over a Map's insertion order, bounded by an estimate of its size in bytes.
+
+// 53-bit string hash (cyrb53), enough to tell code versions apart
+export function hashString(text, seed = 0) {
+    let h1 = 0xdeadbeef ^ seed;
+    let h2 = 0x41c6ce57 ^ seed;
+    for (let i = 0; i < text.length; i++) {
+        const ch = text.charCodeAt(i);
+        h1 = Math.imul(h1 ^ ch, 2654435761);
+        h2 = Math.imul(h2 ^ ch, 1597334677);
+    }
+    h1 = Math.imul(h1 ^ (h1 >>> 16), 2246822507) ^ Math.imul(h2 ^ (h2 >>> 13), 3266489909);
+    h2 = Math.imul(h2 ^ (h2 >>> 16), 2246822507) ^ Math.imul(h1 ^ (h1 >>> 13), 3266489909);
+    return (4294967296 * (2097151 & h2) + (h1 >>> 0)).toString(36);
+}
+
+// Rough size in bytes of a result or argument value, without serializing it
+export function estimateBytes(value) {
+    if (Array.isArray(value)) {
+        let bytes = 16;
+        for (const item of value) bytes += estimateBytes(item);
+        return bytes;
+    }
+    if (typeof value === 'string') return 16 + value.length * 2;
+    return 8;
+}
+
+export class ResultCache {
+    constructor(maxBytes) {
+        this.maxBytes = maxBytes;
+        this.entries = new Map();
+        this.codeHashes = new Map();
+        this.bytes = 0;
+        this.hits = 0;
+        this.misses = 0;
+        this.evictions = 0;
+    }
+
+    key(name, code, args) {
+        let codeHash = this.codeHashes.get(code);
+        if (codeHash === undefined) {
+            codeHash = hashString(code);
+            if (this.codeHashes.size >= 256) this.codeHashes.clear();
+            this.codeHashes.set(code, codeHash);
+        }
+        return `${name}\u0000${codeHash}\u0000${JSON.stringify(args ?? null)}`;
+    }
+
+    get(key) {
+        const entry = this.entries.get(key);
+        if (!entry) {
+            this.misses++;
+            return undefined;
+        }
+        // Move to the most recently used end
+        this.entries.delete(key);
+        this.entries.set(key, entry);
+        this.hits++;
+        return entry.result;
+    }
+
+    set(key, result) {
+        const bytes = key.length * 2 + estimateBytes(result);
+        if (bytes > this.maxBytes) return;
+        this.delete(key);
+        this.entries.set(key, { result, bytes });
+        this.bytes += bytes;
+        for (const [oldest, entry] of this.entries) {
+            if (this.bytes <= this.maxBytes) break;
+            this.entries.delete(oldest);
+            this.bytes -= entry.bytes;
+            this.evictions++;
+        }
+    }
+
+    delete(key) {
+        const entry = this.entries.get(key);
+        if (entry) {
+            this.entries.delete(key);
+            this.bytes -= entry.bytes;
+        }
+    }
+
+    // Free the results of a function whose code was saved again, or everything
+    deleteFunction(name) {
+        for (const key of [...this.entries.keys()]) {
+            if (name == null || key.startsWith(`${name}\u0000`)) this.delete(key);
+        }
+        if (name == null) this.codeHashes.clear();
+    }
+
+    stats() {
+        return {
+            hits: this.hits,
+            misses: this.misses,
+            evictions: this.evictions,
+            entries: this.entries.size,
+            bytes: this.bytes,
+            maxBytes: this.maxBytes
+        };
+    }
+}
@@ -0,0 +1,78 @@
+// Conversion of Python results to worker messages, and back to Excel rows on the main thread.
+
+// PyProxy.type of numpy arrays. result.py returns one only for float64 results of at least
+// TYPED_ARRAY_MIN_CELLS cells, so any ndarray proxy is such a result.
+export const NDARRAY_TYPE = 'numpy.ndarray';
+
+export function isFloat64Result(proxy) {
+    return proxy?.type === NDARRAY_TYPE;
+}
+
+// Float64 ndarrays returned by result.py are copied once out of the wasm heap into an
+// ArrayBuffer that is transferred, rather than boxed element by element through toJs.
+// Returns the value to post and the buffers to transfer with it.
+function fromPython(pyodideResult) {
+    if (isFloat64Result(pyodideResult)) {
+        const view = pyodideResult.getBuffer('f64');
+        try {
+            const data = view.data.slice();
+            return [{ buffer: data.buffer, shape: view.shape }, [data.buffer]];
+        } finally {
+            view.release();
+            pyodideResult.destroy();
+        }
+    }
+    const result = pyodideResult?.toJs
+        ? pyodideResult.toJs({ create_proxies: false, dict_converter: Object.fromEntries })
+        : pyodideResult;
+    return [result, []];
+}
+
+export function toMessage(pyodideResult, stdout) {
+    const [result, transfer] = fromPython(pyodideResult);
+    return [{ result, stdout }, transfer];
+}
+
+// A batch is a list of {'result': ...} or {'error': ...} dicts, one per call. Each float64
+// result is transferred as its own buffer.
+export function toBatchMessage(entries, stdout) {
+    const result = [];
+    const transfer = [];
+    try {
+        for (const entry of entries) {
+            try {
+                const error = entry.get('error');
+                if (error !== undefined) {
+                    result.push({ error });
+                    continue;
+                }
+                const value = entry.get('result');
+                const [converted, buffers] = fromPython(value);
+                if (value?.destroy && !isFloat64Result(value)) value.destroy();
+                result.push({ result: converted });
+                transfer.push(...buffers);
+            } finally {
+                entry.destroy();
+            }
+        }
+    } finally {
+        entries.destroy?.();
+    }
+    return [{ result, stdout }, transfer];
+}
+
+// Rebuild Excel rows from a float64 result transferred by the worker as a raw buffer plus shape.
+export function rowsFromBuffer({ buffer, shape }) {
+    const data = new Float64Array(buffer);
+    const [rows, cols] = shape;
+    const result = new Array(rows);
+    for (let i = 0; i < rows; i++) {
+        result[i] = Array.from(data.subarray(i * cols, (i + 1) * cols));
+    }
+    return result;
+}
+
+// Excel rows of a reply's result, expanding a transferred buffer only at the Excel boundary
+export function toRows(result) {
+    return result?.buffer instanceof ArrayBuffer ? rowsFromBuffer(result) : result;
+}
@@ -0,0 +1,77 @@
+// Run with: node --test src/functions/exec
+import { test } from 'node:test';
+import assert from 'node:assert/strict';
+import { rowsFromBuffer, toBatchMessage, toMessage, toRows } from './message.js';
+
+// A stand-in for the PyProxy Pyodide 0.26 returns for the float64 ndarray of result.py
+function ndarrayProxy(rows, cols) {
+    const data = Float64Array.from({ length: rows * cols }, (_, i) => i / 2);
+    const proxy = {
+        type: 'numpy.ndarray',
+        released: false,
+        destroyed: false,
+        getBuffer(format) {
+            assert.equal(format, 'f64');
+            return { data, shape: [rows, cols], release: () => { proxy.released = true; } };
+        },
+        toJs() {
+            throw new Error('ndarray results must not be converted with toJs');
+        },
+        destroy() {
+            proxy.destroyed = true;
+        },
+    };
+    return proxy;
+}
+
+test('float64 results of TYPED_ARRAY_MIN_CELLS cells or more are transferred as a buffer', () => {
+    const proxy = ndarrayProxy(250, 4);
+    const [message, transfer] = toMessage(proxy, 'out');
+
+    assert.equal(message.stdout, 'out');
+    assert.deepEqual(message.result.shape, [250, 4]);
+    assert.deepEqual(transfer, [message.result.buffer]);
+    assert.ok(proxy.released && proxy.destroyed);
+
+    const rows = rowsFromBuffer(message.result);
+    assert.equal(rows.length, 250);
+    assert.ok(rows.every(row => Array.isArray(row) && row.length === 4));
+    assert.deepEqual(rows[0], [0, 0.5, 1, 1.5]);
+    assert.deepEqual(rows[249], [498, 498.5, 499, 499.5]);
+});
+
+test('other results go through toJs', () => {
+    const proxy = { type: 'list', toJs: () => [[1, 'a']] };
+    assert.deepEqual(toMessage(proxy, ''), [{ result: [[1, 'a']], stdout: '' }, []]);
+    assert.deepEqual(toMessage(3, ''), [{ result: 3, stdout: '' }, []]);
+});
+
+// A stand-in for the dict proxy of one batch entry returned by runner.py
+function entryProxy(entry) {
+    const proxy = {
+        destroyed: false,
+        get: (key) => entry[key],
+        destroy() {
+            proxy.destroyed = true;
+        },
+    };
+    return proxy;
+}
+
+test('batch entries transfer each float64 result as its own buffer', () => {
+    const array = ndarrayProxy(500, 2);
+    const list = { type: 'list', destroyed: false, toJs: () => [['a']], destroy() { list.destroyed = true; } };
+    const entries = [entryProxy({ result: array }), entryProxy({ result: list }), entryProxy({ error: 'Traceback' }), entryProxy({ result: 7 })];
+    const [message, transfer] = toBatchMessage(entries, 'out');
+
+    assert.equal(message.stdout, 'out');
+    assert.deepEqual(transfer, [message.result[0].result.buffer]);
+    assert.ok(array.released && array.destroyed && list.destroyed);
+    assert.ok(entries.every(entry => entry.destroyed));
+    assert.deepEqual(message.result.slice(1), [{ result: [['a']] }, { error: 'Traceback' }, { result: 7 }]);
+
+    const rows = toRows(message.result[0].result);
+    assert.equal(rows.length, 500);
+    assert.deepEqual(rows[1], [1, 1.5]);
+    assert.deepEqual(toRows([['a']]), [['a']]);
+});
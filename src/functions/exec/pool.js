@@ -0,0 +1,223 @@
+// Pool of Pyodide exec workers.
+//
+// Calls are routed by function name so each function keeps running on the worker where
+// its code is already compiled and its packages imported. A worker that goes idle with an
+// empty queue steals the newest task from the most loaded worker. Workers are started on
+// first use, so a bundle that only parses code never starts more than one.
+//
+// Tasks can be cancelled with an AbortSignal or a timeout. A running task is interrupted
+// through Pyodide's interrupt buffer, which raises KeyboardInterrupt in the user code and
+// leaves the interpreter loaded. The buffer needs SharedArrayBuffer, so a cross-origin
+// isolated page (the dev server sends the COOP and COEP headers). Without it the worker
+// is sent a cancel message instead, which cancels a call that is awaiting, such as an
+// async def function waiting on fetches. If Python does not stop within
+// INTERRUPT_GRACE_MS (for example while blocked in a synchronous request), the worker is
+// terminated and restarted.
+//
+// A task can pass onPartial to receive the partial results a streaming function posts
+// before its reply.
+
+const SIGINT = 2;
+export const INTERRUPT_GRACE_MS = 3000;
+
+function messageWorker(worker, message, onPartial) {
+    return new Promise((resolve, reject) => {
+        worker.onmessage = (event) => {
+            // Values yielded by a streaming function arrive before the reply
+            if ('partial' in event.data) {
+                onPartial?.(event.data.partial);
+                return;
+            }
+            const { result, stdout, error, startup } = event.data;
+            if (error) {
+                reject({ error, stdout, startup });
+            } else {
+                resolve({ result, stdout, startup });
+            }
+        };
+        worker.onerror = (error) => {
+            reject({ error: error.message });
+        };
+        worker.postMessage(message);
+    });
+}
+
+export class WorkerPool {
+    constructor(size, createWorker) {
+        this.createdAt = performance.now();
+        this.createWorker = createWorker;
+        this.affinity = new Map();
+        this.slots = Array.from({ length: Math.max(1, size) }, (_, id) => ({
+            id,
+            worker: null,
+            interruptBuffer: null,
+            task: null,
+            queue: [],
+            busy: false,
+            busySince: 0,
+            busyTime: 0,
+            completed: 0,
+            stolen: 0,
+            startup: null
+        }));
+    }
+
+    // Queue a message for the worker that owns this key and resolve with its reply.
+    run(key, message, { signal, timeoutMs, onPartial } = {}) {
+        return new Promise((resolve, reject) => {
+            if (signal?.aborted) {
+                reject({ error: 'Request aborted' });
+                return;
+            }
+            const task = { key, message, resolve, reject, timeoutMs, onPartial, done: false };
+            signal?.addEventListener('abort', () => this.cancel(task, 'Request aborted'), { once: true });
+            this.slotFor(key).queue.push(task);
+            this.slots.forEach(s => this.pump(s));
+        });
+    }
+
+    startWorker(slot) {
+        slot.worker = this.createWorker();
+        if (typeof SharedArrayBuffer !== 'undefined' && globalThis.crossOriginIsolated) {
+            slot.interruptBuffer = new Int32Array(new SharedArrayBuffer(4));
+            slot.worker.postMessage({ type: 'interrupt-buffer', buffer: slot.interruptBuffer });
+        }
+    }
+
+    finish(slot, task) {
+        clearTimeout(task.timeoutTimer);
+        clearTimeout(task.killTimer);
+        task.done = true;
+        slot.task = null;
+        slot.busy = false;
+        slot.busyTime += performance.now() - slot.busySince;
+        slot.completed++;
+    }
+
+    cancel(task, reason) {
+        if (task.done) return;
+
+        // Still queued, drop it
+        for (const slot of this.slots) {
+            const index = slot.queue.indexOf(task);
+            if (index >= 0) {
+                slot.queue.splice(index, 1);
+                task.done = true;
+                task.reject({ error: reason });
+                return;
+            }
+        }
+
+        // Running, interrupt Python and restart the worker if it does not stop in time. The
+        // interrupt only reaches running bytecode, calls awaiting a fetch are cancelled by
+        // the cancel message once the worker is idle.
+        const slot = this.slots.find(s => s.task === task);
+        if (!slot || task.cancelReason) return;
+        task.cancelReason = reason;
+        if (slot.interruptBuffer) {
+            slot.interruptBuffer[0] = SIGINT;
+        }
+        slot.worker.postMessage({ type: 'cancel' });
+        task.killTimer = setTimeout(() => this.restart(slot), INTERRUPT_GRACE_MS);
+    }
+
+    restart(slot) {
+        const task = slot.task;
+        slot.worker.terminate();
+        slot.worker = null;
+        slot.interruptBuffer = null;
+        if (task) {
+            this.finish(slot, task);
+            task.reject({ error: `${task.cancelReason}. The Python worker was restarted.` });
+        }
+        this.pump(slot);
+    }
+
+    // Send a message to every worker without waiting for a reply.
+    broadcast(message) {
+        this.slots.forEach(slot => slot.worker?.postMessage(message));
+    }
+
+    slotFor(key) {
+        const owner = this.affinity.get(key);
+        if (owner !== undefined) {
+            return this.slots[owner];
+        }
+        // Least loaded worker, then the one owning the fewest functions
+        const owned = (slot) => [...this.affinity.values()].filter(id => id === slot.id).length;
+        const load = (slot) => (slot.queue.length + (slot.busy ? 1 : 0)) * (this.affinity.size + 1) + owned(slot);
+        const slot = this.slots.reduce((best, s) => (load(s) < load(best) ? s : best));
+        this.affinity.set(key, slot.id);
+        return slot;
+    }
+
+    steal(idle) {
+        const victim = this.slots
+            .filter(slot => slot !== idle && slot.queue.length > 0)
+            .sort((a, b) => b.queue.length - a.queue.length)[0];
+        if (!victim) return null;
+        idle.stolen++;
+        return victim.queue.pop();
+    }
+
+    pump(slot) {
+        if (slot.busy) return;
+        const task = slot.queue.shift() || this.steal(slot);
+        if (!task) return;
+
+        if (!slot.worker) {
+            this.startWorker(slot);
+        }
+        if (slot.interruptBuffer) {
+            slot.interruptBuffer[0] = 0;
+        }
+        slot.task = task;
+        slot.busy = true;
+        slot.busySince = performance.now();
+        if (task.timeoutMs) {
+            task.timeoutTimer = setTimeout(
+                () => this.cancel(task, `Timed out after ${Math.round(task.timeoutMs / 1000)}s`),
+                task.timeoutMs
+            );
+        }
+
+        // A restarted worker never replies, so only settle tasks that are still running
+        const onPartial = task.onPartial && ((partial) => { if (!task.done) task.onPartial(partial); });
+        messageWorker(slot.worker, task.message, onPartial).then(
+            (reply) => {
+                slot.startup = reply.startup || slot.startup;
+                if (task.done) return;
+                this.finish(slot, task);
+                task.resolve(reply);
+                this.pump(slot);
+            },
+            (error) => {
+                slot.startup = error.startup || slot.startup;
+                if (task.done) return;
+                this.finish(slot, task);
+                task.reject(task.cancelReason ? { error: task.cancelReason, stdout: error.stdout } : error);
+                this.pump(slot);
+            }
+        );
+    }
+
+    // Per-worker queue depth, utilization (share of wall time spent running tasks) and the
+    // latest startup timing ({ mode: 'cold' | 'snapshot', interpreterMs, totalMs }).
+    metrics() {
+        const now = performance.now();
+        const elapsed = Math.max(now - this.createdAt, 1);
+        return this.slots.map(slot => {
+            const busyTime = slot.busyTime + (slot.busy ? now - slot.busySince : 0);
+            return {
+                worker: slot.id,
+                queueDepth: slot.queue.length,
+                busy: slot.busy,
+                completed: slot.completed,
+                stolen: slot.stolen,
+                functions: [...this.affinity].filter(([, id]) => id === slot.id).map(([key]) => key),
+                utilization: busyTime / elapsed,
+                startup: slot.startup
+            };
+        });
+    }
+}
@@ -0,0 +1,77 @@
+// Run with: node --test src/functions/exec
+import { test, mock } from 'node:test';
+import assert from 'node:assert/strict';
+import { INTERRUPT_GRACE_MS, WorkerPool } from './pool.js';
+
+// A worker whose calls never finish on their own, like an async function awaiting fetches.
+// With `cancellable` it answers a cancel message the way the exec worker does.
+function fakeWorkers({ cancellable }) {
+    const workers = [];
+    const create = () => {
+        const worker = {
+            messages: [],
+            terminated: false,
+            postMessage(message) {
+                worker.messages.push(message);
+                if (message.type === 'cancel' && cancellable) {
+                    setTimeout(() => worker.onmessage({ data: { error: 'CancelledError', stdout: '' } }), 10);
+                }
+            },
+            terminate() {
+                worker.terminated = true;
+            },
+        };
+        workers.push(worker);
+        return worker;
+    };
+    return { workers, create };
+}
+
+test('without cross-origin isolation a cancelled call is cancelled in the worker', async () => {
+    const { workers, create } = fakeWorkers({ cancellable: true });
+    const pool = new WorkerPool(1, create);
+    const controller = new AbortController();
+    const call = pool.run('fill', { name: 'fill' }, { signal: controller.signal });
+    controller.abort();
+
+    await assert.rejects(call, { error: 'Request aborted' });
+    assert.equal(workers.length, 1);
+    assert.equal(workers[0].terminated, false);
+    assert.deepEqual(workers[0].messages.map(message => message.type), [undefined, 'cancel']);
+});
+
+test('a worker that does not stop within the grace period is restarted', async () => {
+    mock.timers.enable({ apis: ['setTimeout'] });
+    try {
+        const { workers, create } = fakeWorkers({ cancellable: false });
+        const pool = new WorkerPool(1, create);
+        const call = pool.run('loop', { name: 'loop' }, { timeoutMs: 1000 });
+        mock.timers.tick(1000);
+        assert.equal(workers[0].messages.at(-1).type, 'cancel');
+        mock.timers.tick(INTERRUPT_GRACE_MS);
+
+        await assert.rejects(call, { error: 'Timed out after 1s. The Python worker was restarted.' });
+        assert.equal(workers[0].terminated, true);
+    } finally {
+        mock.timers.reset();
+    }
+});
+
+test('with cross-origin isolation an awaiting call is also cancelled in the worker', async () => {
+    globalThis.crossOriginIsolated = true;
+    try {
+        const { workers, create } = fakeWorkers({ cancellable: true });
+        const pool = new WorkerPool(1, create);
+        const controller = new AbortController();
+        const call = pool.run('fill', { name: 'fill' }, { signal: controller.signal });
+        const buffer = workers[0].messages[0].buffer;
+        controller.abort();
+
+        assert.equal(buffer[0], 2);
+        await assert.rejects(call, { error: 'Request aborted' });
+        assert.equal(workers[0].terminated, false);
+        assert.deepEqual(workers[0].messages.map(message => message.type), ['interrupt-buffer', undefined, 'cancel']);
+    } finally {
+        delete globalThis.crossOriginIsolated;
+    }
+});
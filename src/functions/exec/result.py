@@ -1,45 +1,146 @@
 import sys
 import datetime
+from itertools import chain
+
+SCALAR_TYPES = (int, float, str, bool)
+DATE_TYPES = (datetime.datetime, datetime.date)
+
+# Exact types that need no conversion, checked with a C-level set lookup per cell.
+_SCALAR_TYPE_SET = frozenset(SCALAR_TYPES)
+
+# Float arrays at least this large are returned as a contiguous float64 ndarray, which
+# the worker transfers to the main thread as a raw buffer plus shape.
+TYPED_ARRAY_MIN_CELLS = 1000
 
 def to_excel_serial(date):
     base_date = datetime.datetime(1970, 1, 1)
     delta_days = (date - base_date).days + 25569
     return delta_days
 
+def pandas_column_to_list(series):
+    """Convert one pandas column to a list of Excel values, with NaT/NaN/None as blanks"""
+    import numpy as np
+    import pandas as pd
+
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        if getattr(series.dtype, 'tz', None) is not None:
+            series = series.dt.tz_localize(None)
+        return datetime64_to_serial(series.to_numpy())
+
+    values = series.to_numpy()
+    if values.dtype.kind in 'biu':
+        return values.tolist()
+    missing = np.isnan(values) if values.dtype.kind == 'f' else pd.isna(values)
+    column = values.tolist()
+
+    for i in np.flatnonzero(missing).tolist():
+        column[i] = ''
+    return column
+
 def handle_pandas_types(result):
-    """Handle pandas specific type conversions"""
+    """Handle pandas specific type conversions.
+
+    DataFrames are converted column by column without modifying the caller's frame.
+    Set ``result.attrs['excel_headers'] = True`` to emit the column names as the first
+    row and ``result.attrs['excel_index'] = True`` to emit the index as the first column.
+    """
     import pandas as pd
     
-    if isinstance(result, pd.DataFrame):
-        # Convert any datetime columns to Excel serial format
-        for col in result.select_dtypes(include=['datetime64']).columns:
-            result[col] = result[col].apply(to_excel_serial)
-        return result.values.tolist()
-
-    if isinstance(result, pd.Series):
-        if result.dtype.kind == 'M':  # M is the kind code for datetime64
-            result = result.apply(to_excel_serial)
-        return [[x] for x in result.values.tolist()]
+    if isinstance(result, (pd.DataFrame, pd.Series)):
+        headers = bool(result.attrs.get('excel_headers', False))
+        index = bool(result.attrs.get('excel_index', False))
+
+        if isinstance(result, pd.DataFrame):
+            columns = [pandas_column_to_list(result.iloc[:, i]) for i in range(result.shape[1])]
+            names = list(result.columns)
+        else:
+            columns = [pandas_column_to_list(result)]
+            names = [result.name]
+
+        if index:
+            columns.insert(0, pandas_column_to_list(result.index.to_series()))
+            names.insert(0, result.index.name)
+
+        rows = [list(row) for row in zip(*columns)]
+        if headers:
+            rows.insert(0, ['' if name is None else str(name) for name in names])
+        return rows
     
     return None
 
+def datetime64_to_serial(values):
+    """Convert a datetime64 ndarray to Excel serial days in one vectorized step, with NaT as blanks"""
+    import numpy as np
+
+    days = values.astype('datetime64[D]').astype(np.int64) + 25569
+    missing = np.isnat(values)
+    if not missing.any():
+        return days.tolist()
+    cells = days.astype(object)
+    cells[missing] = ''
+    return cells.tolist()
+
 def handle_numpy_types(result):
     """Handle numpy specific type conversions"""
     import numpy as np
     
     if isinstance(result, np.ndarray):
+        if result.ndim > 2:
+            raise ValueError(f"Result array must be 1D or 2D, got {result.ndim} dimensions")
         if result.ndim == 0:
             return [[result.item()]]
-        elif result.ndim == 1:
-            return [result.tolist()]
+        if result.dtype.kind == 'f' and result.size >= TYPED_ARRAY_MIN_CELLS:
+            return np.ascontiguousarray(result.reshape(1, -1) if result.ndim == 1 else result, dtype=np.float64)
+        if result.dtype.kind == 'M':
+            rows = datetime64_to_serial(result)
+        elif result.dtype.kind in 'biuf':
+            # Numeric arrays convert straight to Python scalars, no object copy needed
+            rows = result.tolist()
         else:
-            return np.array(result, dtype=object).tolist()
+            rows = np.array(result, dtype=object).tolist()
+        return [rows] if result.ndim == 1 else rows
 
-    if isinstance(result, (np.integer, np.floating)):
-        return [[result.item()]]
+    if isinstance(result, np.generic):
+        return [[convert_cell(result.item())]]
         
     return None
 
+def convert_cell(x):
+    """Convert a cell that is not an exact scalar type, raising if it is not supported"""
+    if isinstance(x, DATE_TYPES):
+        return to_excel_serial(x)
+    # Before the scalar check, np.float64 is a float subclass
+    if 'numpy' in sys.modules and isinstance(x, sys.modules['numpy'].generic):
+        return convert_cell(x.item())
+    if isinstance(x, SCALAR_TYPES):
+        return x
+    if isinstance(x, list):
+        raise ValueError("Result must be a valid 2D list")
+    raise ValueError("All elements must be scalar types (int, float, str, bool)")
+
+def convert_row(row):
+    """Convert a single row, copying it only when it holds cells that need conversion"""
+    if _SCALAR_TYPE_SET.issuperset(map(type, row)):
+        return row
+    return [x if type(x) in _SCALAR_TYPE_SET else convert_cell(x) for x in row]
+
+def convert_rows(rows):
+    """Validate shape and scalar types of a 2D list and convert dates in a single sweep.
+
+    Row types, row lengths and cell types are each checked with one C-level pass, so
+    the common all-scalar case returns the original list without copying any rows.
+    """
+    if set(map(type, rows)) != {list} and not all(isinstance(row, list) for row in rows):
+        raise ValueError("Result must be a valid 2D list")
+
+    if len(set(map(len, rows))) > 1:
+        raise ValueError("All rows must have the same length")
+
+    if _SCALAR_TYPE_SET.issuperset(map(type, chain.from_iterable(rows))):
+        return rows
+
+    return [convert_row(row) for row in rows]
+
 def convert_result():
     result = globals().get('result', '') # Get the result variable, empty for test runner.
 
@@ -76,30 +177,11 @@ def convert_result():
         if not result:
             raise ValueError("Result cannot be an empty list")
 
-        # Convert any datetime objects in a 1D list
-        if not any(isinstance(x, list) for x in result):
-            result = [to_excel_serial(x) if isinstance(x, (datetime.datetime, datetime.date))
-                      else x for x in result]
-            if not all(isinstance(x, (int, float, str, bool)) for x in result):
-                raise ValueError("All elements must be scalar types (int, float, str, bool)")
-            return [result]
-
-        if not all(isinstance(row, list) for row in result):
-            raise ValueError("Result must be a valid 2D list")
-
-        width = len(result[0])
-        if not all(len(row) == width for row in result):
-            raise ValueError("All rows must have the same length")
-
-        # Convert any datetime objects in a 2D list
-        result = [[to_excel_serial(x) if isinstance(x, (datetime.datetime, datetime.date))
-                   else x for x in row] for row in result]
-
-        if not all(isinstance(x, (int, float, str, bool)) 
-                  for row in result for x in row):
-            raise ValueError("All elements must be scalar types (int, float, str, bool)")
+        # A 1D list becomes a single row
+        if not isinstance(result[0], list):
+            return [convert_row(result)]
 
-        return result
+        return convert_rows(result)
 
     raise ValueError("Result must be a scalar or 2D list. Other types including dicts are not supported.")
 
@@ -0,0 +1,159 @@
+# Warm execution of saved functions.
+#
+# setup.py and result.py are loaded once when the worker starts. Each saved function is
+# compiled once into its own namespace and the callable is cached by name and code hash,
+# so later EXEC calls only rebind the arguments, invoke it and convert the result.
+#
+# EXEC calls to a saved function run as a batch, one or more argument sets per message.
+# Coroutine functions (async def) are awaited. The worker awaits the task returned by
+# run_batch on Pyodide's event loop, and the calls run concurrently, at most
+# `concurrency` at a time.
+#
+# Generator functions (sync or async) are run with run_stream for EXEC_STREAM. Each value
+# they yield is converted and passed to the worker's emit callback, at most one every
+# `interval` seconds, and the last value is returned as the final result.
+#
+# The awaited calls are scheduled as tasks, so cancel_running can stop them when the
+# worker is asked to cancel on a page without Pyodide's interrupt buffer.
+
+import asyncio
+import hashlib
+import inspect
+import time
+import traceback
+
+function_cache = {}
+running_tasks = set()
+
+def code_key(name, code):
+    return (name, hashlib.sha256(code.encode('utf-8')).hexdigest())
+
+def is_function_cached(name, code):
+    return code_key(name, code) in function_cache
+
+def load_function(name, code):
+    """Return the cached callable for this code, compiling it on first use"""
+    key = code_key(name, code)
+    func = function_cache.get(key)
+    if func is None:
+        namespace = {'__name__': '__main__', 'test_cases': None}
+        exec(compile(code, 'user_code', 'exec'), namespace)
+
+        # Saved names are lowercase while the def may use any case
+        func = namespace.get(name)
+        if func is None:
+            func = next((value for key_name, value in namespace.items()
+                         if key_name.lower() == name and callable(value)), None)
+        if func is None:
+            raise NameError(f"Function '{name}' is not defined in its code.")
+
+        function_cache[key] = func
+    return func
+
+def invalidate_function(name=None):
+    """Drop cached callables for a function name, or all of them when name is None"""
+    for key in [key for key in function_cache if name is None or key[0] == name]:
+        del function_cache[key]
+
+def result_entry(value):
+    """Convert a function's return value for Excel as a batch entry, float64 arrays are kept for the worker to transfer"""
+    globals()['result'] = value
+    return {'result': convert_result()}
+
+def track(awaitable):
+    """Schedule a coroutine as a task that cancel_running can cancel, for the worker to await"""
+    task = asyncio.ensure_future(awaitable)
+    running_tasks.add(task)
+    task.add_done_callback(running_tasks.discard)
+    return task
+
+def cancel_running():
+    """Cancel the awaited calls in progress"""
+    for task in list(running_tasks):
+        task.cancel()
+
+async def convert_awaited(awaitable):
+    globals()['result'] = await awaitable
+    return convert_result()
+
+async def run_batch_async(func, names, batch_args, concurrency):
+    """Await one call per argument set, running up to `concurrency` of them at once"""
+    semaphore = asyncio.Semaphore(max(1, int(concurrency)))
+
+    async def run_one(raw_args):
+        async with semaphore:
+            try:
+                # Each call gets its own adapter, the exec_args global is shared by all of them
+                value = call_with_args(func, names, ArgumentAdapter(raw_args))
+                if inspect.isawaitable(value):
+                    value = await value
+                return result_entry(value)
+            except Exception:
+                return {'error': traceback.format_exc()}
+
+    return list(await asyncio.gather(*(run_one(raw_args) for raw_args in batch_args)))
+
+def run_batch(name, code, names, batch_args, graph_token=None, concurrency=1):
+    """Run a cached function once per argument set, returning {'result': ...} or {'error': ...} for each"""
+    func = load_function(name, code)
+    func.__globals__['graphToken'] = graph_token
+    if inspect.iscoroutinefunction(func):
+        return track(run_batch_async(func, names, batch_args, concurrency))
+
+    results = []
+    for raw_args in batch_args:
+        try:
+            bind_args(raw_args)
+            results.append(result_entry(call_with_args(func, names)))
+        except Exception:
+            results.append({'error': traceback.format_exc()})
+    return results
+
+class StreamEmitter:
+    """Converts and emits yielded values, skipping those that arrive within interval of the last one sent"""
+
+    def __init__(self, emit, interval):
+        self.emit = emit
+        self.interval = interval
+        self.sent = None
+        self.value = None
+        self.yielded = False
+
+    def push(self, value):
+        self.value = value
+        self.yielded = True
+        now = time.monotonic()
+        if self.sent is None or now - self.sent >= self.interval:
+            self.sent = now
+            globals()['result'] = value
+            self.emit(convert_result())
+
+    def finish(self):
+        if not self.yielded:
+            raise ValueError("Your function did not yield a value. Yield an empty string ('') for a blank cell.")
+        globals()['result'] = self.value
+        return convert_result()
+
+async def stream_async(values, emitter):
+    async for value in values:
+        emitter.push(value)
+    return emitter.finish()
+
+def run_stream(name, code, names, raw_args, emit, graph_token=None, interval=0.1):
+    """Call a generator function, emitting each converted value it yields, and return the last one"""
+    func = load_function(name, code)
+    func.__globals__['graphToken'] = graph_token
+    bind_args(raw_args)
+    value = call_with_args(func, names)
+    emitter = StreamEmitter(emit, interval)
+    if inspect.isasyncgen(value):
+        return track(stream_async(value, emitter))
+    if inspect.isgenerator(value):
+        for item in value:
+            emitter.push(item)
+        return emitter.finish()
+    # A plain function run with EXEC_STREAM returns a single result
+    if inspect.isawaitable(value):
+        return track(convert_awaited(value))
+    globals()['result'] = value
+    return convert_result()
@@ -1,17 +1,99 @@
-# Set up individual args from the args array
-if 'global_args' in globals():
-    for index, value in enumerate(globals()['global_args']):
-        if value is None:
-            globals()[f'arg{index + 1}'] = None
-            continue
-        
+# Set up EXEC arguments from the args array.
+#
+# Ranges are kept as JsProxy objects until call_with_args binds them to the user
+# function, which converts every argument it passes before the function body runs.
+# Skipped and omitted arguments are never converted. Parameters annotated as numpy arrays
+# or pandas DataFrames are materialized directly in that form instead of as a list of lists.
+
+OMITTED = "__OMITTED__"
+
+def annotation_kind(annotation):
+    """Map a parameter annotation (object or string) to 'ndarray', 'dataframe' or None"""
+    if annotation is None:
+        return None
+    name = annotation if isinstance(annotation, str) else getattr(annotation, '__name__', str(annotation))
+    name = name.split('[')[0].rsplit('.', 1)[-1]
+    if name in ('ndarray', 'NDArray'):
+        return 'ndarray'
+    if name == 'DataFrame':
+        return 'dataframe'
+    return None
+
+def range_to_ndarray(value):
+    """Copy a 2D JS range into a float64 ndarray with a single bulk buffer copy"""
+    import numpy as np
+    from js import rangeToFloat64
+
+    rows, cols = len(value), len(value[0])
+    array = np.empty((rows, cols), dtype=np.float64)
+    rangeToFloat64(value).assign_to(array)
+    return array
+
+class ArgumentAdapter:
+    """Holds the raw EXEC arguments and converts each one once, when it is first bound"""
+
+    def __init__(self, raw_args):
+        self.raw_args = list(raw_args) if raw_args is not None else []
+        self.converted = {}
+
+    def __len__(self):
+        return len(self.raw_args)
+
+    def get(self, index, annotation=None):
+        kind = annotation_kind(annotation)
+        key = (index, kind)
+        if key not in self.converted:
+            self.converted[key] = self.convert(self.raw_args[index], kind)
+        return self.converted[key]
+
+    @staticmethod
+    def convert(value, kind=None):
+        if value is None or not hasattr(value, 'to_py'):
+            return value
+
+        if kind == 'ndarray':
+            return range_to_ndarray(value)
+        if kind == 'dataframe':
+            import pandas as pd
+            return pd.DataFrame(value.to_py())
+
         if len(value) == 1 and len(value[0]) == 1:
-            globals()[f'arg{index + 1}'] = value[0][0]
-        else:
-            if hasattr(value, 'to_py') and callable(value.to_py):
-                globals()[f'arg{index + 1}'] = value.to_py()
-            else:
-                globals()[f'arg{index + 1}'] = value  # Fallback to assigning value directly
+            return value[0][0]
+        return value.to_py()
+
+def is_omitted(adapter, index):
+    """Skipped arguments (None) and omitted optional LAMBDA arguments use the function default"""
+    if index >= len(adapter):
+        return True
+    value = adapter.raw_args[index]
+    if value is None:
+        return True
+    return hasattr(value, 'to_py') and len(value) == 1 and len(value[0]) == 1 and value[0][0] in (None, OMITTED)
+
+def call_with_args(func, names, adapter=None):
+    """Call func with the EXEC arguments (or the given adapter's) bound to its parameter names by position"""
+    adapter = exec_args if adapter is None else adapter
+    annotations = getattr(func, '__annotations__', {})
+    kwargs = {
+        name: adapter.get(index, annotations.get(name))
+        for index, name in enumerate(names)
+        if not is_omitted(adapter, index)
+    }
+    return func(**kwargs)
+
+def bind_legacy_args():
+    """Set arg1..argN globals eagerly for functions saved with an argN based resultLine"""
+    for index in range(len(exec_args)):
+        globals()[f'arg{index + 1}'] = exec_args.get(index)
+
+def bind_args(raw_args):
+    """Wrap the raw EXEC arguments for this call, keeping single cells as arg1..argN globals"""
+    globals()['exec_args'] = ArgumentAdapter(raw_args)
+    for index, value in enumerate(exec_args.raw_args):
+        if value is None or (hasattr(value, 'to_py') and len(value) == 1 and len(value[0]) == 1):
+            globals()[f'arg{index + 1}'] = exec_args.get(index)
+
+bind_args(globals().get('global_args'))
 
 # Set test_cases global to None
-globals()['test_cases'] = None
\ No newline at end of file
+globals()['test_cases'] = None
@@ -1,7 +1,10 @@
 ﻿/* global clearInterval, console, setInterval */
-import { queueTask } from './utils/queue.js';
+import { queueTask, queueBatchedTask } from './utils/queue.js';
 import { runPython } from './runpy/controller.js';
-import { execPython } from './exec/controller.js';
+import { execPythonBatch, execPythonStream, prefetchFunctionImports } from './exec/controller.js';
+
+// Start installing saved functions' packages before the first EXEC call needs them
+prefetchFunctionImports();
 
 /**
  * Runs Python code locally in Excel.
@@ -19,12 +22,35 @@ export async function runPy(code, arg1) {
 /**
  * Loads and runs code in a wrapper.  INTERNAL - DO NOT USE.
  * @customfunction EXEC
+ * @cancelable
  * @param {string} code Code or reference.
  * @param {any[][][]} [arg1] Optional params set as globals.
+ * @param {CustomFunctions.CancelableInvocation} invocation Invocation, cancelled when Excel abandons the call.
  * @returns {any[][]} Result of execution.
  */
 
-export async function exec(code, arg1) {
+export async function exec(code, arg1, invocation) {
   const args = { code, arg1 };
-  return await queueTask(args, execPython);
-}
\ No newline at end of file
+  const controller = new AbortController();
+  invocation.onCanceled = () => controller.abort();
+  // Calls to the same function during a recalc share one worker round-trip
+  return await queueBatchedTask(code, args, execPythonBatch, controller.signal);
+}
+
+/**
+ * Runs a generator function, showing each value it yields.  INTERNAL - DO NOT USE.
+ * @customfunction EXEC_STREAM
+ * @streaming
+ * @param {string} code Code or reference.
+ * @param {any[][][]} [arg1] Optional params set as globals.
+ * @param {CustomFunctions.StreamingInvocation<any[][]>} invocation Invocation that receives each partial result.
+ */
+
+export function execStream(code, arg1, invocation) {
+  const controller = new AbortController();
+  invocation.onCanceled = () => controller.abort();
+  const setResult = (result) => {
+    if (!controller.signal.aborted) invocation.setResult(result);
+  };
+  execPythonStream({ code, arg1 }, setResult, controller.signal).then(setResult);
+}
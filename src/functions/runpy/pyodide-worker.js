@@ -1,4 +1,7 @@
 importScripts("https://cdn.jsdelivr.net/pyodide/v0.26.2/full/pyodide.js");
+import { installWheelCache } from '../utils/wheelcache.js';
+
+installWheelCache();
 
 let pyodideReadyPromise = null;
 
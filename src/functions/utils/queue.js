@@ -32,3 +32,47 @@ export async function queueTask(args, task) {
     }
 }
 
+// Batching: calls that share a key and arrive within BATCH_WINDOW_MS of the first are
+// coalesced into a single batchTask call, which receives the list of args and must
+// return one result per args, in the same order. Batches bypass the concurrency-1 queue
+// because the exec worker pool schedules them across its workers. The batch is aborted
+// once every call in it has been cancelled.
+export const BATCH_WINDOW_MS = 10;
+export const MAX_BATCH_SIZE = 500;
+const pendingBatches = new Map();
+
+function flushBatch(key, batchTask) {
+    const batch = pendingBatches.get(key);
+    if (!batch) return;
+    pendingBatches.delete(key);
+    clearTimeout(batch.timer);
+
+    Promise.resolve(batchTask(batch.calls.map(call => call.args), batch.controller.signal)).then(
+        (results) => batch.calls.forEach((call, index) => call.resolve(results[index])),
+        (error) => batch.calls.forEach(call => call.reject(error))
+    );
+}
+
+export function queueBatchedTask(key, args, batchTask, signal = undefined) {
+    return new Promise((resolve, reject) => {
+        let batch = pendingBatches.get(key);
+        if (!batch) {
+            batch = {
+                calls: [],
+                cancelled: 0,
+                controller: new AbortController(),
+                timer: setTimeout(() => flushBatch(key, batchTask), BATCH_WINDOW_MS)
+            };
+            pendingBatches.set(key, batch);
+        }
+        batch.calls.push({ args, resolve, reject });
+        signal?.addEventListener('abort', () => {
+            if (++batch.cancelled === batch.calls.length) {
+                batch.controller.abort();
+            }
+        }, { once: true });
+        if (batch.calls.length >= MAX_BATCH_SIZE) {
+            flushBatch(key, batchTask);
+        }
+    });
+}
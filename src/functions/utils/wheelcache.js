@@ -0,0 +1,46 @@
+import { getCachedWheel, storeCachedWheel } from '../../taskpane/utils/indexedDB.js';
+import { WHEEL_CACHE_MAX_BYTES } from '../../taskpane/utils/constants.js';
+
+// Package downloads (wheels from PyPI, package archives from the Pyodide CDN) are stored in
+// IndexedDB by URL, so reopening a workbook installs them without going to the network.
+// URLs include the package and Pyodide versions, so an upgrade simply misses the cache, and
+// the files of earlier versions are evicted once the store exceeds WHEEL_CACHE_MAX_BYTES.
+const PACKAGE_FILE = /\.(whl|zip|tar)$/;
+
+function isPackageFile(url) {
+    try {
+        return PACKAGE_FILE.test(new URL(url).pathname);
+    } catch {
+        return false;
+    }
+}
+
+// Wrap the worker's fetch, which both loadPackage and micropip download through. Call it
+// before loadPyodide. Cache failures fall back to the network.
+export function installWheelCache() {
+    const networkFetch = self.fetch.bind(self);
+
+    self.fetch = async (input, init) => {
+        const url = input instanceof Request ? input.url : String(input);
+        if (!isPackageFile(url)) {
+            return networkFetch(input, init);
+        }
+
+        try {
+            const cached = await getCachedWheel(url);
+            if (cached) {
+                return new Response(cached, { status: 200, headers: { 'Content-Type': 'application/octet-stream' } });
+            }
+        } catch (error) {
+            console.error('Wheel cache read failed:', error);
+        }
+
+        const response = await networkFetch(input, init);
+        if (response.ok) {
+            response.clone().arrayBuffer()
+                .then(data => storeCachedWheel(url, data, WHEEL_CACHE_MAX_BYTES))
+                .catch(error => console.error('Wheel cache write failed:', error));
+        }
+        return response;
+    };
+}
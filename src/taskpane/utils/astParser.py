@@ -3,8 +3,83 @@ import textwrap
 import re
 import json
 import base64
+import hashlib
 import pyodide
 
+# Imports, global names and calls that make a function's result depend on more than its
+# arguments. Functions using any of them are not memoized by the exec runtime, even when
+# their settings ask for it. Memoizing is opt-in because this cannot catch everything.
+IMPURE_IMPORTS = {"random", "secrets", "uuid", "requests", "httpx", "urllib", "http", "pyodide_http",
+                  "numpy.random", "boardflare.llm"}
+IMPURE_NAMES = {"graphToken"}
+IMPURE_ATTRIBUTES = {"random", "environ"}
+IMPURE_CALLS = {"now", "today", "utcnow", "time", "time_ns", "perf_counter", "monotonic", "getenv"}
+IMPURE_FUNCTIONS = {"open", "input"}
+
+def find_impurities(tree, imports):
+    """Return the reasons a parsed module is not deterministic, empty if it looks pure"""
+    reasons = [f"imports {name}" for name in imports if name in IMPURE_IMPORTS]
+    for node in ast.walk(tree):
+        # Submodules such as boardflare.llm are matched on their full dotted name
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            modules = [alias.name for alias in node.names] if isinstance(node, ast.Import) else [node.module or ""]
+            reasons.extend(f"imports {module}" for module in modules
+                           if any(module == impure or module.startswith(impure + ".") for impure in IMPURE_IMPORTS))
+        elif isinstance(node, ast.Name) and node.id in IMPURE_NAMES:
+            reasons.append(f"reads {node.id}")
+        elif isinstance(node, ast.Global):
+            reasons.append("declares global " + ", ".join(node.names))
+        elif isinstance(node, ast.Attribute) and node.attr in IMPURE_ATTRIBUTES:
+            reasons.append(f"uses {ast.unparse(node)}")
+        elif (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+              and node.func.attr in IMPURE_CALLS):
+            reasons.append(f"calls {ast.unparse(node.func)}")
+        elif (isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+              and node.func.id in IMPURE_CALLS | IMPURE_FUNCTIONS):
+            # Also clocks imported by name, such as from time import time
+            reasons.append(f"calls {node.func.id}")
+    return list(dict.fromkeys(reasons))
+
+# Settings a function declares in its source as module-level assignments, such as
+# __memoize__ = True. They are saved in its settings entry with the parsed metadata, so
+# every save keeps them. Each maps to its settings key, a check and the value expected.
+FUNCTION_OPTIONS = {
+    "__memoize__": ("memoize", lambda value: isinstance(value, bool), "True or False"),
+    "__timeout__": ("timeout", lambda value: isinstance(value, (int, float)) and not isinstance(value, bool) and value > 0,
+                    "a positive number of seconds"),
+    "__concurrency__": ("concurrency", lambda value: isinstance(value, int) and not isinstance(value, bool) and value > 0,
+                        "a positive whole number"),
+}
+
+def find_options(tree):
+    """Return the settings declared at module level, raising ValueError for an invalid value"""
+    options = {}
+    for node in tree.body:
+        if not (isinstance(node, ast.Assign) and len(node.targets) == 1
+                and isinstance(node.targets[0], ast.Name) and node.targets[0].id in FUNCTION_OPTIONS):
+            continue
+        target = node.targets[0].id
+        key, is_valid, expected = FUNCTION_OPTIONS[target]
+        try:
+            value = ast.literal_eval(node.value)
+        except ValueError:
+            value = None
+        if not is_valid(value):
+            raise ValueError(f"{target} must be {expected}, got {ast.unparse(node.value)}")
+        options[key] = value
+    return options
+
+def is_generator(node):
+    """True when a function yields, ignoring yields inside nested functions and classes"""
+    nodes = list(node.body)
+    while nodes:
+        child = nodes.pop()
+        if isinstance(child, (ast.Yield, ast.YieldFrom)):
+            return True
+        if not isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda, ast.ClassDef)):
+            nodes.extend(ast.iter_child_nodes(child))
+    return False
+
 def parse_python_code_safe(encoded_code):
     """
     Parse safely encoded Python code to avoid issues with triple quotes
@@ -41,7 +116,7 @@ def parse_python_code(code):
         tree = ast.parse(code)
         
         for node in ast.walk(tree):
-            if isinstance(node, ast.FunctionDef):
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
                 name = node.name
                 
                 # Check for *args and **kwargs
@@ -78,6 +153,9 @@ def parse_python_code(code):
                         parameters[offset + i]["has_default"] = True
                         parameters[offset + i]["default"] = ast.unparse(default)
                 
+                impurities = find_impurities(tree, imports)
+                options = find_options(tree)
+
                 # Get docstring
                 docstring = ast.get_docstring(node)
                 description = docstring.split('.')[0].strip() if docstring else "No description available"
@@ -89,7 +167,12 @@ def parse_python_code(code):
                     "description": description,
                     "error": None,
                     "has_params": len(parameters) > 0,
-                    "imports": imports
+                    "is_async": isinstance(node, ast.AsyncFunctionDef),
+                    "is_generator": is_generator(node),
+                    "imports": imports,
+                    "pure": not impurities,
+                    "impurities": impurities,
+                    "options": options
                 })
         
         return json.dumps({
@@ -102,5 +185,31 @@ def parse_python_code(code):
             "error": str(e)
         })
 
+# Parsed results by source hash, so unchanged code skips find_imports and ast.parse
+parse_cache = {}
+PARSE_CACHE_SIZE = 512
+
+def parse_python_codes(codes):
+    """
+    Parse a batch of function sources, reusing the result for any source parsed before
+
+    Args:
+        codes: List of Python source strings
+
+    Returns:
+        List of JSON strings with parsed function metadata, in the same order
+    """
+    results = []
+    for code in codes:
+        key = hashlib.sha256(code.encode('utf-8')).hexdigest()
+        parsed = parse_cache.get(key)
+        if parsed is None:
+            parsed = parse_python_code(code)
+            if len(parse_cache) >= PARSE_CACHE_SIZE:
+                parse_cache.pop(next(iter(parse_cache)))
+            parse_cache[key] = parsed
+        results.append(parsed)
+    return results
+
 # Set up global result variable
 result = None
@@ -32,7 +32,8 @@ export const EventTypes = {
     LOG: 'console:log',
     ERROR: 'console:error',
     CLEAR: 'console:clear',
-    SAVE: 'SAVE_STATUS_EVENT'
+    SAVE: 'SAVE_STATUS_EVENT',
+    FUNCTION_SAVED: 'function:saved'
 };
 
 export const ConsoleEvents = {
@@ -54,6 +55,36 @@ export const DEBUG_FLAGS = {
     FORCE_CELL_EDIT_MODE_ERROR: false,  // Simulate InvalidOperationInCellEditMode errors
 };
 
+// Number of Pyodide workers that run EXEC functions in parallel. Each worker holds its
+// own interpreter, so memory use grows with this value.
+export const EXEC_POOL_SIZE = 2;
+
+// Default time an EXEC call may run before its Python code is interrupted. A function can
+// override this by declaring __timeout__ in seconds in its source.
+export const EXEC_TIMEOUT_MS = 120000;
+
+// Longest an EXEC batch may run, whatever its number of calls. Each call still gets its
+// own timeout, so a batch of one call can run for a longer __timeout__.
+export const EXEC_BATCH_TIMEOUT_MS = 600000;
+
+// Start exec workers from a Pyodide memory snapshot taken after the helper code is loaded,
+// instead of initializing the interpreter from scratch. The snapshot is stored in IndexedDB.
+export const EXEC_SNAPSHOT_STARTUP = true;
+
+// Calls to an async def function in one EXEC batch that may await at the same time. A
+// function can override this by declaring __concurrency__ in its source.
+export const EXEC_ASYNC_CONCURRENCY = 8;
+
+// Minimum time between partial results that EXEC_STREAM sends to Excel from a generator
+// function. Values yielded faster are skipped, the last value is always shown.
+export const EXEC_STREAM_INTERVAL_MS = 100;
+
+// Memory bound for memoized results of functions that declare __memoize__ = True, 0 disables it.
+export const EXEC_MEMO_MAX_BYTES = 64 * 1024 * 1024;
+
+// Size bound for package downloads cached in IndexedDB, least recently used are evicted.
+export const WHEEL_CACHE_MAX_BYTES = 256 * 1024 * 1024;
+
 export const LLM_ENDPOINT = "https://codepy.boardflare.workers.dev";
 
 export function getExecEnv() {
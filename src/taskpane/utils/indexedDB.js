@@ -6,12 +6,13 @@ export function initializeDB() {
     if (dbInitializing) return dbInitializing;
 
     dbInitializing = new Promise((resolve, reject) => {
-        if (!window.indexedDB) {
+        // self is the window on the page and the global scope in web workers
+        if (!self.indexedDB) {
             return reject(new Error('IndexedDB is not supported in this browser'));
         }
 
         const dbName = 'Boardflare';
-        const dbVersion = 2;
+        const dbVersion = 7;
         const request = indexedDB.open(dbName, dbVersion);
 
         request.onupgradeneeded = (event) => {
@@ -28,6 +29,33 @@ export function initializeDB() {
             if (!db.objectStoreNames.contains('Logs')) {
                 db.createObjectStore('Logs', { autoIncrement: true });
             }
+
+            // Create Wheels store if it doesn't exist, package files keyed by download URL
+            if (!db.objectStoreNames.contains('Wheels')) {
+                db.createObjectStore('Wheels');
+            }
+
+            // Create WheelUsage store if it doesn't exist, size and last use of each wheel for
+            // eviction. Wheels stored before it existed have no usage entry, so they are dropped.
+            if (!db.objectStoreNames.contains('WheelUsage')) {
+                db.createObjectStore('WheelUsage', { keyPath: 'url' });
+                event.target.transaction.objectStore('Wheels').clear();
+            }
+
+            // Create Snapshots store if it doesn't exist, Pyodide memory snapshots keyed by build
+            if (!db.objectStoreNames.contains('Snapshots')) {
+                db.createObjectStore('Snapshots');
+            }
+
+            // Create LLMCache store if it doesn't exist, cached AI responses keyed by request hash
+            if (!db.objectStoreNames.contains('LLMCache')) {
+                db.createObjectStore('LLMCache', { keyPath: 'key' });
+            }
+
+            // Create DataFiles store if it doesn't exist, files built by Python helpers keyed by name
+            if (!db.objectStoreNames.contains('DataFiles')) {
+                db.createObjectStore('DataFiles', { keyPath: 'name' });
+            }
         };
 
         request.onerror = () => {
@@ -39,6 +67,11 @@ export function initializeDB() {
         request.onsuccess = (event) => {
             dbInstance = event.target.result;
             dbInitializing = null;
+            // Let a newer version opened by another bundle or worker upgrade the schema
+            dbInstance.onversionchange = () => {
+                dbInstance.close();
+                dbInstance = null;
+            };
             resolve(dbInstance);
         };
     });
@@ -254,3 +287,130 @@ export async function clearLogs() {
         request.onerror = () => reject(request.error);
     });
 }
+
+// Wheels store operations
+export async function getCachedWheel(url) {
+    const db = await getDB();
+    return new Promise((resolve, reject) => {
+        const tx = db.transaction(['Wheels', 'WheelUsage'], 'readwrite');
+        const request = tx.objectStore('Wheels').get(url);
+        request.onsuccess = () => {
+            if (request.result) {
+                tx.objectStore('WheelUsage').put({ url, size: request.result.byteLength, lastUsed: Date.now() });
+            }
+        };
+        tx.oncomplete = () => resolve(request.result || null);
+        tx.onerror = () => reject(tx.error);
+    });
+}
+
+// Least recently used wheels are evicted once the store exceeds maxBytes, a wheel larger
+// than that on its own is not stored
+export async function storeCachedWheel(url, data, maxBytes) {
+    if (data.byteLength > maxBytes) return;
+    const db = await getDB();
+    return new Promise((resolve, reject) => {
+        const tx = db.transaction(['Wheels', 'WheelUsage'], 'readwrite');
+        const wheels = tx.objectStore('Wheels');
+        const usage = tx.objectStore('WheelUsage');
+        wheels.put(data, url);
+        usage.put({ url, size: data.byteLength, lastUsed: Date.now() });
+        const request = usage.getAll();
+        request.onsuccess = () => {
+            const entries = request.result.sort((a, b) => a.lastUsed - b.lastUsed);
+            let total = entries.reduce((sum, entry) => sum + entry.size, 0);
+            for (const entry of entries) {
+                if (total <= maxBytes) break;
+                if (entry.url === url) continue;
+                wheels.delete(entry.url);
+                usage.delete(entry.url);
+                total -= entry.size;
+            }
+        };
+        tx.oncomplete = () => resolve();
+        tx.onerror = () => reject(tx.error);
+    });
+}
+
+export async function clearCachedWheels() {
+    const db = await getDB();
+    return new Promise((resolve, reject) => {
+        const tx = db.transaction(['Wheels', 'WheelUsage'], 'readwrite');
+        tx.objectStore('Wheels').clear();
+        tx.objectStore('WheelUsage').clear();
+        tx.oncomplete = () => resolve();
+        tx.onerror = () => reject(tx.error);
+    });
+}
+
+// Snapshots store operations
+export async function getSnapshot(key) {
+    const db = await getDB();
+    return new Promise((resolve, reject) => {
+        const tx = db.transaction('Snapshots', 'readonly');
+        const store = tx.objectStore('Snapshots');
+        const request = store.get(key);
+        request.onsuccess = () => resolve(request.result || null);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+// Keeps only the latest snapshot, older builds can no longer restore theirs
+export async function storeSnapshot(key, data) {
+    const db = await getDB();
+    return new Promise((resolve, reject) => {
+        const tx = db.transaction('Snapshots', 'readwrite');
+        const store = tx.objectStore('Snapshots');
+        store.clear();
+        store.put(data, key);
+        tx.oncomplete = () => resolve();
+        tx.onerror = () => reject(tx.error);
+    });
+}
+
+// LLMCache store operations
+export async function getLlmCacheEntries() {
+    const db = await getDB();
+    return new Promise((resolve, reject) => {
+        const tx = db.transaction('LLMCache', 'readonly');
+        const store = tx.objectStore('LLMCache');
+        const request = store.getAll();
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+export async function storeLlmCacheChanges({ puts, deletes }) {
+    const db = await getDB();
+    return new Promise((resolve, reject) => {
+        const tx = db.transaction('LLMCache', 'readwrite');
+        const store = tx.objectStore('LLMCache');
+        puts.forEach(entry => store.put(entry));
+        deletes.forEach(key => store.delete(key));
+        tx.oncomplete = () => resolve();
+        tx.onerror = () => reject(tx.error);
+    });
+}
+
+// DataFiles store operations
+export async function getDataFiles() {
+    const db = await getDB();
+    return new Promise((resolve, reject) => {
+        const tx = db.transaction('DataFiles', 'readonly');
+        const store = tx.objectStore('DataFiles');
+        const request = store.getAll();
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+export async function storeDataFile(name, data) {
+    const db = await getDB();
+    return new Promise((resolve, reject) => {
+        const tx = db.transaction('DataFiles', 'readwrite');
+        const store = tx.objectStore('DataFiles');
+        store.put({ name, data });
+        tx.oncomplete = () => resolve();
+        tx.onerror = () => reject(tx.error);
+    });
+}
@@ -1,8 +1,13 @@
 import { pyLogs } from './logs';
-import { DEFAULT_CODE, DEBUG_FLAGS } from './constants';
+import { DEFAULT_CODE, DEBUG_FLAGS, EventTypes } from './constants';
 import { parsePython } from './codeparser';
 import { saveWorkbookOnly } from './save';
 
+// Let the exec runtime drop anything cached for this function's previous code.
+function notifyFunctionSaved(name) {
+    window.dispatchEvent(new CustomEvent(EventTypes.FUNCTION_SAVED, { detail: { name } }));
+}
+
 const retry = async (fn, retries = 3, delay = 1000) => {
     try {
         return await fn();
@@ -35,6 +40,7 @@ export async function saveFunctionToSettings(functionData) {
                 settings.add(key, value);
                 await context.sync();
             });
+            notifyFunctionSaved(functionData.name);
             return result;
         });
     } catch (error) {
@@ -49,7 +55,7 @@ export async function saveFunctionWithDelay(functionData) {
     }
 
     try {
-        return await Excel.run({ delayForCellEdit: true }, async (context) => {
+        const result = await Excel.run({ delayForCellEdit: true }, async (context) => {
             const settings = context.workbook.settings;
             const key = functionData.name;
             const value = functionData;
@@ -57,6 +63,8 @@ export async function saveFunctionWithDelay(functionData) {
             settings.add(key, value);
             await context.sync();
         });
+        notifyFunctionSaved(functionData.name);
+        return result;
     } catch (error) {
         console.error('Delayed save also failed:', error);
         pyLogs({
@@ -128,7 +136,7 @@ export async function createDefaultFunction() {
 
 export async function deleteFunctionFromSettings(name) {
     try {
-        return await Excel.run(async (context) => {
+        const deleted = await Excel.run(async (context) => {
             const settings = context.workbook.settings;
             const setting = settings.getItem(name);
             setting.delete();
@@ -145,6 +153,8 @@ export async function deleteFunctionFromSettings(name) {
 
             return true;
         });
+        notifyFunctionSaved(name);
+        return deleted;
     } catch (error) {
         console.error('Failed to delete from settings:', error);
         pyLogs({
@@ -144,6 +144,11 @@ module.exports = async (env, options) => {
       watchFiles: ["./src/**/*"], // Add this line
       headers: {
         "Access-Control-Allow-Origin": "*",
+        // Cross-origin isolation gives the exec workers SharedArrayBuffer, so a cancelled or
+        // timed out call is interrupted instead of restarting its worker. credentialless
+        // lets Office.js and the Pyodide CDN load without Cross-Origin-Resource-Policy headers.
+        "Cross-Origin-Opener-Policy": "same-origin",
+        "Cross-Origin-Embedder-Policy": "credentialless",
       },
       server: {
         type: "https",